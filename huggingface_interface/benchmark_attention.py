@@ -0,0 +1,199 @@
+"""
+Benchmarks the attention implementations of the HF IndicTrans2 model (`eager`, `sdpa` and, on GPU,
+`flash_attention_2`) over a grid of batch sizes, source lengths and beam widths.
+
+For every point of the grid, random sources are translated with `generate` for a fixed number of tokens. The script
+reports the generated tokens per second and the peak memory, and whether the outputs are the same as with `eager`.
+It ends with the fastest implementation per grid point and overall. With `--save_best`, the overall winner is
+recorded as `default_attn_implementation` in the `config.json` of a local `--ckpt_dir`, which `from_pretrained` then
+uses when no `attn_implementation` is given (otherwise it picks `sdpa` when torch supports it).
+
+Usage (from the root directory):
+    python3 huggingface_interface/benchmark_attention.py --ckpt_dir ai4bharat/indictrans2-en-indic-dist-200M \\
+        --batch_sizes 1 8 32 --src_lengths 16 64 128 --num_beams 1 5 --output attn_benchmark.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import torch
+from transformers.utils import is_flash_attn_2_available
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from huggingface_interface.modeling_indictrans import IndicTransForConditionalGeneration
+
+IMPLEMENTATIONS = ("eager", "sdpa", "flash_attention_2")
+REFERENCE_IMPLEMENTATION = "eager"
+
+
+class PeakMemory:
+    """
+    Measures the peak memory used within a block, in MiB above the memory in use when entering it: allocated
+    tensors on GPU, resident set size (sampled every millisecond from `/proc/self/statm`) on CPU.
+    """
+
+    def __init__(self, device: str):
+        self.device = device
+        self.peak_mb = 0.0
+
+    @staticmethod
+    def _rss() -> int:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self._peak = max(self._peak, self._rss())
+            time.sleep(0.001)
+
+    def __enter__(self):
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+            self._start = torch.cuda.memory_allocated()
+        else:
+            self._start = self._peak = self._rss()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize()
+            peak = torch.cuda.max_memory_allocated()
+        else:
+            self._stop.set()
+            self._thread.join()
+            peak = self._peak
+        self.peak_mb = round((peak - self._start) / 2**20, 1)
+
+
+def available_implementations(requested: List[str], device: str) -> List[str]:
+    implementations = []
+    for implementation in requested:
+        if implementation == "flash_attention_2" and not (device.startswith("cuda") and is_flash_attn_2_available()):
+            print("Skipping flash_attention_2, which needs the flash-attn package and a GPU")
+            continue
+        implementations.append(implementation)
+    return implementations
+
+
+def random_batch(config, batch_size: int, src_length: int, seed: int) -> Dict[str, torch.Tensor]:
+    """
+    Random sources of `src_length` tokens, the second half of the batch left-padded to half of it.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    # ids below 4 are special tokens
+    input_ids = torch.randint(4, config.encoder_vocab_size, (batch_size, src_length), generator=generator)
+    input_ids[:, -1] = config.eos_token_id
+    attention_mask = torch.ones_like(input_ids)
+    attention_mask[batch_size // 2 :, : src_length // 2] = 0
+    input_ids = input_ids.masked_fill(attention_mask == 0, config.pad_token_id)
+    return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+@torch.no_grad()
+def run(args) -> dict:
+    dtype = getattr(torch, args.dtype)
+    implementations = available_implementations(args.implementations, args.device)
+
+    results, outputs = [], {}
+    for implementation in implementations:
+        model = IndicTransForConditionalGeneration.from_pretrained(
+            args.ckpt_dir, attn_implementation=implementation, torch_dtype=dtype
+        )
+        model = model.to(args.device).eval()
+
+        for batch_size in args.batch_sizes:
+            for src_length in args.src_lengths:
+                for num_beams in args.num_beams:
+                    inputs = random_batch(model.config, batch_size, src_length, args.seed)
+                    inputs = {k: v.to(args.device) for k, v in inputs.items()}
+                    kwargs = dict(
+                        num_beams=num_beams,
+                        max_new_tokens=args.max_new_tokens,
+                        min_new_tokens=args.max_new_tokens,
+                        do_sample=False,
+                    )
+
+                    model.generate(**inputs, **kwargs)  # warm-up
+                    with PeakMemory(args.device) as memory:
+                        start = time.perf_counter()
+                        for _ in range(args.repeats):
+                            generated = model.generate(**inputs, **kwargs)
+                        seconds = (time.perf_counter() - start) / args.repeats
+
+                    key = (batch_size, src_length, num_beams)
+                    outputs[implementation, key] = generated.cpu()
+                    row = {
+                        "attn_implementation": implementation,
+                        "batch_size": batch_size,
+                        "src_length": src_length,
+                        "num_beams": num_beams,
+                        "tokens_per_second": round(batch_size * args.max_new_tokens / seconds, 1),
+                        "peak_memory_mb": memory.peak_mb,
+                    }
+                    if (REFERENCE_IMPLEMENTATION, key) in outputs:
+                        row["same_as_eager"] = torch.equal(generated.cpu(), outputs[REFERENCE_IMPLEMENTATION, key])
+                    results.append(row)
+                    print(json.dumps(row))
+        del model
+
+    best_per_point = {}
+    for row in results:
+        key = f"bs={row['batch_size']},src_len={row['src_length']},beams={row['num_beams']}"
+        if key not in best_per_point or row["tokens_per_second"] > best_per_point[key]["tokens_per_second"]:
+            best_per_point[key] = row
+    wins = {x: sum(row["attn_implementation"] == x for row in best_per_point.values()) for x in implementations}
+    return {
+        "device": args.device,
+        "dtype": args.dtype,
+        "max_new_tokens": args.max_new_tokens,
+        "best": max(wins, key=wins.get),
+        "best_per_point": {key: row["attn_implementation"] for key, row in best_per_point.items()},
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt_dir", type=str, required=True, help="HF model directory or hub id")
+    parser.add_argument("--implementations", type=str, nargs="+", default=list(IMPLEMENTATIONS), choices=IMPLEMENTATIONS)
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--src_lengths", type=int, nargs="+", default=[16, 64, 128])
+    parser.add_argument("--num_beams", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--max_new_tokens", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--dtype", type=str, default="float32", choices=["float32", "float16", "bfloat16"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None, help="json file to write the results to")
+    parser.add_argument(
+        "--save_best", action="store_true", help="record the overall winner in the config.json of --ckpt_dir"
+    )
+    args = parser.parse_args()
+
+    config_file = os.path.join(args.ckpt_dir, "config.json")
+    if args.save_best and not os.path.isfile(config_file):
+        parser.error(f"--save_best needs a local --ckpt_dir, {config_file} does not exist")
+
+    report = run(args)
+    print(f"Best attention implementation: {report['best']}")
+    for key, implementation in report["best_per_point"].items():
+        print(f"  {key}: {implementation}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_best:
+        with open(config_file, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        config["default_attn_implementation"] = report["best"]
+        with open(config_file, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2)
+        print(f"Recorded default_attn_implementation={report['best']} in {config_file}")
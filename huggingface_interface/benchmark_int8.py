@@ -0,0 +1,156 @@
+"""
+Compares a dynamically int8-quantised model (see `quantize_int8.py`) with the float32 model it was quantised from, on
+CPU: BLEU on the bundled sample (`inference/sample_data`), throughput, model size and the fraction of sentences
+translated identically.
+
+Sentences are encoded with `inference.benchmark_utils.encode_sample` and the vocabulary of the checkpoint.
+
+Usage (from the root directory):
+    python3 huggingface_interface/benchmark_int8.py --ckpt_dir ai4bharat/indictrans2-en-indic-dist-200M \\
+        --int8_dir indictrans2-en-indic-dist-200M-int8 --src_lang eng_Latn --tgt_lang hin_Deva
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+import sentencepiece as spm
+import torch
+from sacrebleu.metrics import BLEU
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from huggingface_interface.modeling_indictrans import IndicTransForConditionalGeneration
+from huggingface_interface.quantize_int8 import load_quantized, local_model_files, quantize_model
+from inference.benchmark_utils import SAMPLE_DIR, encode_sample, find_spm_dir, read_lines
+
+
+class SampleCodec:
+    """
+    Maps raw sentences to source ids (`src_lang tgt_lang <pieces> </s>`) and generated ids back to text, with the
+    vocabularies of a model directory or hub id.
+    """
+
+    def __init__(self, model_dir: str):
+        self.model_dir = local_model_files(model_dir)
+        self.sp_tgt = spm.SentencePieceProcessor(model_file=os.path.join(find_spm_dir(self.model_dir), "model.TGT"))
+        with open(os.path.join(self.model_dir, "dict.SRC.json"), "r", encoding="utf-8") as f:
+            self.src_vocab = json.load(f)
+        with open(os.path.join(self.model_dir, "dict.TGT.json"), "r", encoding="utf-8") as f:
+            self.tgt_vocab = {i: token for token, i in json.load(f).items()}
+
+    def encode(self, sents: List[str], src_lang: str, tgt_lang: str) -> List[List[int]]:
+        unk_id = self.src_vocab["<unk>"]
+        return [
+            [self.src_vocab.get(x, unk_id) for x in tokens] + [self.src_vocab["</s>"]]
+            for tokens in encode_sample(self.model_dir, sents, src_lang, tgt_lang)
+        ]
+
+    def decode(self, ids: List[int], config) -> str:
+        special_ids = (config.pad_token_id, config.bos_token_id, config.decoder_start_token_id)
+        pieces = []
+        for i in ids:
+            if i == config.eos_token_id and pieces:
+                break
+            if i not in special_ids and i != config.eos_token_id:
+                pieces.append(self.tgt_vocab[i])
+        return self.sp_tgt.decode_pieces(pieces)
+
+
+def get_model_size(model: torch.nn.Module) -> int:
+    size = 0
+    for value in model.state_dict().values():
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if isinstance(tensor, torch.Tensor):
+                size += tensor.numel() * tensor.element_size()
+    return size
+
+
+@torch.no_grad()
+def translate(model, codec: SampleCodec, src_ids: List[List[int]], args) -> dict:
+    # sort by length so that batches have little padding
+    order = sorted(range(len(src_ids)), key=lambda i: len(src_ids[i]))
+    batches = [order[i : i + args.batch_size] for i in range(0, len(order), args.batch_size)]
+
+    def run(batch):
+        max_len = max(len(src_ids[i]) for i in batch)
+        input_ids = torch.full((len(batch), max_len), model.config.pad_token_id, dtype=torch.long)
+        for row, i in enumerate(batch):
+            input_ids[row, : len(src_ids[i])] = torch.tensor(src_ids[i])
+        return model.generate(
+            input_ids=input_ids,
+            attention_mask=(input_ids != model.config.pad_token_id).long(),
+            num_beams=args.num_beams,
+            max_new_tokens=args.max_new_tokens,
+        )
+
+    run(batches[0])  # warm-up
+    hyps, num_tokens = [None] * len(src_ids), 0
+    start = time.perf_counter()
+    for batch in batches:
+        for i, ids in zip(batch, run(batch).tolist()):
+            hyps[i] = codec.decode(ids, model.config)
+            num_tokens += sum(x not in (model.config.pad_token_id, model.config.decoder_start_token_id) for x in ids)
+    seconds = time.perf_counter() - start
+    return {
+        "hyps": hyps,
+        "sentences_per_second": round(len(src_ids) / seconds, 2),
+        "tokens_per_second": round(num_tokens / seconds, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt_dir", type=str, required=True, help="float32 HF model directory")
+    parser.add_argument("--int8_dir", type=str, default=None, help="model saved by quantize_int8.py, quantised on the fly if not given")
+    parser.add_argument("--keep_lm_head_fp32", action="store_true", help="when quantising on the fly")
+    parser.add_argument("--src_lang", type=str, default="eng_Latn", help="flores code of the sample source")
+    parser.add_argument("--tgt_lang", type=str, default="hin_Deva", help="flores code of the sample target")
+    parser.add_argument("--sample_dir", type=str, default=SAMPLE_DIR, help="directory with `sample.{lang}` files")
+    parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument("--num_beams", type=int, default=5)
+    parser.add_argument("--max_new_tokens", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--output", type=str, default=None, help="json file to write the report to")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    codec = SampleCodec(args.int8_dir or args.ckpt_dir)
+    src_ids = codec.encode(read_lines(os.path.join(args.sample_dir, f"sample.{args.src_lang}")), args.src_lang, args.tgt_lang)
+    ref_path = os.path.join(args.sample_dir, f"sample.{args.tgt_lang}")
+    refs = read_lines(ref_path) if os.path.isfile(ref_path) else None
+
+    model = IndicTransForConditionalGeneration.from_pretrained(args.ckpt_dir, torch_dtype=torch.float32).eval()
+    models = {"fp32": model}
+    if args.int8_dir:
+        models["int8"] = load_quantized(args.int8_dir)
+    else:
+        models["int8"] = quantize_model(
+            IndicTransForConditionalGeneration.from_pretrained(args.ckpt_dir, torch_dtype=torch.float32),
+            keep_lm_head_fp32=args.keep_lm_head_fp32,
+        )
+
+    report = []
+    for precision, model in models.items():
+        result = translate(model, codec, src_ids, args)
+        hyps = result.pop("hyps")
+        row = {"precision": precision, "size_mb": round(get_model_size(model) / 2**20, 1), **result}
+        if refs is not None:
+            row["bleu"] = round(BLEU().corpus_score(hyps, [refs]).score, 2)
+        if precision == "fp32":
+            fp32_hyps, fp32_row = hyps, row
+        else:
+            row["same_as_fp32"] = round(sum(h == r for h, r in zip(hyps, fp32_hyps)) / len(hyps), 4)
+            row["speedup"] = round(row["sentences_per_second"] / fp32_row["sentences_per_second"], 2)
+            if refs is not None:
+                row["bleu_drift"] = round(row["bleu"] - fp32_row["bleu"], 2)
+        report.append(row)
+        print(json.dumps(row))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
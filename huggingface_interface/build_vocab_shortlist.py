@@ -0,0 +1,213 @@
+"""
+Builds the per-target-language vocabulary shortlists used by `IndicTransForConditionalGeneration.set_output_vocab`.
+
+The shortlist of a target language keeps the target pieces that the model can produce for it:
+    - special tokens and pieces without letters (punctuation, digits, danda, ...), for every language,
+    - pieces written in the output script of the language or in one of `--common_scripts` (Latin by default, for
+      placeholders, acronyms and untranslated names). The output script is the script of the model outputs, not
+      of the final translations: like `inference/engine.py`, IndicTrans2 generates the languages that are not
+      written in Arab, Aran, Olck, Mtei or Latn in Devanagari, and `postprocess` transliterates them back, so the
+      output script of e.g. `tam_Taml` is `Deva`,
+    - with `--data_dir`, pieces seen at least `--min_count` times in the training targets of the language, in any
+      script. With `--seen_only`, unseen pieces of the script are dropped as well.
+
+The training data follows the layout of `train_lora.py`: `<data_dir>/train/{src_lang}-{tgt_lang}/train.{tgt_lang}`.
+Target lines are counted as they are in the files, so give them preprocessed like the model outputs (normalized and
+transliterated to Devanagari, as written by `prepare_data_joint_training.sh`), not raw.
+
+With `--check_src_file`, the model translates the sentences of the file to every target language with its full
+vocabulary and with its shortlist, and the outputs are compared. The script exits with an error if they differ.
+
+Usage (from the root directory):
+    python3 huggingface_interface/build_vocab_shortlist.py --ckpt_dir ai4bharat/indictrans2-en-indic-dist-200M \\
+        --tgt_langs hin_Deva tam_Taml ben_Beng --output shortlist.json \\
+        --check_src_file inference/sample_data/sample.eng_Latn
+    python3 huggingface_interface/build_vocab_shortlist.py --ckpt_dir indictrans2-en-indic-dist-200M \\
+        --data_dir en-indic-exp --min_count 2 --seen_only --output shortlist.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+import sentencepiece as spm
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from huggingface_interface.modeling_indictrans import IndicTransVocabShortlist
+from huggingface_interface.quantize_int8 import local_model_files
+from inference.lang_id import char_script, lang_script
+
+SPECIAL_TOKENS = ("<s>", "<pad>", "</s>", "<unk>")
+
+# scripts the model generates as they are, the other languages are generated in Devanagari (see `inference/engine.py`)
+NATIVE_OUTPUT_SCRIPTS = ("Arab", "Olck", "Mtei", "Latn")
+
+
+def output_script(tgt_lang: str) -> str:
+    """
+    Returns the script of the pieces the model generates for a FLORES language code, e.g. `Deva` for `tam_Taml` and
+    `Arab` for `urd_Arab` and `kas_Aran`.
+    """
+    script = lang_script(tgt_lang)
+    return script if script in NATIVE_OUTPUT_SCRIPTS else "Deva"
+
+
+def piece_scripts(piece: str) -> Set[Optional[str]]:
+    """
+    Scripts of the letters and marks of a piece (`None` for an unknown script), empty for pieces without letters.
+    """
+    return {char_script(c) for c in piece if unicodedata.category(c)[0] in "LM"}
+
+
+def load_vocab(ckpt_dir: str) -> Dict[str, int]:
+    with open(os.path.join(ckpt_dir, "dict.TGT.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_spm_model(ckpt_dir: str, side: str = "TGT") -> str:
+    for path in (os.path.join(ckpt_dir, f"model.{side}"), os.path.join(ckpt_dir, "vocab", f"model.{side}")):
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError(f"Sentence piece model model.{side} not found in {ckpt_dir}")
+
+
+def count_target_pieces(data_dir: str, sp_tgt: spm.SentencePieceProcessor) -> Dict[str, Counter]:
+    """
+    Counts the target pieces of the training data of every target language.
+    """
+    counts = {}
+    for pair_dir in sorted(glob.glob(os.path.join(data_dir, "train", "*-*"))):
+        tgt_lang = os.path.basename(pair_dir).split("-", 1)[1]
+        path = os.path.join(pair_dir, f"train.{tgt_lang}")
+        if not os.path.isfile(path):
+            continue
+        counter = counts.setdefault(tgt_lang, Counter())
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                counter.update(sp_tgt.encode(line.strip(), out_type=str))
+    return counts
+
+
+def build(args, vocab_dir: str) -> Tuple[IndicTransVocabShortlist, Dict[str, Counter]]:
+    vocab = load_vocab(vocab_dir)
+    vocab_size = max(vocab.values()) + 1
+    scripts = {piece: piece_scripts(piece.replace("▁", "")) for piece in vocab}
+
+    always = [vocab[token] for token in SPECIAL_TOKENS if token in vocab]
+    always += [i for piece, i in vocab.items() if not scripts[piece]]
+
+    counts = {}
+    if args.data_dir:
+        counts = count_target_pieces(args.data_dir, spm.SentencePieceProcessor(model_file=find_spm_model(vocab_dir)))
+    tgt_langs = args.tgt_langs or sorted(counts)
+    if not tgt_langs:
+        raise ValueError("Give the target languages with --tgt_langs or training data with --data_dir")
+
+    languages = {}
+    for tgt_lang in tgt_langs:
+        if args.seen_only and tgt_lang not in counts:
+            raise ValueError(f"--seen_only needs training data for {tgt_lang}")
+        allowed = {output_script(tgt_lang), *args.common_scripts}
+        seen = {piece for piece, count in counts.get(tgt_lang, {}).items() if count >= args.min_count}
+        languages[tgt_lang] = [
+            i
+            for piece, i in vocab.items()
+            if piece in seen or (not args.seen_only and scripts[piece] and scripts[piece] <= allowed)
+        ]
+    return IndicTransVocabShortlist(vocab_size, always, languages), counts
+
+
+def report(shortlist: IndicTransVocabShortlist, counts: Dict[str, Counter], vocab: Dict[str, int]) -> List[dict]:
+    """
+    Size of every shortlist, and the fraction of the training target pieces it covers when counts are given.
+    """
+    rows = []
+    for tgt_lang in sorted(shortlist.languages):
+        ids = set(shortlist.token_ids([tgt_lang]).tolist())
+        row = {"tgt_lang": tgt_lang, "size": len(ids), "fraction_of_vocab": round(len(ids) / shortlist.vocab_size, 4)}
+        if tgt_lang in counts:
+            total = sum(counts[tgt_lang].values())
+            covered = sum(count for piece, count in counts[tgt_lang].items() if vocab.get(piece, vocab["<unk>"]) in ids)
+            row["training_coverage"] = round(covered / max(total, 1), 6)
+        rows.append(row)
+    return rows
+
+
+def check_outputs(
+    ckpt_dir: str,
+    vocab_dir: str,
+    shortlist: IndicTransVocabShortlist,
+    src_lang: str,
+    sents: List[str],
+    num_beams: int = 5,
+    max_length: int = 256,
+) -> List[dict]:
+    """
+    Translates `sents` to every language of `shortlist` with the full vocabulary and with the shortlist of the
+    language, and returns the fraction of identical outputs per language. Sentences are only encoded with the
+    source sentence piece model of `vocab_dir`, which is enough to compare the two vocabularies.
+    """
+    import torch
+    from huggingface_interface.modeling_indictrans import IndicTransForConditionalGeneration
+
+    model = IndicTransForConditionalGeneration.from_pretrained(ckpt_dir).eval()
+    with open(os.path.join(vocab_dir, "dict.SRC.json"), "r", encoding="utf-8") as f:
+        src_vocab = json.load(f)
+    sp_src = spm.SentencePieceProcessor(model_file=find_spm_model(vocab_dir, "SRC"))
+    pieces = sp_src.encode(sents, out_type=str)
+
+    rows = []
+    for tgt_lang in sorted(shortlist.languages):
+        ids = [[src_vocab.get(t, src_vocab["<unk>"]) for t in [src_lang, tgt_lang] + p] + [src_vocab["</s>"]] for p in pieces]
+        max_len = max(len(x) for x in ids)
+        input_ids = torch.tensor([x + [src_vocab["<pad>"]] * (max_len - len(x)) for x in ids])
+        attention_mask = torch.tensor([[1] * len(x) + [0] * (max_len - len(x)) for x in ids])
+
+        outputs = []
+        for token_ids in (None, shortlist.token_ids([tgt_lang])):
+            model.set_output_vocab(token_ids)
+            with torch.no_grad():
+                outputs.append(
+                    model.generate(
+                        input_ids=input_ids, attention_mask=attention_mask, num_beams=num_beams, max_length=max_length
+                    ).tolist()
+                )
+        model.set_output_vocab(None)
+        identical = sum(a == b for a, b in zip(*outputs)) / len(sents)
+        rows.append({"tgt_lang": tgt_lang, "sentences": len(sents), "identical_to_full_vocab": round(identical, 4)})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt_dir", type=str, required=True, help="HF model directory or hub id")
+    parser.add_argument("--tgt_langs", type=str, nargs="+", default=None, help="defaults to the languages of --data_dir")
+    parser.add_argument("--data_dir", type=str, default=None, help="training data, in the layout of train_lora.py")
+    parser.add_argument("--common_scripts", type=str, nargs="*", default=["Latn"])
+    parser.add_argument("--min_count", type=int, default=1)
+    parser.add_argument("--seen_only", action="store_true", help="keep only pieces seen in the training targets")
+    parser.add_argument("--output", type=str, required=True)
+    parser.add_argument("--check_src_file", type=str, default=None, help="sentences translated to check the shortlists")
+    parser.add_argument("--check_src_lang", type=str, default="eng_Latn", help="FLORES code of --check_src_file")
+    args = parser.parse_args()
+
+    # the vocabularies are read from a local directory, a snapshot of the files of a hub id
+    vocab_dir = local_model_files(args.ckpt_dir)
+    shortlist, counts = build(args, vocab_dir)
+    shortlist.save(args.output)
+    for row in report(shortlist, counts, load_vocab(vocab_dir)):
+        print(json.dumps(row))
+
+    if args.check_src_file:
+        with open(args.check_src_file, "r", encoding="utf-8") as f:
+            sents = [line.strip() for line in f]
+        rows = check_outputs(args.ckpt_dir, vocab_dir, shortlist, args.check_src_lang, sents)
+        for row in rows:
+            print(json.dumps(row))
+        if any(row["identical_to_full_vocab"] < 1.0 for row in rows):
+            sys.exit("The shortlisted model translates differently from the full vocabulary")
@@ -78,6 +78,17 @@ class IndicTransConfig(PretrainedConfig):
             for more details.
         use_cache (`bool`, *optional*, defaults to `True`):
             Whether or not the model should return the last key/values attentions (not used by all models).
+        attn_implementation (`str`, *optional*):
+            Attention implementation, one of `"eager"`, `"sdpa"` or `"flash_attention_2"`. Defaults to
+            `default_attn_implementation`, then to `"sdpa"` when torch supports it, `"eager"` otherwise.
+        default_attn_implementation (`str`, *optional*):
+            Attention implementation used when `from_pretrained` is not given `attn_implementation`, as recorded by
+            `benchmark_attention.py --save_best`. A recorded `"flash_attention_2"` is skipped when flash-attn is not
+            available.
+        static_position_embeddings (`bool`, *optional*, defaults to `False`):
+            Whether the sinusoidal position tables are fixed to `max_source_positions`/`max_target_positions`. Incremental
+            decoding then looks positions up at the cache offset, and longer inputs raise an error instead of
+            regrowing the tables.
     ```"""
     model_type = "IndicTrans"
     keys_to_ignore_at_inference = ["past_key_values"]
@@ -118,7 +129,9 @@ class IndicTransConfig(PretrainedConfig):
         pad_token_id=1,
         bos_token_id=0,
         eos_token_id=2,
-        attn_implementation="eager",
+        attn_implementation=None,
+        default_attn_implementation=None,
+        static_position_embeddings=False,
         **kwargs,
     ):
         self.encoder_vocab_size = encoder_vocab_size
@@ -147,7 +160,8 @@ class IndicTransConfig(PretrainedConfig):
         self.num_hidden_layers = encoder_layers
         self.scale_embedding = scale_embedding
         self.share_decoder_input_output_embed = share_decoder_input_output_embed
-        self.attn_implementation = attn_implementation
+        self.static_position_embeddings = static_position_embeddings
+        self.default_attn_implementation = default_attn_implementation
         
         super().__init__(
             pad_token_id=pad_token_id,
@@ -155,6 +169,7 @@ class IndicTransConfig(PretrainedConfig):
             eos_token_id=eos_token_id,
             is_encoder_decoder=is_encoder_decoder,
             decoder_start_token_id=decoder_start_token_id,
+            attn_implementation=attn_implementation,
             **kwargs,
         )
 
@@ -0,0 +1,109 @@
+"""
+Evaluates several variants of a model side by side on CPU: the full checkpoint, reduced-decoder variants from
+`prune_decoder.py`, and their recovery fine-tunes from `train_lora.py` (full models or LoRA adapters, which are
+merged into their base model). The report gives, per variant, the number of decoder layers and parameters, BLEU and
+chrF, throughput, and the speedup and BLEU drift relative to the first variant.
+
+Sentences are encoded as in `benchmark_int8.py`.
+
+Usage (from the root directory):
+    python3 huggingface_interface/evaluate_variants.py --variants ai4bharat/indictrans2-en-indic-dist-200M \\
+        pruned/alternate pruned/top-6 recovered/alternate --src_lang eng_Latn --tgt_lang hin_Deva
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+import torch
+from sacrebleu.metrics import BLEU, CHRF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from huggingface_interface.benchmark_int8 import SampleCodec, translate
+from inference.benchmark_utils import SAMPLE_DIR, read_lines
+from huggingface_interface.modeling_indictrans import IndicTransForConditionalGeneration
+
+
+def load_variant(path: str) -> IndicTransForConditionalGeneration:
+    """
+    Loads a model directory, or a LoRA adapter directory merged into its base model.
+    """
+    if os.path.isfile(os.path.join(path, "adapter_config.json")):
+        from peft import PeftModel
+
+        with open(os.path.join(path, "adapter_config.json"), "r", encoding="utf-8") as f:
+            base_path = json.load(f)["base_model_name_or_path"]
+        model = IndicTransForConditionalGeneration.from_pretrained(base_path, torch_dtype=torch.float32)
+        model = PeftModel.from_pretrained(model, path).merge_and_unload()
+    else:
+        model = IndicTransForConditionalGeneration.from_pretrained(path, torch_dtype=torch.float32)
+    return model.eval()
+
+
+def evaluate(
+    variants: List[str], codec: SampleCodec, src_ids: List[List[int]], refs: Optional[List[str]], args
+) -> List[dict]:
+    report = []
+    for path in variants:
+        model = load_variant(path)
+        result = translate(model, codec, src_ids, args)
+        hyps = result.pop("hyps")
+        row = {
+            "variant": path,
+            "decoder_layers": model.config.decoder_layers,
+            "params_m": round(sum(p.numel() for p in model.parameters()) / 1e6, 1),
+            **result,
+        }
+        if refs is not None:
+            row["bleu"] = round(BLEU().corpus_score(hyps, [refs]).score, 2)
+            row["chrf"] = round(CHRF().corpus_score(hyps, [refs]).score, 2)
+        if report:
+            row["speedup"] = round(row["sentences_per_second"] / report[0]["sentences_per_second"], 2)
+            if refs is not None:
+                row["bleu_drift"] = round(row["bleu"] - report[0]["bleu"], 2)
+        report.append(row)
+        print(json.dumps(row))
+        del model
+    return report
+
+
+def add_eval_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--src_lang", type=str, default="eng_Latn", help="flores code of the sample source")
+    parser.add_argument("--tgt_lang", type=str, default="hin_Deva", help="flores code of the sample target")
+    parser.add_argument("--sample_dir", type=str, default=SAMPLE_DIR, help="directory with `sample.{lang}` files")
+    parser.add_argument("--src_file", type=str, default=None, help="source sentences, instead of the sample")
+    parser.add_argument("--ref_file", type=str, default=None, help="references of --src_file")
+    parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument("--num_beams", type=int, default=5)
+    parser.add_argument("--max_new_tokens", type=int, default=256)
+
+
+def load_eval_data(args, model_dir: str):
+    """
+    Returns:
+        Tuple[SampleCodec, List[List[int]], Optional[List[str]]]: the codec of `model_dir`, the encoded sources and
+            the references (`None` if there are none).
+    """
+    src_path = args.src_file or os.path.join(args.sample_dir, f"sample.{args.src_lang}")
+    ref_path = args.ref_file or os.path.join(args.sample_dir, f"sample.{args.tgt_lang}")
+    codec = SampleCodec(model_dir)
+    src_ids = codec.encode(read_lines(src_path), args.src_lang, args.tgt_lang)
+    refs = read_lines(ref_path) if os.path.isfile(ref_path) else None
+    return codec, src_ids, refs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variants", type=str, nargs="+", required=True, help="model or LoRA adapter directories, the first one is the reference")
+    parser.add_argument("--vocab_dir", type=str, default=None, help="directory with the vocabularies, defaults to the first variant")
+    add_eval_args(parser)
+    parser.add_argument("--output", type=str, default=None, help="json file to write the report to")
+    args = parser.parse_args()
+
+    codec, src_ids, refs = load_eval_data(args, args.vocab_dir or args.variants[0])
+    report = evaluate(args.variants, codec, src_ids, refs, args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
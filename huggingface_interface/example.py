@@ -1,4 +1,6 @@
+import os
 import sys
+from functools import lru_cache
 import torch
 from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, BitsAndBytesConfig
 from transformers.utils import is_flash_attn_2_available, is_flash_attn_greater_or_equal_2_10
@@ -7,6 +9,9 @@ from mosestokenizer import MosesSentenceSplitter
 from nltk import sent_tokenize
 from indicnlp.tokenize.sentence_tokenize import sentence_split, DELIM_PAT_NO_DANDA
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference.length_ratio import LengthLimits
+
 
 en_indic_ckpt_dir = "ai4bharat/indictrans2-en-indic-1B"  # ai4bharat/indictrans2-en-indic-dist-200M
 indic_en_ckpt_dir = "ai4bharat/indictrans2-indic-en-1B"  # ai4bharat/indictrans2-indic-en-dist-200M
@@ -21,7 +26,10 @@ if len(sys.argv) > 1:
     attn_implementation = sys.argv[2]
 else:
     quantization = ""
-    attn_implementation = "eager"
+    attn_implementation = None  # sdpa when supported by torch
+
+if quantization == "int8":
+    DEVICE = "cpu"  # dynamic int8 quantisation runs on CPU, see quantize_int8.py
 
 
 # FLORES language code mapping to 2 letter ISO language code for compatibility
@@ -100,7 +108,7 @@ def initialize_model_and_tokenizer(ckpt_dir, quantization, attn_implementation):
         if is_flash_attn_2_available() and is_flash_attn_greater_or_equal_2_10():
             attn_implementation = "flash_attention_2"
         else:
-            attn_implementation = "eager"
+            attn_implementation = None
 
     tokenizer = AutoTokenizer.from_pretrained(ckpt_dir, trust_remote_code=True)
     model = AutoModelForSeq2SeqLM.from_pretrained(
@@ -111,7 +119,11 @@ def initialize_model_and_tokenizer(ckpt_dir, quantization, attn_implementation):
         quantization_config=qconfig,
     )
 
-    if qconfig == None:
+    if quantization == "int8":
+        from quantize_int8 import quantize_model
+
+        model = quantize_model(model)
+    elif qconfig == None:
         model = model.to(DEVICE)
         model.half()
 
@@ -120,7 +132,15 @@ def initialize_model_and_tokenizer(ckpt_dir, quantization, attn_implementation):
     return tokenizer, model
 
 
+@lru_cache()
+def load_length_limits(ckpt_dir):
+    # translations are cut off after `a * source_length + b` tokens, fitted per direction in
+    # `<ckpt_dir>/length_ratio.json` by inference/length_ratio.py, or after 256 tokens for checkpoints without it
+    return LengthLimits.load(ckpt_dir)
+
+
 def batch_translate(input_sentences, src_lang, tgt_lang, model, tokenizer, ip):
+    length_limits = load_length_limits(model.config._name_or_path)
     translations = []
     for i in range(0, len(input_sentences), BATCH_SIZE):
         batch = input_sentences[i : i + BATCH_SIZE]
@@ -137,15 +157,22 @@ def batch_translate(input_sentences, src_lang, tgt_lang, model, tokenizer, ip):
             return_attention_mask=True,
         ).to(DEVICE)
 
-        # Generate translations using the model
+        # The longest source of the batch (without its language tags and </s>) bounds the translation length
+        src_len = int(inputs["attention_mask"].sum(dim=1).max()) - 3
+        max_new_tokens = length_limits.direction_max_length(
+            src_lang, tgt_lang, src_len, length_limits.max_decoding_length - 1
+        )
+
+        # Generate translations using the model, stopping as soon as every beam has finished
         with torch.no_grad():
             generated_tokens = model.generate(
                 **inputs,
                 use_cache=True,
                 min_length=0,
-                max_length=256,
+                max_new_tokens=max_new_tokens,
                 num_beams=5,
                 num_return_sequences=1,
+                early_stopping=True,
             )
 
         # Decode the generated tokens into text
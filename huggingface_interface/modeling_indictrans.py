@@ -15,8 +15,10 @@
 """ PyTorch IndicTrans model."""
 
 
+import json
 import math
-from typing import List, Optional, Tuple, Union
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import torch
 import torch.nn as nn
@@ -40,6 +42,7 @@ from transformers.modeling_outputs import (
 )
 
 from transformers.utils import (
+    ModelOutput,
     logging,
     is_flash_attn_2_available,
     is_flash_attn_greater_or_equal_2_10,
@@ -111,15 +114,27 @@ def create_position_ids_from_input_ids(
 
 # Copied from transformers.models.m2m_100.modeling_m2m_100.M2M100SinusoidalPositionalEmbedding->IndicTrans
 class IndicTransSinusoidalPositionalEmbedding(nn.Module):
-    """This module produces sinusoidal positional embeddings of any length."""
+    """
+    This module produces sinusoidal positional embeddings of any length.
+
+    With `static=True`, the table is only built at init for `num_positions` and never regrown: longer inputs raise a
+    `ValueError`, and incremental decoding (`past_key_values_length > 0`) slices the table at the cache offset instead
+    of recomputing padding-aware positions at every step. Both give the same positions as long as the decoder does
+    not generate the padding token.
+    """
 
     def __init__(
-        self, num_positions: int, embedding_dim: int, padding_idx: Optional[int] = None
+        self,
+        num_positions: int,
+        embedding_dim: int,
+        padding_idx: Optional[int] = None,
+        static: bool = False,
     ):
         super().__init__()
         self.offset = 2
         self.embedding_dim = embedding_dim
         self.padding_idx = padding_idx
+        self.static = static
         self.make_weights(num_positions + self.offset, embedding_dim, padding_idx)
 
     def make_weights(
@@ -170,18 +185,31 @@ class IndicTransSinusoidalPositionalEmbedding(nn.Module):
     ):
         if input_ids is not None:
             bsz, seq_len = input_ids.size()
+        else:
+            bsz, seq_len = inputs_embeds.size()[:-1]
+
+        max_pos = self.padding_idx + 1 + seq_len + past_key_values_length
+        if self.static:
+            if max_pos > self.weights.size(0):
+                raise ValueError(
+                    f"{seq_len + past_key_values_length} positions do not fit in the static position table of "
+                    f"{self.weights.size(0) - self.padding_idx - 1} positions"
+                )
+            if past_key_values_length > 0:
+                start = self.padding_idx + 1 + past_key_values_length
+                return self.weights[start : start + seq_len].unsqueeze(0).expand(bsz, -1, -1)
+
+        if input_ids is not None:
             # Create the position ids from the input token ids. Any padded tokens remain padded.
             position_ids = create_position_ids_from_input_ids(
                 input_ids, self.padding_idx, past_key_values_length
             ).to(input_ids.device)
         else:
-            bsz, seq_len = inputs_embeds.size()[:-1]
             position_ids = self.create_position_ids_from_inputs_embeds(
                 inputs_embeds, past_key_values_length
             )
 
         # expand embeddings if needed
-        max_pos = self.padding_idx + 1 + seq_len + past_key_values_length
         if max_pos > self.weights.size(0):
             self.make_weights(
                 max_pos + self.offset, self.embedding_dim, self.padding_idx
@@ -219,6 +247,139 @@ class IndicTransSinusoidalPositionalEmbedding(nn.Module):
         )
 
 
+class IndicTransStaticCache:
+    """
+    Preallocated key/value cache for incremental decoding. The default cache grows the self-attention keys/values by
+    concatenation at every step, and `_reorder_cache` copies all of them, cross-attention included, at every beam
+    search step.
+
+    Here, self-attention keys/values are written in place into per-layer buffers of shape
+    `(batch_size * num_beams, num_heads, max_length, head_dim)` allocated at the first decoding step. Beams are
+    reordered into a scratch buffer which is then swapped in, so no memory is allocated after the first step.
+    Cross-attention keys/values are computed once from the encoder output. Beam search only reorders the hypotheses of
+    a same source, which share them, so they are never reordered.
+
+    Example:
+
+    ```python
+    >>> cache = IndicTransStaticCache(model.config, max_length=256)
+    >>> outputs = model.generate(**inputs, num_beams=5, max_length=256, past_key_values=cache)
+    >>> cache.reset()  # before reusing the buffers for the next batch
+    ```
+
+    Args:
+        config (`IndicTransConfig`): model configuration.
+        max_length (`int`, *optional*): maximum number of decoder tokens, defaults to `config.max_target_positions`.
+    """
+
+    def __init__(self, config: IndicTransConfig, max_length: Optional[int] = None):
+        self.num_layers = config.decoder_layers
+        self.num_heads = config.decoder_attention_heads
+        self.head_dim = config.decoder_embed_dim // config.decoder_attention_heads
+        self.max_length = max_length or config.max_target_positions
+
+        self.key_cache: List[torch.Tensor] = []
+        self.value_cache: List[torch.Tensor] = []
+        self._scratch = None
+        self._empty = torch.empty(0, 0, 0, 0)
+        self.layers = [IndicTransStaticCacheLayer(self, idx) for idx in range(self.num_layers)]
+        self.reset()
+
+    def reset(self):
+        """Empties the cache while keeping its buffers, so it can be reused by another `generate` call."""
+        self.seq_lengths = [0] * self.num_layers
+        self.cross_key_cache = [None] * self.num_layers
+        self.cross_value_cache = [None] * self.num_layers
+
+    def get_seq_length(self) -> int:
+        return self.seq_lengths[0]
+
+    def __len__(self):
+        return self.num_layers
+
+    def __getitem__(self, layer_idx: int) -> Tuple[torch.Tensor]:
+        # legacy `(self_k, self_v, cross_k, cross_v)` view, used to read the past length
+        if not self.key_cache:
+            return (self._empty, self._empty)
+        seq_length = self.seq_lengths[layer_idx]
+        return (
+            self.key_cache[layer_idx][:, :, :seq_length],
+            self.value_cache[layer_idx][:, :, :seq_length],
+            self.cross_key_cache[layer_idx],
+            self.cross_value_cache[layer_idx],
+        )
+
+    def _allocate(self, like: torch.Tensor):
+        shape = (like.shape[0], self.num_heads, self.max_length, self.head_dim)
+        if (
+            self.key_cache
+            and self.key_cache[0].shape == shape
+            and self.key_cache[0].dtype == like.dtype
+            and self.key_cache[0].device == like.device
+        ):
+            return
+        self.key_cache = [like.new_zeros(shape) for _ in range(self.num_layers)]
+        self.value_cache = [like.new_zeros(shape) for _ in range(self.num_layers)]
+        self._scratch = like.new_zeros(shape)
+
+    def update(
+        self, layer_idx: int, key_states: torch.Tensor, value_states: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Writes the keys/values of the new tokens of a layer and returns views over all the cached ones.
+        """
+        if layer_idx == 0 and self.seq_lengths[0] == 0:
+            self._allocate(key_states)
+
+        start = self.seq_lengths[layer_idx]
+        end = start + key_states.shape[2]
+        if end > self.max_length:
+            raise ValueError(
+                f"IndicTransStaticCache holds at most {self.max_length} tokens, increase its `max_length`."
+            )
+        self.key_cache[layer_idx][:, :, start:end] = key_states
+        self.value_cache[layer_idx][:, :, start:end] = value_states
+        self.seq_lengths[layer_idx] = end
+        return (
+            self.key_cache[layer_idx][:, :, :end],
+            self.value_cache[layer_idx][:, :, :end],
+        )
+
+    def reorder_cache(self, beam_idx: torch.LongTensor):
+        """Reorders the self-attention keys/values of the beams, called by `generate` at every beam search step."""
+        if not self.key_cache:
+            return
+        beam_idx = beam_idx.to(self._scratch.device)
+        seq_length = self.seq_lengths[0]
+        for cache in (self.key_cache, self.value_cache):
+            for layer_idx in range(self.num_layers):
+                torch.index_select(
+                    cache[layer_idx][:, :, :seq_length],
+                    0,
+                    beam_idx,
+                    out=self._scratch[:, :, :seq_length],
+                )
+                cache[layer_idx], self._scratch = self._scratch, cache[layer_idx]
+
+
+class IndicTransStaticCacheLayer:
+    """Handle passed to the attention modules of one decoder layer when decoding with an `IndicTransStaticCache`."""
+
+    def __init__(self, cache: IndicTransStaticCache, layer_idx: int):
+        self.cache = cache
+        self.layer_idx = layer_idx
+
+    def update(self, key_states: torch.Tensor, value_states: torch.Tensor):
+        return self.cache.update(self.layer_idx, key_states, value_states)
+
+    def get_cross_attention(self) -> Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]:
+        return self.cache.cross_key_cache[self.layer_idx], self.cache.cross_value_cache[self.layer_idx]
+
+    def set_cross_attention(self, key_states: torch.Tensor, value_states: torch.Tensor):
+        self.cache.cross_key_cache[self.layer_idx] = key_states
+        self.cache.cross_value_cache[self.layer_idx] = value_states
+
+
 # Copied from transformers.models.bart.modeling_bart.BartAttention with Bart->IndicTrans
 class IndicTransAttention(nn.Module):
     """Multi-headed attention from 'Attention Is All You Need' paper"""
@@ -261,6 +422,47 @@ class IndicTransAttention(nn.Module):
             .contiguous()
         )
 
+    def _static_cache_key_value(
+        self,
+        hidden_states: torch.Tensor,
+        key_value_states: Optional[torch.Tensor],
+        cache_layer: IndicTransStaticCacheLayer,
+        bsz: int,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        if key_value_states is None:
+            return cache_layer.update(
+                self._shape(self.k_proj(hidden_states), -1, bsz),
+                self._shape(self.v_proj(hidden_states), -1, bsz),
+            )
+        key_states, value_states = cache_layer.get_cross_attention()
+        if key_states is None:
+            key_states = self._shape(self.k_proj(key_value_states), -1, key_value_states.shape[0])
+            value_states = self._shape(self.v_proj(key_value_states), -1, key_value_states.shape[0])
+            cache_layer.set_cross_attention(key_states, value_states)
+        return key_states, value_states
+
+    def _group_by_source(self, states: torch.Tensor, num_sources: int) -> torch.Tensor:
+        # (num_sources * group_size, heads, tgt_len, head_dim) -> (num_sources, heads, group_size * tgt_len, head_dim)
+        bsz, num_heads, tgt_len, head_dim = states.shape
+        return (
+            states.view(num_sources, bsz // num_sources, num_heads, tgt_len, head_dim)
+            .transpose(1, 2)
+            .reshape(num_sources, num_heads, -1, head_dim)
+        )
+
+    def _ungroup_by_source(self, states: torch.Tensor, bsz: int, tgt_len: int) -> torch.Tensor:
+        num_sources, num_heads, _, head_dim = states.shape
+        return (
+            states.view(num_sources, num_heads, bsz // num_sources, tgt_len, head_dim)
+            .transpose(1, 2)
+            .reshape(bsz, num_heads, tgt_len, head_dim)
+        )
+
+    def _expand_to_rows(self, states: Optional[torch.Tensor], bsz: int) -> Optional[torch.Tensor]:
+        if states is None:
+            return None
+        return states.repeat_interleave(bsz // states.shape[0], dim=0)
+
     def forward(
         self,
         hidden_states: torch.Tensor,
@@ -284,7 +486,12 @@ class IndicTransAttention(nn.Module):
         # `past_key_value[0].shape[2] == key_value_states.shape[1]`
         # is checking that the `sequence_length` of the `past_key_value` is the same as
         # the provided `key_value_states` to support prefix tuning
-        if (
+        if isinstance(past_key_value, IndicTransStaticCacheLayer):
+            # preallocated cache, see `IndicTransStaticCache`
+            key_states, value_states = self._static_cache_key_value(
+                hidden_states, key_value_states, past_key_value, bsz
+            )
+        elif (
             is_cross_attention
             and past_key_value is not None
             and past_key_value[0].shape[2] == key_value_states.shape[1]
@@ -294,8 +501,8 @@ class IndicTransAttention(nn.Module):
             value_states = past_key_value[1]
         elif is_cross_attention:
             # cross_attentions
-            key_states = self._shape(self.k_proj(key_value_states), -1, bsz)
-            value_states = self._shape(self.v_proj(key_value_states), -1, bsz)
+            key_states = self._shape(self.k_proj(key_value_states), -1, key_value_states.shape[0])
+            value_states = self._shape(self.v_proj(key_value_states), -1, key_value_states.shape[0])
         elif past_key_value is not None:
             # reuse k, v, self_attention
             key_states = self._shape(self.k_proj(hidden_states), -1, bsz)
@@ -307,7 +514,7 @@ class IndicTransAttention(nn.Module):
             key_states = self._shape(self.k_proj(hidden_states), -1, bsz)
             value_states = self._shape(self.v_proj(hidden_states), -1, bsz)
 
-        if self.is_decoder:
+        if self.is_decoder and not isinstance(past_key_value, IndicTransStaticCacheLayer):
             # if cross_attention save Tuple(torch.Tensor, torch.Tensor) of all cross attention key/value_states.
             # Further calls to cross_attention layer can then reuse all cross-attention
             # key/value_states (first "if" case)
@@ -317,6 +524,26 @@ class IndicTransAttention(nn.Module):
             # if encoder bi-directional self-attention `past_key_value` is always `None`
             past_key_value = (key_states, value_states)
 
+        # the encoder output may be kept once per source for several decoder rows (e.g. the beams of a source),
+        # decoder row `i` then attends to source `i // (bsz // num_sources)`
+        num_sources = key_states.shape[0]
+        if num_sources != bsz:
+            if output_attentions or layer_head_mask is not None:
+                key_states = self._expand_to_rows(key_states, bsz)
+                value_states = self._expand_to_rows(value_states, bsz)
+                attention_mask = self._expand_to_rows(attention_mask, bsz)
+            else:
+                query_states = self._group_by_source(self._shape(query_states, tgt_len, bsz), num_sources)
+                attn_weights = torch.matmul(query_states, key_states.transpose(2, 3))
+                if attention_mask is not None:
+                    # identical for every query position
+                    attn_weights = attn_weights + attention_mask[:, :, :1]
+                attn_weights = F.softmax(attn_weights, dim=-1)
+                attn_probs = F.dropout(attn_weights, p=self.dropout, training=self.training)
+                attn_output = self._ungroup_by_source(torch.matmul(attn_probs, value_states), bsz, tgt_len)
+                attn_output = attn_output.transpose(1, 2).reshape(bsz, tgt_len, self.embed_dim)
+                return self.out_proj(attn_output), None, past_key_value
+
         proj_shape = (bsz * self.num_heads, -1, self.head_dim)
         query_states = self._shape(query_states, tgt_len, bsz).view(*proj_shape)
         key_states = key_states.reshape(*proj_shape)
@@ -422,6 +649,8 @@ class IndicTransFlashAttention2(IndicTransAttention):
         # IndicTransFlashAttention2 attention does not support output_attentions
         if output_attentions:
             raise ValueError("IndicTransFlashAttention2 attention does not support output_attentions")
+        if isinstance(past_key_value, IndicTransStaticCacheLayer):
+            raise ValueError("IndicTransFlashAttention2 attention does not support IndicTransStaticCache")
 
         # if key_value_states are provided this layer is used as a cross-attention layer
         # for the decoder
@@ -445,8 +674,8 @@ class IndicTransFlashAttention2(IndicTransAttention):
             value_states = past_key_value[1].transpose(1, 2)
         elif is_cross_attention:
             # cross_attentions
-            key_states = self._reshape(self.k_proj(key_value_states), -1, bsz)
-            value_states = self._reshape(self.v_proj(key_value_states), -1, bsz)
+            key_states = self._reshape(self.k_proj(key_value_states), -1, key_value_states.shape[0])
+            value_states = self._reshape(self.v_proj(key_value_states), -1, key_value_states.shape[0])
         elif past_key_value is not None:
             # reuse k, v, self_attention
             key_states = self._reshape(self.k_proj(hidden_states), -1, bsz)
@@ -468,6 +697,12 @@ class IndicTransFlashAttention2(IndicTransAttention):
             # if encoder bi-directional self-attention `past_key_value` is always `None`
             past_key_value = (key_states.transpose(1, 2), value_states.transpose(1, 2))
 
+        # the encoder output may be kept once per source for several decoder rows, flash attention needs one per row
+        if key_states.shape[0] != bsz:
+            key_states = self._expand_to_rows(key_states, bsz)
+            value_states = self._expand_to_rows(value_states, bsz)
+            attention_mask = self._expand_to_rows(attention_mask, bsz)
+
         kv_seq_len = key_states.shape[-2]
         if past_key_value is not None:
             kv_seq_len += past_key_value[0].shape[-2]
@@ -648,7 +883,12 @@ class IndicTransSdpaAttention(IndicTransAttention):
         # `past_key_value[0].shape[2] == key_value_states.shape[1]`
         # is checking that the `sequence_length` of the `past_key_value` is the same as
         # the provided `key_value_states` to support prefix tuning
-        if (
+        if isinstance(past_key_value, IndicTransStaticCacheLayer):
+            # preallocated cache, see `IndicTransStaticCache`
+            key_states, value_states = self._static_cache_key_value(
+                hidden_states, key_value_states, past_key_value, bsz
+            )
+        elif (
             is_cross_attention
             and past_key_value is not None
             and past_key_value[0].shape[2] == key_value_states.shape[1]
@@ -658,8 +898,8 @@ class IndicTransSdpaAttention(IndicTransAttention):
             value_states = past_key_value[1]
         elif is_cross_attention:
             # cross_attentions
-            key_states = self._shape(self.k_proj(key_value_states), -1, bsz)
-            value_states = self._shape(self.v_proj(key_value_states), -1, bsz)
+            key_states = self._shape(self.k_proj(key_value_states), -1, key_value_states.shape[0])
+            value_states = self._shape(self.v_proj(key_value_states), -1, key_value_states.shape[0])
         elif past_key_value is not None:
             # reuse k, v, self_attention
             key_states = self._shape(self.k_proj(hidden_states), -1, bsz)
@@ -671,7 +911,7 @@ class IndicTransSdpaAttention(IndicTransAttention):
             key_states = self._shape(self.k_proj(hidden_states), -1, bsz)
             value_states = self._shape(self.v_proj(hidden_states), -1, bsz)
 
-        if self.is_decoder:
+        if self.is_decoder and not isinstance(past_key_value, IndicTransStaticCacheLayer):
             # if cross_attention save Tuple(torch.Tensor, torch.Tensor) of all cross attention key/value_states.
             # Further calls to cross_attention layer can then reuse all cross-attention
             # key/value_states (first "if" case)
@@ -683,6 +923,21 @@ class IndicTransSdpaAttention(IndicTransAttention):
 
         query_states = self._shape(query_states, tgt_len, bsz)
 
+        # the encoder output may be kept once per source for several decoder rows (e.g. the beams of a source),
+        # decoder row `i` then attends to source `i // (bsz // num_sources)`
+        num_sources = key_states.shape[0]
+        if num_sources != bsz:
+            attn_output = F.scaled_dot_product_attention(
+                self._group_by_source(query_states, num_sources),
+                key_states,
+                value_states,
+                attn_mask=attention_mask[:, :, :1] if attention_mask is not None else None,
+                dropout_p=self.dropout if self.training else 0.0,
+            )
+            attn_output = self._ungroup_by_source(attn_output, bsz, tgt_len)
+            attn_output = attn_output.transpose(1, 2).reshape(bsz, tgt_len, self.embed_dim)
+            return self.out_proj(attn_output), None, past_key_value
+
         # NOTE: SDPA with memory-efficient backend is currently (torch==2.1.2) bugged when using non-contiguous inputs and a custom attn_mask,
         # but we are fine here as `_shape` do call `.contiguous()`. Reference: https://github.com/pytorch/pytorch/issues/112577
         attn_output = F.scaled_dot_product_attention(
@@ -865,11 +1120,17 @@ class IndicTransDecoderLayer(nn.Module):
         if self.normalize_before:
             hidden_states = self.self_attn_layer_norm(hidden_states)
 
+        # the layer handle of a static cache serves both attention blocks
+        static_cache = isinstance(past_key_value, IndicTransStaticCacheLayer)
+
         # Self Attention
         # decoder uni-directional self-attention cached key/values tuple is at positions 1,2
-        self_attn_past_key_value = (
-            past_key_value[:2] if past_key_value is not None else None
-        )
+        if static_cache:
+            self_attn_past_key_value = past_key_value
+        else:
+            self_attn_past_key_value = (
+                past_key_value[:2] if past_key_value is not None else None
+            )
         # add present self-attn cache to positions 1,2 of present_key_value tuple
         hidden_states, self_attn_weights, present_key_value = self.self_attn(
             hidden_states=hidden_states,
@@ -892,9 +1153,12 @@ class IndicTransDecoderLayer(nn.Module):
                 hidden_states = self.encoder_attn_layer_norm(hidden_states)
 
             # cross_attn cached key/values tuple is at positions 3,4 of present_key_value tuple
-            cross_attn_past_key_value = (
-                past_key_value[-2:] if past_key_value is not None else None
-            )
+            if static_cache:
+                cross_attn_past_key_value = past_key_value
+            else:
+                cross_attn_past_key_value = (
+                    past_key_value[-2:] if past_key_value is not None else None
+                )
             (
                 hidden_states,
                 cross_attn_weights,
@@ -915,7 +1179,8 @@ class IndicTransDecoderLayer(nn.Module):
                 hidden_states = self.encoder_attn_layer_norm(hidden_states)
 
             # add cross-attn to positions 3,4 of present_key_value tuple
-            present_key_value = present_key_value + cross_attn_present_key_value
+            if not static_cache:
+                present_key_value = present_key_value + cross_attn_present_key_value
 
         # Fully Connected
         residual = hidden_states
@@ -948,6 +1213,18 @@ class IndicTransPreTrainedModel(PreTrainedModel):
     base_model_prefix = "model"
     supports_gradient_checkpointing = True
     _no_split_modules = ["IndicTransAttention"]
+    # without an explicit `attn_implementation`, `from_pretrained` uses `config.default_attn_implementation`, then
+    # `sdpa` when torch supports it
+    _supports_sdpa = True
+    _supports_flash_attn_2 = True
+
+    @classmethod
+    def _autoset_attn_implementation(cls, config, *args, **kwargs):
+        default = getattr(config, "default_attn_implementation", None)
+        if config._attn_implementation_internal is None and default is not None:
+            if default != "flash_attention_2" or is_flash_attn_2_available():
+                config._attn_implementation = default
+        return super()._autoset_attn_implementation(config, *args, **kwargs)
 
     def _init_weights(self, module):
         std = self.config.init_std
@@ -1000,6 +1277,7 @@ class IndicTransEncoder(IndicTransPreTrainedModel):
             config.max_source_positions,
             embed_dim,
             self.padding_idx,
+            static=getattr(config, "static_position_embeddings", False),
         )
         self.layers = nn.ModuleList(
             [IndicTransEncoderLayer(config) for _ in range(config.encoder_layers)]
@@ -1227,6 +1505,7 @@ class IndicTransDecoder(IndicTransPreTrainedModel):
             config.max_target_positions,
             embed_dim,
             self.padding_idx,
+            static=getattr(config, "static_position_embeddings", False),
         )
         self.layers = nn.ModuleList(
             [IndicTransDecoderLayer(config) for _ in range(config.decoder_layers)]
@@ -1454,9 +1733,12 @@ class IndicTransDecoder(IndicTransPreTrainedModel):
             if not skip_the_layer or deepspeed_zero3_is_enabled:
                 # under deepspeed zero3 all gpus must run in sync
 
-                past_key_value = (
-                    past_key_values[idx] if past_key_values is not None else None
-                )
+                if isinstance(past_key_values, IndicTransStaticCache):
+                    past_key_value = past_key_values.layers[idx]
+                else:
+                    past_key_value = (
+                        past_key_values[idx] if past_key_values is not None else None
+                    )
 
                 if self.gradient_checkpointing and self.training:
 
@@ -1518,6 +1800,8 @@ class IndicTransDecoder(IndicTransPreTrainedModel):
             all_hidden_states += (hidden_states,)
 
         next_cache = next_decoder_cache if use_cache else None
+        if use_cache and isinstance(past_key_values, IndicTransStaticCache):
+            next_cache = past_key_values
         if not return_dict:
             return tuple(
                 v
@@ -1640,11 +1924,102 @@ class IndicTransModel(IndicTransPreTrainedModel):
         )
 
 
+class IndicTransVocabShortlist:
+    """
+    Target vocabulary shortlists per target language, written by `build_vocab_shortlist.py` from the target
+    sentence piece model and (optionally) training statistics. Used with
+    `IndicTransForConditionalGeneration.set_output_vocab` to restrict the output projection to the pieces a target
+    language can produce.
+
+    Example:
+
+    ```python
+    >>> shortlist = IndicTransVocabShortlist.from_file("shortlist.json")
+    >>> model.set_output_vocab(shortlist.token_ids(["hin_Deva"]))
+    >>> outputs = model.generate(**inputs, num_beams=5, max_length=256)
+    >>> model.set_output_vocab(None)  # back to the full vocabulary
+    ```
+
+    Args:
+        vocab_size (`int`): size of the target vocabulary the token ids refer to.
+        always (`List[int]`): token ids kept for every language (special tokens, pieces without letters, ...).
+        languages (`Dict[str, List[int]]`): token ids of each target language, by FLORES code.
+    """
+
+    def __init__(self, vocab_size: int, always: List[int], languages: Dict[str, List[int]]):
+        self.vocab_size = vocab_size
+        self.always = sorted(set(always))
+        self.languages = {lang: sorted(set(ids)) for lang, ids in languages.items()}
+        self._cache = {}
+
+    @classmethod
+    def from_file(cls, path: str, vocab_size: Optional[int] = None) -> "IndicTransVocabShortlist":
+        """
+        Loads a shortlist file, checking that it was built for a vocabulary of `vocab_size` tokens if given.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if vocab_size is not None and data["vocab_size"] != vocab_size:
+            raise ValueError(
+                f"The shortlist in {path} was built for a vocabulary of {data['vocab_size']} tokens, not {vocab_size}"
+            )
+        return cls(data["vocab_size"], data["always"], data["languages"])
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"vocab_size": self.vocab_size, "always": self.always, "languages": self.languages}, f)
+
+    def token_ids(self, tgt_langs: Iterable[str]) -> Optional[torch.LongTensor]:
+        """
+        Returns the sorted token ids of the union of the shortlists of `tgt_langs` (e.g. the target languages of
+        a mixed batch), or `None`, meaning the full vocabulary, if one of them has no shortlist.
+        """
+        key = frozenset(tgt_langs)
+        if key not in self._cache:
+            missing = [lang for lang in key if lang not in self.languages]
+            if missing:
+                logger.warning_once(f"No vocabulary shortlist for {', '.join(sorted(missing))}, using the full vocabulary")
+                self._cache[key] = None
+            else:
+                ids = set(self.always).union(*(self.languages[lang] for lang in key))
+                self._cache[key] = torch.tensor(sorted(ids), dtype=torch.long)
+        return self._cache[key]
+
+
+@dataclass
+class IndicTransSpeculativeOutput(ModelOutput):
+    """
+    Output of `IndicTransForConditionalGeneration.generate_speculative`.
+
+    Args:
+        sequences (`torch.LongTensor` of shape `(batch_size, sequence_length)`):
+            Generated sequences, starting with the decoder start token and padded after `</s>`.
+        sequences_scores (`torch.FloatTensor` of shape `(batch_size,)`):
+            Sum of the log-probabilities of the generated tokens under the target model, divided by their number.
+        num_drafted (`int`):
+            Number of tokens proposed by the draft model, summed over the sentences.
+        num_accepted (`int`):
+            Number of drafted tokens kept, summed over the sentences.
+        num_target_calls (`int`):
+            Number of forward passes of the decoder of the target model.
+    """
+
+    sequences: torch.LongTensor = None
+    sequences_scores: torch.FloatTensor = None
+    num_drafted: Optional[int] = None
+    num_accepted: Optional[int] = None
+    num_target_calls: Optional[int] = None
+
+
 # Copied from transformers.models.m2m_100.modeling_m2m_100.M2M100ForConditionalGeneration->IndicTrans
 class IndicTransForConditionalGeneration(IndicTransPreTrainedModel):
     base_model_prefix = "model"
     _tied_weights_keys = None
     _label_smoothing = 0.0
+    # whether the encoder output ignores the target language tag, decided on the first `generate_multi_target` call
+    _encoder_tag_independent = None
+    # token ids the output projection is restricted to at inference, see `set_output_vocab`
+    _output_vocab = None
 
     def __init__(self, config: IndicTransConfig):
         super().__init__(config)
@@ -1676,6 +2051,42 @@ class IndicTransForConditionalGeneration(IndicTransPreTrainedModel):
     def set_label_smoothing(self, label_smoothing):
         self._label_smoothing = label_smoothing
 
+    def set_output_vocab(self, token_ids: Optional[torch.LongTensor]):
+        """
+        Restricts the output projection and softmax to `token_ids` at inference, e.g. the shortlist of the target
+        language from `IndicTransVocabShortlist.token_ids`: only these rows of `lm_head` are multiplied, and the
+        logits of the other tokens are set to `-inf`, so the logits keep the shape of the full vocabulary for
+        `generate`. `None` restores the full vocabulary.
+
+        The full vocabulary is still used in training mode, when `labels` are given (the loss needs every logit)
+        and when `lm_head` is not a plain `nn.Linear` (e.g. quantized).
+        """
+        if token_ids is None:
+            self._output_vocab = None
+            return
+        token_ids = torch.unique(token_ids.to(device=self.lm_head.weight.device, dtype=torch.long))
+        if token_ids[-1] >= self.config.decoder_vocab_size:
+            raise ValueError(f"Output vocabulary ids must be lower than {self.config.decoder_vocab_size}")
+        self._output_vocab = token_ids
+        self._output_vocab_weight = None
+
+    def _output_logits(self, hidden_states: torch.Tensor, labels: Optional[torch.LongTensor]) -> torch.Tensor:
+        if self._output_vocab is None or labels is not None or self.training:
+            return self.lm_head(hidden_states)
+        if type(self.lm_head) is not nn.Linear or not self.lm_head.weight.is_floating_point():
+            logger.warning_once("The output vocabulary can only be restricted for a plain `nn.Linear` `lm_head`")
+            return self.lm_head(hidden_states)
+
+        # the rows of the shortlist are gathered once, and again only if the weights change
+        weight = self.lm_head.weight
+        key = (weight.data_ptr(), weight._version)
+        if self._output_vocab_weight is None or self._output_vocab_key != key:
+            self._output_vocab_weight = weight.detach().index_select(0, self._output_vocab)
+            self._output_vocab_key = key
+
+        logits = hidden_states.new_full((*hidden_states.shape[:-1], weight.shape[0]), float("-inf"))
+        return logits.index_copy_(-1, self._output_vocab, F.linear(hidden_states, self._output_vocab_weight))
+
     def forward(
         self,
         input_ids: Optional[torch.LongTensor] = None,
@@ -1730,7 +2141,7 @@ class IndicTransForConditionalGeneration(IndicTransPreTrainedModel):
             output_hidden_states=output_hidden_states,
             return_dict=return_dict,
         )
-        lm_logits = self.lm_head(outputs[0])
+        lm_logits = self._output_logits(outputs[0], labels)
 
         masked_lm_loss = None
         if labels is not None:
@@ -1791,11 +2202,576 @@ class IndicTransForConditionalGeneration(IndicTransPreTrainedModel):
 
     @staticmethod
     def _reorder_cache(past_key_values, beam_idx):
+        if isinstance(past_key_values, IndicTransStaticCache):
+            past_key_values.reorder_cache(beam_idx)
+            return past_key_values
+        # beam search only reorders the hypotheses of a same source, which share the cross-attention
+        # keys/values (positions 3,4), so only the self-attention ones are reordered
         reordered_past = ()
         for layer_past in past_key_values:
             reordered_past += (
                 tuple(
-                    past_state.index_select(0, beam_idx) for past_state in layer_past
-                ),
+                    past_state.index_select(0, beam_idx) for past_state in layer_past[:2]
+                )
+                + tuple(layer_past[2:]),
             )
         return reordered_past
+
+    def _expand_inputs_for_generation(
+        self,
+        expand_size: int = 1,
+        is_encoder_decoder: bool = False,
+        input_ids: Optional[torch.LongTensor] = None,
+        **model_kwargs,
+    ):
+        """
+        Expands the decoder inputs `expand_size` times (e.g. once per beam) before decoding starts, but keeps the
+        encoder output and attention mask once per source: the cross-attention keys/values are then computed, cached
+        and attended per source instead of per beam.
+        """
+        if model_kwargs.get("past_key_values") is not None or model_kwargs.get("encoder_outputs") is None:
+            return super()._expand_inputs_for_generation(
+                expand_size=expand_size, is_encoder_decoder=is_encoder_decoder, input_ids=input_ids, **model_kwargs
+            )
+
+        encoder_outputs = model_kwargs.pop("encoder_outputs")
+        attention_mask = model_kwargs.pop("attention_mask", None)
+        input_ids, model_kwargs = super()._expand_inputs_for_generation(
+            expand_size=expand_size, is_encoder_decoder=False, input_ids=input_ids, **model_kwargs
+        )
+        num_sources = encoder_outputs.last_hidden_state.shape[0]
+        if attention_mask is not None and attention_mask.shape[0] != num_sources:
+            # one mask row per decoder row, grouped by source (see `generate_multi_target`): keep one per source
+            attention_mask = attention_mask[:: attention_mask.shape[0] // num_sources]
+        model_kwargs["encoder_outputs"] = encoder_outputs
+        model_kwargs["attention_mask"] = attention_mask
+        return input_ids, model_kwargs
+
+    def _maybe_initialize_input_ids_for_generation(
+        self,
+        inputs: Optional[torch.Tensor] = None,
+        bos_token_id: Optional[torch.Tensor] = None,
+        model_kwargs: Optional[Dict[str, torch.Tensor]] = None,
+    ) -> torch.LongTensor:
+        """
+        Takes the batch size from the attention mask rather than the encoder output when the encoder output is kept
+        once per source for several decoder rows (see `generate_multi_target`).
+        """
+        encoder_outputs = model_kwargs.get("encoder_outputs") if model_kwargs else None
+        attention_mask = model_kwargs.get("attention_mask") if model_kwargs else None
+        if (
+            inputs is None
+            and encoder_outputs is not None
+            and attention_mask is not None
+            and attention_mask.shape[0] != encoder_outputs.last_hidden_state.shape[0]
+        ):
+            return torch.full(attention_mask.shape, -100, dtype=torch.long, device=self.device)
+        return super()._maybe_initialize_input_ids_for_generation(inputs, bos_token_id, model_kwargs)
+
+    @staticmethod
+    def _set_target_tags(
+        input_ids: torch.LongTensor,
+        attention_mask: torch.LongTensor,
+        tgt_tag_ids: List[int],
+        tag_position: int,
+    ) -> torch.LongTensor:
+        # one block of `input_ids` rows per target, with the tag token replaced (the first non-padding token is
+        # looked up per row, so both left and right padding work)
+        num_targets, num_sources = len(tgt_tag_ids), input_ids.shape[0]
+        tag_index = attention_mask.int().argmax(dim=1).repeat(num_targets) + tag_position
+        rows = torch.arange(num_targets * num_sources, device=input_ids.device)
+        tags = torch.tensor(tgt_tag_ids, dtype=input_ids.dtype, device=input_ids.device)
+
+        input_ids = input_ids.repeat(num_targets, 1)
+        input_ids[rows, tag_index] = tags.repeat_interleave(num_sources)
+        return input_ids
+
+    @torch.no_grad()
+    def generate_multi_target(
+        self,
+        input_ids: torch.LongTensor,
+        attention_mask: torch.LongTensor,
+        tgt_tag_ids: List[int],
+        tag_position: int = 1,
+        share_encoder: Optional[bool] = None,
+        atol: float = 1e-3,
+        **generate_kwargs,
+    ) -> List[torch.LongTensor]:
+        """
+        Translates a batch of sources into several target languages with a single decoder batch.
+
+        IndicTrans2 selects the target language with a tag token in the source (`src_tag tgt_tag sentence`), which
+        the bidirectional encoder attends to from every position: the encoder output is in general *not* independent
+        of the target, and no prefix of it can be shared. The encoder output of one target is only reused for the
+        others (cutting the encoder cost by the number of targets) once this was verified: on the first call with
+        `share_encoder=None`, the sources are encoded for every target and the outputs compared within `atol`, and
+        the decision is kept for the following calls. The verification needs at least two distinct tags, calls with
+        a single (distinct) tag encode the sources once without deciding. Otherwise every (source, target) pair is
+        encoded, and all of them are decoded in one `generate` call. A shared encoder output is kept once per source,
+        not copied for every target.
+
+        Args:
+            input_ids (`torch.LongTensor` of shape `(num_sources, sequence_length)`):
+                Tokenized sources, preprocessed for any of the target languages.
+            attention_mask (`torch.LongTensor` of shape `(num_sources, sequence_length)`):
+                Attention mask of `input_ids`.
+            tgt_tag_ids (`List[int]`):
+                Token ids of the target language tags.
+            tag_position (`int`, *optional*, defaults to 1):
+                Position of the target tag from the first non-padding token.
+            share_encoder (`bool`, *optional*):
+                Forces (`True`) or disables (`False`) the reuse of the encoder output across targets. Defaults to
+                the result of the verification.
+            atol (`float`, *optional*, defaults to 1e-3):
+                Largest absolute difference of encoder outputs across tags considered as tag-independent.
+            generate_kwargs:
+                Passed to `generate`, which must return sequences (`return_dict_in_generate` is not supported).
+
+        Returns:
+            `List[torch.LongTensor]`: the generated sequences for each target, in the order of `tgt_tag_ids`.
+        """
+        if generate_kwargs.get("return_dict_in_generate"):
+            raise ValueError("`generate_multi_target` does not support `return_dict_in_generate`")
+
+        num_targets = len(tgt_tag_ids)
+        num_sources = input_ids.shape[0]
+        all_input_ids = self._set_target_tags(input_ids, attention_mask, tgt_tag_ids, tag_position)
+        encoder = self.get_encoder()
+
+        # the encoder output only depends on the tag for at least two distinct tags, which are needed to verify it
+        verify = share_encoder is None and len(set(tgt_tag_ids)) > 1
+        if share_encoder is None:
+            share_encoder = self._encoder_tag_independent if verify else True
+
+        if share_encoder:
+            hidden_states = encoder(input_ids=all_input_ids[:num_sources], attention_mask=attention_mask).last_hidden_state
+            # the encoder output is kept once per source: the decoder rows are ordered by source, then by target,
+            # and the rows of a source attend to its keys/values (see `_expand_inputs_for_generation`). The mask
+            # has one row per decoder row to give `generate` the batch size.
+            outputs = self.generate(
+                encoder_outputs=BaseModelOutput(last_hidden_state=hidden_states),
+                attention_mask=attention_mask.repeat_interleave(num_targets, dim=0),
+                **generate_kwargs,
+            )
+            outputs = outputs.view(num_sources, num_targets, -1, outputs.shape[-1]).transpose(0, 1)
+            return [x.reshape(-1, outputs.shape[-1]) for x in outputs]
+
+        all_attention_mask = attention_mask.repeat(num_targets, 1)
+        hidden_states = encoder(input_ids=all_input_ids, attention_mask=all_attention_mask).last_hidden_state
+        if verify:
+            # padding positions are masked out in cross-attention, so they are not compared
+            mask = attention_mask.bool()[None, :, :, None]
+            blocks = hidden_states.view(num_targets, -1, *hidden_states.shape[1:])
+            max_diff = ((blocks - blocks[:1]).abs() * mask).max().item()
+            self._encoder_tag_independent = max_diff <= atol
+            if not self._encoder_tag_independent:
+                logger.warning_once(
+                    f"The encoder output depends on the target tag (max difference {max_diff:.4g}), it is "
+                    "computed for every target in `generate_multi_target`."
+                )
+
+        outputs = self.generate(
+            encoder_outputs=BaseModelOutput(last_hidden_state=hidden_states),
+            attention_mask=all_attention_mask,
+            **generate_kwargs,
+        )
+        return list(outputs.chunk(num_targets, dim=0))
+
+    @staticmethod
+    def _crop_cache(past_key_values, length: int):
+        # only the self-attention keys/values grow with the generated tokens
+        return tuple((layer_past[0][:, :, :length], layer_past[1][:, :, :length]) + tuple(layer_past[2:]) for layer_past in past_key_values)
+
+    @staticmethod
+    def _select_cache(past_key_values, rows: torch.LongTensor):
+        return tuple(tuple(past_state.index_select(0, rows) for past_state in layer_past) for layer_past in past_key_values)
+
+    @torch.no_grad()
+    def generate_speculative(
+        self,
+        input_ids: torch.LongTensor,
+        attention_mask: torch.LongTensor,
+        draft_model: "IndicTransForConditionalGeneration",
+        num_draft_tokens: int = 4,
+        max_new_tokens: int = 256,
+    ) -> IndicTransSpeculativeOutput:
+        """
+        Greedy decoding with speculative decoding: a smaller draft model sharing the vocabularies of this model (e.g. a
+        distilled IndicTrans2 model) proposes `num_draft_tokens` tokens greedily, and this model scores all of them in
+        a single decoder forward pass. The drafted tokens are kept up to the first one that differs from the greedy
+        choice of this model, which is then appended, so every pass of this model generates between 1 and
+        `num_draft_tokens + 1` tokens. The output is the greedy output of this model, up to numerical differences
+        between scoring several tokens at once and one at a time.
+
+        The sentences of a batch advance together, by the number of tokens accepted for all of them, and finished
+        sentences leave the batch, so small batches (down to single sentences, for latency) benefit the most.
+
+        Args:
+            input_ids (`torch.LongTensor` of shape `(batch_size, sequence_length)`):
+                Tokenized sources.
+            attention_mask (`torch.LongTensor` of shape `(batch_size, sequence_length)`):
+                Attention mask of `input_ids`.
+            draft_model (`IndicTransForConditionalGeneration`):
+                Model drafting the tokens, with the same source and target vocabularies.
+            num_draft_tokens (`int`, *optional*, defaults to 4):
+                Number of tokens drafted before each verification.
+            max_new_tokens (`int`, *optional*, defaults to 256):
+                Maximum number of generated tokens, `</s>` included.
+
+        Returns:
+            [`IndicTransSpeculativeOutput`]: the generated sequences and the drafting statistics.
+        """
+        config, draft_config = self.config, draft_model.config
+        for name in ("encoder_vocab_size", "decoder_vocab_size", "pad_token_id", "eos_token_id", "decoder_start_token_id"):
+            if getattr(config, name) != getattr(draft_config, name):
+                raise ValueError(f"The draft model must have the same `{name}` as the target model")
+
+        batch_size = input_ids.shape[0]
+        encoder_outputs = BaseModelOutput(
+            last_hidden_state=self.get_encoder()(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        )
+        draft_encoder_outputs = BaseModelOutput(
+            last_hidden_state=draft_model.get_encoder()(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        )
+
+        # rows of the sentences still being decoded, all with the same number of tokens
+        rows = torch.arange(batch_size, device=input_ids.device)
+        tokens = input_ids.new_full((batch_size, 1), config.decoder_start_token_id)
+        scores = torch.zeros(batch_size, device=input_ids.device)
+        sequences, sequences_scores = [None] * batch_size, [None] * batch_size
+        past_key_values = draft_past_key_values = None
+        num_drafted = num_accepted = num_target_calls = 0
+
+        while rows.numel():
+            # the caches hold the keys/values of all the tokens but the last one, except the draft cache after all the
+            # drafted tokens were accepted, which misses the last drafted token
+            num_draft = min(num_draft_tokens, max_new_tokens - tokens.shape[1])
+            draft_length = draft_past_key_values[0][0].shape[2] if draft_past_key_values is not None else 0
+            next_tokens, drafts = tokens[:, draft_length:], []
+            for _ in range(num_draft):
+                outputs = draft_model(
+                    encoder_outputs=draft_encoder_outputs,
+                    attention_mask=attention_mask,
+                    decoder_input_ids=next_tokens,
+                    past_key_values=draft_past_key_values,
+                    use_cache=True,
+                )
+                draft_past_key_values = outputs.past_key_values
+                next_tokens = outputs.logits[:, -1].argmax(dim=-1, keepdim=True)
+                drafts.append(next_tokens)
+            drafts = torch.cat([tokens[:, -1:]] + drafts, dim=1)
+
+            outputs = self(
+                encoder_outputs=encoder_outputs,
+                attention_mask=attention_mask,
+                decoder_input_ids=drafts,
+                past_key_values=past_key_values,
+                use_cache=True,
+            )
+            num_target_calls += 1
+            logprobs = outputs.logits.float().log_softmax(dim=-1)
+            predicted = logprobs.argmax(dim=-1)
+
+            # all the sentences advance by the number of drafted tokens accepted for all of them, plus the token of
+            # this model after them
+            matches = (predicted[:, :-1] == drafts[:, 1:]).long().cumprod(dim=1).sum(dim=1)
+            num_new = int(matches.min()) + 1
+            new_tokens = predicted[:, :num_new]
+            num_drafted += num_draft * rows.numel()
+            num_accepted += (num_new - 1) * rows.numel()
+
+            # tokens after `</s>` are not scored
+            after_eos = (new_tokens == config.eos_token_id).long().cumsum(dim=1) - (new_tokens == config.eos_token_id).long()
+            new_scores = logprobs[:, :num_new].gather(-1, new_tokens[..., None])[..., 0]
+            scores += new_scores.masked_fill(after_eos > 0, 0.0).sum(dim=1)
+            tokens = torch.cat([tokens, new_tokens], dim=1)
+            past_key_values = self._crop_cache(outputs.past_key_values, tokens.shape[1] - 1)
+            if draft_past_key_values is not None:
+                draft_past_key_values = self._crop_cache(draft_past_key_values, tokens.shape[1] - 1)
+
+            finished = (new_tokens == config.eos_token_id).any(dim=1) | (tokens.shape[1] > max_new_tokens)
+            if finished.any():
+                for i in finished.nonzero()[:, 0].tolist():
+                    sequence = tokens[i, 1:]
+                    eos = (sequence == config.eos_token_id).nonzero()
+                    length = int(eos[0]) + 1 if eos.numel() else sequence.numel()
+                    sequences[int(rows[i])] = tokens[i, : length + 1]
+                    sequences_scores[int(rows[i])] = scores[i] / length
+                keep = (~finished).nonzero()[:, 0]
+                rows, tokens, scores, attention_mask = rows[keep], tokens[keep], scores[keep], attention_mask[keep]
+                encoder_outputs = BaseModelOutput(last_hidden_state=encoder_outputs.last_hidden_state[keep])
+                draft_encoder_outputs = BaseModelOutput(last_hidden_state=draft_encoder_outputs.last_hidden_state[keep])
+                past_key_values = self._select_cache(past_key_values, keep)
+                if draft_past_key_values is not None:
+                    draft_past_key_values = self._select_cache(draft_past_key_values, keep)
+
+        return IndicTransSpeculativeOutput(
+            sequences=nn.utils.rnn.pad_sequence(sequences, batch_first=True, padding_value=config.pad_token_id),
+            sequences_scores=torch.stack(sequences_scores),
+            num_drafted=num_drafted,
+            num_accepted=num_accepted,
+            num_target_calls=num_target_calls,
+        )
+
+
+class IndicTransFusedDecoderLayer(nn.Module):
+    """
+    Inference-only copy of an `IndicTransDecoderLayer` for a single decoding step over preallocated caches, see
+    `IndicTransDecoderStep`. The query/key/value projections of the self-attention are fused into one linear layer
+    (with the query scaling folded into its weights), and so are the key/value ones of the cross-attention.
+    """
+
+    def __init__(self, layer: IndicTransDecoderLayer, activation_function: str):
+        super().__init__()
+        if activation_function not in ("relu", "gelu"):
+            raise ValueError(f"Unsupported activation function for the fused decoder step: {activation_function}")
+
+        self_attn, encoder_attn = layer.self_attn, layer.encoder_attn
+        self.num_heads = self_attn.num_heads
+        self.head_dim = self_attn.head_dim
+        self.normalize_before = layer.normalize_before
+        self.activation_function = activation_function
+
+        self.qkv_proj = self._fuse([self_attn.q_proj, self_attn.k_proj, self_attn.v_proj], self_attn.scaling)
+        self.self_out_proj = self_attn.out_proj
+        self.self_attn_layer_norm = layer.self_attn_layer_norm
+
+        self.cross_q_proj = self._fuse([encoder_attn.q_proj], encoder_attn.scaling)
+        self.cross_kv_proj = self._fuse([encoder_attn.k_proj, encoder_attn.v_proj])
+        self.cross_out_proj = encoder_attn.out_proj
+        self.encoder_attn_layer_norm = layer.encoder_attn_layer_norm
+
+        self.fc1 = layer.fc1
+        self.fc2 = layer.fc2
+        self.final_layer_norm = layer.final_layer_norm
+
+    @staticmethod
+    def _fuse(projections: List[nn.Linear], query_scaling: Optional[float] = None) -> nn.Linear:
+        weight = torch.cat([x.weight for x in projections], dim=0).detach().clone()
+        has_bias = projections[0].bias is not None
+        fused = nn.Linear(weight.shape[1], weight.shape[0], bias=has_bias).to(weight)
+        fused.weight.data.copy_(weight)
+        if has_bias:
+            fused.bias.data.copy_(torch.cat([x.bias for x in projections], dim=0))
+        if query_scaling is not None:
+            dim = projections[0].weight.shape[0]
+            fused.weight.data[:dim] *= query_scaling
+            if has_bias:
+                fused.bias.data[:dim] *= query_scaling
+        return fused
+
+    def _heads(self, x: torch.Tensor) -> torch.Tensor:
+        # (bsz, len, embed_dim) -> (bsz, heads, len, head_dim)
+        return x.view(x.shape[0], -1, self.num_heads, self.head_dim).transpose(1, 2)
+
+    def _attend(self, query: torch.Tensor, key: torch.Tensor, value: torch.Tensor, bias: torch.Tensor) -> torch.Tensor:
+        weights = F.softmax(torch.matmul(query, key.transpose(2, 3)) + bias, dim=-1)
+        output = torch.matmul(weights, value)
+        return output.transpose(1, 2).reshape(query.shape[0], 1, self.num_heads * self.head_dim)
+
+    def cross_key_value(self, encoder_hidden_states: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        key, value = self.cross_kv_proj(encoder_hidden_states).chunk(2, dim=-1)
+        return self._heads(key), self._heads(value)
+
+    def forward(
+        self,
+        hidden_states: torch.Tensor,
+        step: torch.Tensor,
+        self_bias: torch.Tensor,
+        self_key: torch.Tensor,
+        self_value: torch.Tensor,
+        cross_key: torch.Tensor,
+        cross_value: torch.Tensor,
+        encoder_bias: torch.Tensor,
+    ) -> torch.Tensor:
+        residual = hidden_states
+        if self.normalize_before:
+            hidden_states = self.self_attn_layer_norm(hidden_states)
+        query, key, value = self.qkv_proj(hidden_states).chunk(3, dim=-1)
+        self_key.index_copy_(2, step, self._heads(key))
+        self_value.index_copy_(2, step, self._heads(value))
+        hidden_states = residual + self.self_out_proj(
+            self._attend(self._heads(query), self_key, self_value, self_bias)
+        )
+        if not self.normalize_before:
+            hidden_states = self.self_attn_layer_norm(hidden_states)
+
+        residual = hidden_states
+        if self.normalize_before:
+            hidden_states = self.encoder_attn_layer_norm(hidden_states)
+        query = self._heads(self.cross_q_proj(hidden_states))
+        hidden_states = residual + self.cross_out_proj(self._attend(query, cross_key, cross_value, encoder_bias))
+        if not self.normalize_before:
+            hidden_states = self.encoder_attn_layer_norm(hidden_states)
+
+        residual = hidden_states
+        if self.normalize_before:
+            hidden_states = self.final_layer_norm(hidden_states)
+        hidden_states = self.fc1(hidden_states)
+        if self.activation_function == "relu":
+            hidden_states = F.relu(hidden_states)
+        else:
+            hidden_states = F.gelu(hidden_states)
+        hidden_states = residual + self.fc2(hidden_states)
+        if not self.normalize_before:
+            hidden_states = self.final_layer_norm(hidden_states)
+        return hidden_states
+
+
+class IndicTransDecoderStep(nn.Module):
+    """
+    Inference-only decoder step of an `IndicTransForConditionalGeneration` that can be traced (`torch.jit.trace`),
+    scripted or compiled (`torch.compile`): it has no attention implementation dispatch, head masks, optional outputs
+    or cache tuples, and all its inputs have fixed shapes. The keys/values of the self-attention are written in place
+    into caches preallocated for `max_length` positions, and attention is computed over all of them, with the
+    positions after the current step masked out.
+
+    The module shares the layer norms, feed-forward and output projections of `model`, and holds fused copies of the
+    attention input projections.
+
+    Args:
+        model ([`IndicTransForConditionalGeneration`]):
+            Model to take the decoder weights from.
+        max_length (`int`):
+            Number of decoder positions of the caches, at most `config.max_target_positions`.
+    """
+
+    def __init__(self, model: "IndicTransForConditionalGeneration", max_length: int):
+        super().__init__()
+        config = model.config
+        decoder = model.get_decoder()
+        if max_length > config.max_target_positions:
+            raise ValueError(f"`max_length` ({max_length}) exceeds `max_target_positions` ({config.max_target_positions})")
+
+        self.max_length = max_length
+        self.num_layers = config.decoder_layers
+        self.num_heads = config.decoder_attention_heads
+        self.head_dim = config.decoder_embed_dim // config.decoder_attention_heads
+        self.embed_scale = decoder.embed_scale
+        self.decoder_start_token_id = config.decoder_start_token_id
+        self.eos_token_id = config.eos_token_id
+        self.pad_token_id = config.pad_token_id
+
+        self.embed_tokens = decoder.embed_tokens
+        # decoding step `i` is at position `padding_idx + 1 + i`
+        start = decoder.embed_positions.padding_idx + 1
+        self.register_buffer(
+            "positions", decoder.embed_positions.weights[start : start + max_length].clone(), persistent=False
+        )
+        self.register_buffer("cache_positions", torch.arange(max_length), persistent=False)
+        self.layernorm_embedding = decoder.layernorm_embedding
+        self.layers = nn.ModuleList(
+            [IndicTransFusedDecoderLayer(layer, config.activation_function) for layer in decoder.layers]
+        )
+        self.layer_norm = decoder.layer_norm
+        self.lm_head = model.lm_head
+
+    @torch.no_grad()
+    def init_cache(
+        self, encoder_hidden_states: torch.Tensor, encoder_attention_mask: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Allocates the self-attention caches and computes the cross-attention keys/values of every layer.
+
+        Returns:
+            `Tuple[torch.Tensor]`: self-attention keys and values of shape `(num_layers, batch_size, num_heads,
+            max_length, head_dim)`, cross-attention keys and values of shape `(num_layers, batch_size, num_heads,
+            source_length, head_dim)`, and the additive encoder attention mask of shape `(batch_size, 1, 1,
+            source_length)`.
+        """
+        bsz = encoder_hidden_states.shape[0]
+        shape = (self.num_layers, bsz, self.num_heads, self.max_length, self.head_dim)
+        self_key = encoder_hidden_states.new_zeros(shape)
+        self_value = encoder_hidden_states.new_zeros(shape)
+        cross = [layer.cross_key_value(encoder_hidden_states) for layer in self.layers]
+        cross_key = torch.stack([key for key, _ in cross])
+        cross_value = torch.stack([value for _, value in cross])
+        encoder_bias = (1.0 - encoder_attention_mask[:, None, None, :].to(encoder_hidden_states.dtype)) * torch.finfo(
+            encoder_hidden_states.dtype
+        ).min
+        return self_key, self_value, cross_key, cross_value, encoder_bias
+
+    @staticmethod
+    def reorder_cache(self_key: torch.Tensor, self_value: torch.Tensor, beam_idx: torch.LongTensor):
+        """
+        Reorders the self-attention caches in place for beam search, the cross-attention ones are left as they are
+        when their rows are those of the beams of a same source.
+        """
+        self_key.copy_(self_key.index_select(1, beam_idx))
+        self_value.copy_(self_value.index_select(1, beam_idx))
+
+    def forward(
+        self,
+        input_ids: torch.LongTensor,
+        step: torch.LongTensor,
+        self_key: torch.Tensor,
+        self_value: torch.Tensor,
+        cross_key: torch.Tensor,
+        cross_value: torch.Tensor,
+        encoder_bias: torch.Tensor,
+    ) -> torch.Tensor:
+        """
+        Args:
+            input_ids (`torch.LongTensor` of shape `(batch_size, 1)`):
+                Tokens of the current step.
+            step (`torch.LongTensor` of shape `(1,)`):
+                Index of the current step, starting from 0 for the decoder start token.
+            self_key, self_value, cross_key, cross_value, encoder_bias:
+                Caches and mask returned by `init_cache`, the self-attention ones are updated in place.
+
+        Returns:
+            `torch.Tensor` of shape `(batch_size, vocab_size)`: logits of the next token.
+        """
+        hidden_states = self.embed_tokens(input_ids) * self.embed_scale + self.positions.index_select(0, step)
+        if self.layernorm_embedding is not None:
+            hidden_states = self.layernorm_embedding(hidden_states)
+
+        self_bias = torch.zeros_like(self.positions[:, 0]).masked_fill(self.cache_positions > step, float("-inf"))
+        for i, layer in enumerate(self.layers):
+            hidden_states = layer(
+                hidden_states,
+                step,
+                self_bias,
+                self_key[i],
+                self_value[i],
+                cross_key[i],
+                cross_value[i],
+                encoder_bias,
+            )
+
+        if self.layer_norm is not None:
+            hidden_states = self.layer_norm(hidden_states)
+        return self.lm_head(hidden_states[:, 0])
+
+    @torch.jit.ignore
+    @torch.no_grad()
+    def greedy_search(
+        self,
+        encoder_hidden_states: torch.Tensor,
+        encoder_attention_mask: torch.Tensor,
+        max_new_tokens: Optional[int] = None,
+        step_fn=None,
+    ) -> torch.LongTensor:
+        """
+        Greedy decoding with this step, or with its traced/compiled version `step_fn`.
+
+        Returns:
+            `torch.LongTensor` of shape `(batch_size, sequence_length)`: generated tokens, starting with the decoder
+            start token and padded after `</s>`, as returned by `generate`.
+        """
+        step_fn = step_fn if step_fn is not None else self
+        max_new_tokens = min(max_new_tokens or self.max_length - 1, self.max_length - 1)
+        cache = self.init_cache(encoder_hidden_states, encoder_attention_mask)
+
+        bsz = encoder_hidden_states.shape[0]
+        tokens = torch.full((bsz, 1), self.decoder_start_token_id, dtype=torch.long, device=encoder_hidden_states.device)
+        finished = torch.zeros(bsz, dtype=torch.bool, device=tokens.device)
+        for i in range(max_new_tokens):
+            step = torch.tensor([i], device=tokens.device)
+            next_tokens = step_fn(tokens[:, -1:], step, *cache).argmax(dim=-1)
+            next_tokens = next_tokens.masked_fill(finished, self.pad_token_id)
+            tokens = torch.cat([tokens, next_tokens[:, None]], dim=1)
+            finished |= next_tokens == self.eos_token_id
+            if finished.all():
+                break
+        return tokens
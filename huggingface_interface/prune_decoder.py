@@ -0,0 +1,101 @@
+"""
+Builds reduced-decoder variants of an IndicTrans2 checkpoint. Decoding runs the decoder once per generated token, so
+its cost scales with the decoder depth, while the encoder runs once per sentence: dropping decoder layers gives faster
+models of the same family. Each variant keeps a subset of the decoder layers, with their weights:
+
+    - `alternate`: every other layer, ending with the last one,
+    - `top:K`: the last K layers,
+    - `bottom:K`: the first K layers,
+    - `layers:I,J,...`: the given layers (0-based).
+
+Every variant is saved as a regular checkpoint in `<output_dir>/<variant>` (e.g. `top-6`), with the tokenizer and
+vocabulary files of the original, and then evaluated against it with `evaluate_variants.py`. Variants usually need a
+short recovery fine-tune, with `train_lora.py --model <output_dir>/<variant>` (LoRA, or `--full_finetune`).
+
+Usage (from the root directory):
+    python3 huggingface_interface/prune_decoder.py --ckpt_dir ai4bharat/indictrans2-en-indic-dist-200M \\
+        --output_dir pruned --variants alternate top:6 top:3
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List
+
+import torch
+import torch.nn as nn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from huggingface_interface.evaluate_variants import add_eval_args, evaluate, load_eval_data
+from huggingface_interface.modeling_indictrans import IndicTransForConditionalGeneration
+from huggingface_interface.quantize_int8 import copy_model_files
+
+
+def select_decoder_layers(variant: str, num_layers: int) -> List[int]:
+    """
+    Returns the 0-based indices of the decoder layers kept by `variant`, in order.
+    """
+    name, _, arg = variant.partition(":")
+    if name == "alternate":
+        layers = list(range(num_layers - 1, -1, -2))[::-1]
+    elif name in ("top", "bottom"):
+        k = int(arg)
+        if not 0 < k <= num_layers:
+            raise ValueError(f"Cannot keep {k} of {num_layers} decoder layers")
+        layers = list(range(num_layers - k, num_layers)) if name == "top" else list(range(k))
+    elif name == "layers":
+        layers = sorted(set(int(x) for x in arg.split(",")))
+        if not layers or layers[0] < 0 or layers[-1] >= num_layers:
+            raise ValueError(f"Decoder layers must be between 0 and {num_layers - 1}: {arg}")
+    else:
+        raise ValueError(f"Unknown variant: {variant}")
+    return layers
+
+
+def get_variant_name(variant: str) -> str:
+    return variant.replace(":", "-").replace(",", "_")
+
+
+def prune_decoder(model: IndicTransForConditionalGeneration, layers: List[int]) -> IndicTransForConditionalGeneration:
+    """
+    Keeps the decoder layers `layers` of `model`, in place. The kept layers are recorded in the config as
+    `kept_decoder_layers`, relative to the original checkpoint.
+    """
+    decoder = model.get_decoder()
+    kept = getattr(model.config, "kept_decoder_layers", None) or list(range(len(decoder.layers)))
+    decoder.layers = nn.ModuleList([decoder.layers[i] for i in layers])
+    model.config.decoder_layers = len(layers)
+    model.config.kept_decoder_layers = [kept[i] for i in layers]
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt_dir", type=str, required=True, help="HF model directory or hub id")
+    parser.add_argument("--output_dir", type=str, required=True, help="directory to write the variants to")
+    parser.add_argument("--variants", type=str, nargs="+", default=["alternate"])
+    parser.add_argument("--skip_eval", action="store_true")
+    add_eval_args(parser)
+    parser.add_argument("--report_json", type=str, default=None)
+    args = parser.parse_args()
+
+    variant_dirs = []
+    for variant in args.variants:
+        model = IndicTransForConditionalGeneration.from_pretrained(args.ckpt_dir, torch_dtype=torch.float32)
+        layers = select_decoder_layers(variant, model.config.decoder_layers)
+        output_dir = os.path.join(args.output_dir, get_variant_name(variant))
+        print(f"Writing {output_dir} with decoder layers {layers}")
+
+        os.makedirs(output_dir, exist_ok=True)
+        copy_model_files(args.ckpt_dir, output_dir)
+        prune_decoder(model, layers).save_pretrained(output_dir)
+        variant_dirs.append(output_dir)
+        del model
+
+    if not args.skip_eval:
+        codec, src_ids, refs = load_eval_data(args, variant_dirs[0])
+        report = evaluate([args.ckpt_dir] + variant_dirs, codec, src_ids, refs, args)
+        if args.report_json:
+            with open(args.report_json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,142 @@
+"""
+Dynamic int8 quantisation of the HF IndicTrans2 model for CPU inference, which needs neither CUDA nor bitsandbytes.
+
+The `nn.Linear` layers of the encoder and decoder (attention projections and feed-forward layers) are replaced by
+dynamically quantised ones: int8 weights with one scale per output channel, and activations quantised to int8 at
+runtime, per batch. `lm_head` is quantised as well unless `--keep_lm_head_fp32` is given, which keeps the output
+projection exact and is needed by the vocabulary shortlists (`set_output_vocab`).
+
+Quantisation is done once offline. The quantised model is saved in its own directory, with the config and tokenizer
+files of the checkpoint:
+
+    <output_dir>/
+    ├── int8_model.pt, int8_config.json
+    └── config.json, dict.SRC.json, dict.TGT.json, model.SRC, model.TGT, ...
+
+and loaded with `load_quantized(output_dir)`.
+
+Usage (from the root directory):
+    python3 huggingface_interface/quantize_int8.py --ckpt_dir ai4bharat/indictrans2-en-indic-dist-200M \\
+        --output_dir indictrans2-en-indic-dist-200M-int8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+from typing import List, Optional
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization import per_channel_dynamic_qconfig, quantize_dynamic
+from transformers.modeling_utils import no_init_weights
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from huggingface_interface.configuration_indictrans import IndicTransConfig
+from huggingface_interface.modeling_indictrans import IndicTransForConditionalGeneration
+
+WEIGHTS_NAME = "int8_model.pt"
+QUANTIZATION_CONFIG_NAME = "int8_config.json"
+WEIGHT_FILE_EXTENSIONS = (".bin", ".safetensors", ".pt", ".pth", ".h5", ".msgpack")
+
+
+def get_linear_modules(model: nn.Module, keep_lm_head_fp32: bool = False) -> List[str]:
+    return [
+        name
+        for name, module in model.named_modules()
+        if isinstance(module, nn.Linear) and not (keep_lm_head_fp32 and name == "lm_head")
+    ]
+
+
+def quantize_model(model: nn.Module, keep_lm_head_fp32: bool = False, modules: Optional[List[str]] = None) -> nn.Module:
+    """
+    Replaces the linear layers of a float32 model (or only `modules`) by dynamically int8-quantised ones with
+    per-channel weight scales, in place.
+
+    Returns:
+        nn.Module: the quantised model, in eval mode.
+    """
+    if modules is None:
+        modules = get_linear_modules(model, keep_lm_head_fp32)
+    model = model.float().eval()
+    return quantize_dynamic(
+        model, {name: per_channel_dynamic_qconfig for name in modules}, dtype=torch.qint8, inplace=True
+    )
+
+
+def local_model_files(ckpt_dir: str) -> str:
+    """
+    Returns a local directory with the config, tokenizer and vocabulary files of a checkpoint: `ckpt_dir` itself,
+    or a snapshot of a hub id without its weights.
+    """
+    if os.path.isdir(ckpt_dir):
+        return ckpt_dir
+
+    from huggingface_hub import snapshot_download
+
+    return snapshot_download(ckpt_dir, ignore_patterns=[f"*{ext}" for ext in WEIGHT_FILE_EXTENSIONS])
+
+
+def copy_model_files(ckpt_dir: str, output_dir: str):
+    """
+    Copies the config, tokenizer and vocabulary files of a checkpoint (everything but its weights).
+    """
+    ckpt_dir = local_model_files(ckpt_dir)
+    for root, _, files in os.walk(ckpt_dir):
+        for name in files:
+            if name.endswith(WEIGHT_FILE_EXTENSIONS) or name in (WEIGHTS_NAME, QUANTIZATION_CONFIG_NAME):
+                continue
+            path = os.path.join(root, name)
+            dst = os.path.join(output_dir, os.path.relpath(path, ckpt_dir))
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy(path, dst)
+
+
+def save_quantized(model: nn.Module, output_dir: str, ckpt_dir: Optional[str] = None):
+    """
+    Saves a model quantised with `quantize_model`, with the files of `ckpt_dir` if given.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if ckpt_dir is not None:
+        copy_model_files(ckpt_dir, output_dir)
+
+    modules = [name for name, module in model.named_modules() if isinstance(module, torch.ao.nn.quantized.dynamic.Linear)]
+    model.config.torch_dtype = torch.float32
+    model.config.save_pretrained(output_dir)
+    torch.save(model.state_dict(), os.path.join(output_dir, WEIGHTS_NAME))
+    with open(os.path.join(output_dir, QUANTIZATION_CONFIG_NAME), "w", encoding="utf-8") as f:
+        json.dump({"dtype": "qint8", "qscheme": "per_channel_affine", "modules": modules}, f, indent=2)
+
+
+def load_quantized(model_dir: str, attn_implementation: Optional[str] = None) -> IndicTransForConditionalGeneration:
+    """
+    Loads a model saved with `save_quantized`: the model is built without initialising its weights, the same
+    layers are quantised, and the int8 weights are loaded into them.
+    """
+    with open(os.path.join(model_dir, QUANTIZATION_CONFIG_NAME), "r", encoding="utf-8") as f:
+        quantization_config = json.load(f)
+
+    config = IndicTransConfig.from_pretrained(model_dir)
+    with no_init_weights():
+        model = IndicTransForConditionalGeneration._from_config(config, attn_implementation=attn_implementation)
+    model = quantize_model(model, modules=quantization_config["modules"])
+
+    state_dict = torch.load(os.path.join(model_dir, WEIGHTS_NAME), map_location="cpu", weights_only=True)
+    model.load_state_dict(state_dict)
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt_dir", type=str, required=True, help="HF model directory or hub id")
+    parser.add_argument("--output_dir", type=str, required=True, help="directory to write the quantised model to")
+    parser.add_argument("--keep_lm_head_fp32", action="store_true", help="do not quantise the output projection")
+    args = parser.parse_args()
+
+    model = IndicTransForConditionalGeneration.from_pretrained(args.ckpt_dir, torch_dtype=torch.float32)
+    model = quantize_model(model, keep_lm_head_fp32=args.keep_lm_head_fp32)
+    save_quantized(model, args.output_dir, args.ckpt_dir)
+
+    size_mb = os.path.getsize(os.path.join(args.output_dir, WEIGHTS_NAME)) / 2**20
+    print(f"Saved the int8 model to {args.output_dir} ({size_mb:.1f} MB)")
@@ -84,6 +84,12 @@ def get_arg_parse():
     parser.add_argument("--lora_dropout", type=float, default=0.1)
     parser.add_argument("--lora_r", type=int, default=16)
     parser.add_argument("--lora_alpha", type=int, default=32)
+    parser.add_argument(
+        "--full_finetune",
+        action="store_true",
+        help="train all the weights instead of LoRA adapters, e.g. to recover a reduced-decoder variant",
+    )
+    parser.add_argument("--freeze_encoder", action="store_true", help="do not train the encoder weights, with --full_finetune")
     parser.add_argument(
         "--report_to",
         type=str,
@@ -268,8 +274,15 @@ def main(args):
 
     model.set_label_smoothing(args.label_smoothing)
 
-    model = get_peft_model(model, lora_config)
-    model.print_trainable_parameters()
+    if args.freeze_encoder:
+        model.get_encoder().requires_grad_(False)
+
+    if args.full_finetune:
+        num_trainable = sum(p.numel() for p in model.parameters() if p.requires_grad)
+        print(f" | > Training {num_trainable} of {sum(p.numel() for p in model.parameters())} parameters ...")
+    else:
+        model = get_peft_model(model, lora_config)
+        model.print_trainable_parameters()
 
     print(f" | > Loading metrics factory with BLEU and chrF ...")
     seq2seq_compute_metrics = compute_metrics_factory(
@@ -343,8 +356,10 @@ def main(args):
     except KeyboardInterrupt:
         print(f" | > Training interrupted ...")
 
-    # this will only save the LoRA adapter weights
+    # this will only save the LoRA adapter weights, or the full model with --full_finetune
     model.save_pretrained(args.output_dir)
+    if args.full_finetune:
+        tokenizer.save_pretrained(args.output_dir)
 
 
 
@@ -0,0 +1,123 @@
+"""
+Base class of the translators that run models outside of ctranslate2 behind the subset of
+`ctranslate2.Translator.translate_batch` used by `inference.engine.Model`.
+"""
+
+import json
+import os
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class TranslationResult(NamedTuple):
+    hypotheses: List[List[str]]
+    scores: List[float]
+
+
+class BatchTranslator:
+    """
+    Maps tokens to ids with the vocabularies of a model directory, batches sentences by length and returns the best
+    hypotheses of `decode`, which subclasses implement.
+
+    Args:
+        model_dir (str): directory with `config.json`, `dict.SRC.json` and `dict.TGT.json`.
+    """
+
+    def __init__(self, model_dir: str):
+        with open(os.path.join(model_dir, "config.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.num_layers = config["decoder_layers"]
+        self.pad_id = config["pad_token_id"]
+        self.eos_id = config["eos_token_id"]
+        self.decoder_start_id = config["decoder_start_token_id"]
+
+        with open(os.path.join(model_dir, "dict.SRC.json"), "r", encoding="utf-8") as f:
+            self.src_vocab = json.load(f)
+        with open(os.path.join(model_dir, "dict.TGT.json"), "r", encoding="utf-8") as f:
+            self.tgt_vocab = {i: token for token, i in json.load(f).items()}
+        self.unk_id = self.src_vocab.get("<unk>", 3)
+
+    def encode_source(
+        self, sents: List[List[str]], max_input_length: Optional[int] = 1024
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Maps tokens to ids, truncates to `max_input_length` tokens, appends `</s>` and pads on the right.
+        """
+        ids = [[self.src_vocab.get(token, self.unk_id) for token in sent[:max_input_length]] for sent in sents]
+        max_len = max(len(x) for x in ids) + 1
+        input_ids = np.full((len(ids), max_len), self.pad_id, dtype=np.int64)
+        for i, x in enumerate(ids):
+            input_ids[i, : len(x) + 1] = x + [self.eos_id]
+        return input_ids, (input_ids != self.pad_id).astype(np.int64)
+
+    def decode_target(self, ids: List[int]) -> List[str]:
+        """
+        Maps generated ids to tokens, up to the first `</s>`.
+        """
+        tokens = []
+        for i in ids:
+            if i == self.eos_id:
+                break
+            if i != self.pad_id:
+                tokens.append(self.tgt_vocab[i])
+        return tokens
+
+    def decode(
+        self,
+        input_ids: np.ndarray,
+        attention_mask: np.ndarray,
+        beam_size: int,
+        max_decoding_length: int,
+        length_penalty: float,
+    ) -> List[List[Tuple[float, List[int]]]]:
+        """
+        Returns:
+            List[List[Tuple[float, List[int]]]]: the finished hypotheses of every source, as (score, ids) pairs
+                sorted from best to worst.
+        """
+        raise NotImplementedError
+
+    def translate_batch(
+        self,
+        source: List[List[str]],
+        max_batch_size: int = 0,
+        batch_type: str = "examples",
+        beam_size: int = 2,
+        num_hypotheses: int = 1,
+        length_penalty: float = 1.0,
+        max_input_length: int = 1024,
+        max_decoding_length: int = 256,
+        return_scores: bool = False,
+        **kwargs,
+    ) -> List[TranslationResult]:
+        """
+        Translates tokenized sentences, see `ctranslate2.Translator.translate_batch`. Other options of
+        ctranslate2 are accepted and ignored.
+
+        Returns:
+            List[TranslationResult]: the `num_hypotheses` best hypotheses of every sentence and their scores.
+        """
+        # sort by length so that batches have little padding
+        order = sorted(range(len(source)), key=lambda i: len(source[i]))
+        batches, batch = [], []
+        for i in order:
+            size = (len(batch) + 1) * (min(len(source[i]), max_input_length) + 1) if batch_type == "tokens" else len(batch) + 1
+            if batch and max_batch_size and size > max_batch_size:
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+        if batch:
+            batches.append(batch)
+
+        results = [None] * len(source)
+        for batch in batches:
+            input_ids, attention_mask = self.encode_source([source[i] for i in batch], max_input_length)
+            beams = self.decode(input_ids, attention_mask, beam_size, max_decoding_length, length_penalty)
+            for i, hyps in zip(batch, beams):
+                hyps = hyps[:num_hypotheses]
+                results[i] = TranslationResult(
+                    hypotheses=[self.decode_target(ids) for _, ids in hyps],
+                    scores=[score for score, _ in hyps] if return_scores else [],
+                )
+        return results
@@ -0,0 +1,95 @@
+"""
+Reports the acceptance rate and speedup of speculative decoding (`inference.speculative_translator`) on CPU, on the
+bundled sample (`inference/sample_data`) or any source file.
+
+Every sentence is translated greedily with the full model alone, with the draft model alone, and with speculative
+decoding for each `--num_draft_tokens`. For each, the report gives the mean latency per sentence, the speedup over
+the full model, the fraction of translations identical to those of the full model and BLEU if references exist. For
+speculative decoding, it also gives the fraction of drafted tokens accepted and the tokens generated per forward
+pass of the full model.
+
+Usage (from the root directory):
+    python3 -m inference.benchmark_speculative --model_dir indictrans2-en-indic-1B \\
+        --draft_model_dir indictrans2-en-indic-dist-200M --num_draft_tokens 2 4 6
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List
+
+from sacrebleu.metrics import BLEU
+
+from .benchmark_utils import SAMPLE_DIR, encode_sample, read_lines
+from .speculative_translator import SpeculativeTranslator
+
+
+def run(translator: SpeculativeTranslator, sents: List[List[str]], max_decoding_length: int) -> dict:
+    translator.translate_batch(sents[:1], max_decoding_length=max_decoding_length)  # warm-up
+    translator.reset_stats()
+    start = time.perf_counter()
+    results = translator.translate_batch(sents, max_decoding_length=max_decoding_length)
+    seconds = time.perf_counter() - start
+
+    stats = translator.stats
+    row = {
+        "ms_per_sentence": round(1000 * seconds / len(sents), 2),
+        "tokens_per_target_call": round(stats["generated_tokens"] / max(stats["target_calls"], 1), 3),
+        "hyps": [" ".join(x.hypotheses[0]) for x in results],
+    }
+    if stats["drafted_tokens"]:
+        row["acceptance_rate"] = round(stats["accepted_tokens"] / stats["drafted_tokens"], 4)
+    return row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_dir", type=str, required=True, help="HF directory of the full model")
+    parser.add_argument("--draft_model_dir", type=str, required=True, help="HF directory of the distilled model")
+    parser.add_argument("--num_draft_tokens", type=int, nargs="+", default=[2, 4, 6])
+    parser.add_argument("--src_lang", type=str, default="eng_Latn", help="flores code of the sample source")
+    parser.add_argument("--tgt_lang", type=str, default="hin_Deva", help="flores code of the sample target")
+    parser.add_argument("--sample_dir", type=str, default=SAMPLE_DIR, help="directory with `sample.{lang}` files")
+    parser.add_argument("--src_file", type=str, default=None, help="source sentences, instead of the sample")
+    parser.add_argument("--max_decoding_length", type=int, default=256)
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads, 0 lets torch decide")
+    parser.add_argument("--report_json", type=str, default=None)
+    args = parser.parse_args()
+
+    src_path = args.src_file or os.path.join(args.sample_dir, f"sample.{args.src_lang}")
+    sents = encode_sample(args.model_dir, read_lines(src_path), args.src_lang, args.tgt_lang)
+    ref_path = os.path.join(args.sample_dir, f"sample.{args.tgt_lang}")
+    refs = read_lines(ref_path) if args.src_file is None and os.path.isfile(ref_path) else None
+
+    translator = SpeculativeTranslator(args.model_dir, args.draft_model_dir, device=args.device, intra_threads=args.threads)
+    model, draft_model = translator.model, translator.draft_model
+
+    # each model alone decodes greedily, without a draft model
+    translator.draft_model = None
+    rows = [{"method": "target", **run(translator, sents, args.max_decoding_length)}]
+    translator.model = draft_model
+    rows.append({"method": "draft", **run(translator, sents, args.max_decoding_length)})
+    translator.model, translator.draft_model = model, draft_model
+    for num_draft_tokens in args.num_draft_tokens:
+        translator.num_draft_tokens = num_draft_tokens
+        rows.append({"method": "speculative", "num_draft_tokens": num_draft_tokens, **run(translator, sents, args.max_decoding_length)})
+
+    target_hyps = rows[0]["hyps"]
+    report = []
+    for row in rows:
+        hyps = row.pop("hyps")
+        if row is not rows[0]:
+            row["speedup"] = round(rows[0]["ms_per_sentence"] / row["ms_per_sentence"], 2)
+            row["same_as_target"] = round(sum(h == r for h, r in zip(hyps, target_hyps)) / len(hyps), 4)
+        if refs is not None:
+            # sentence pieces are joined back into text for scoring
+            detok = [h.replace(" ", "").replace("▁", " ").strip() for h in hyps]
+            row["bleu"] = round(BLEU().corpus_score(detok, [refs]).score, 2)
+        report.append(row)
+        print(json.dumps(row))
+
+    if args.report_json:
+        with open(args.report_json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
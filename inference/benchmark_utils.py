@@ -0,0 +1,47 @@
+"""
+Helpers shared by the conversion and benchmark scripts, which compare models, backends or decoding methods on the
+bundled sample (`inference/sample_data`) or any source file.
+"""
+
+import os
+from typing import List
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data")
+
+
+def read_lines(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f]
+
+
+def find_spm_dir(model_dir: str) -> str:
+    """
+    Returns the directory with the sentence piece models of a model directory: `model_dir/vocab` if it exists,
+    otherwise `model_dir`.
+    """
+    vocab_dir = os.path.join(model_dir, "vocab")
+    return vocab_dir if os.path.isdir(vocab_dir) else model_dir
+
+
+def encode_sample(model_dir: str, sents: List[str], src_lang: str, tgt_lang: str) -> List[List[str]]:
+    """
+    Encodes raw sentences with the source sentence piece model of `model_dir` (see `find_spm_dir`) and adds the
+    language tags. The rest of the `Model` preprocessing is skipped: it does not change how two models,
+    backends or decoding methods compare on the same inputs, so the scores are only meant for such comparisons.
+    """
+    import sentencepiece as spm
+
+    sp_src = spm.SentencePieceProcessor(model_file=os.path.join(find_spm_dir(model_dir), "model.SRC"))
+    return [[src_lang, tgt_lang] + sp_src.encode(sent, out_type=str) for sent in sents]
+
+
+def get_dir_size(path: str, suffix: str = "") -> int:
+    """
+    Returns the size in bytes of the files of a directory and its subdirectories, only those ending with `suffix`.
+    """
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+        if name.endswith(suffix)
+    )
@@ -0,0 +1,241 @@
+"""
+Converts a fairseq or HuggingFace IndicTrans2 checkpoint to CTranslate2 models at one or more quantisation levels,
+in the layout expected by `inference.engine.Model` and the Triton backend:
+
+    <output_dir>/ct2_<quantization>_model/
+    ├── model.bin, config.json, shared/source/target vocabularies
+    └── vocab/model.SRC, vocab/model.TGT
+
+Each converted model is then smoke tested on CPU with `Model`. The report gives its size on disk, load time,
+throughput and BLEU on a small bundled sample (`inference/sample_data`). It also gives the BLEU drift relative
+to the most precise quantisation level converted.
+
+Usage (from the root directory):
+    python3 -m inference.convert_to_ct2 --fairseq_dir checkpoints/en-indic/fairseq_model \\
+        --output_dir checkpoints/en-indic --quantization float16 int8_float16 int8
+    python3 -m inference.convert_to_ct2 --hf_dir indictrans2-indic-en-dist-200M \\
+        --output_dir checkpoints/indic-en --quantization int8 --src_lang hin_Deva --tgt_lang eng_Latn
+"""
+
+import argparse
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Dict, List
+
+import ctranslate2
+from ctranslate2.converters import Converter, FairseqConverter
+from ctranslate2.converters.fairseq import (
+    set_input_layers,
+    set_layer_norm,
+    set_linear,
+    set_transformer_decoder_layer,
+    set_transformer_encoder,
+)
+from ctranslate2.specs import common_spec, transformer_spec
+
+from .benchmark_utils import SAMPLE_DIR, get_dir_size, read_lines
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# from the most to the least precise, used to pick the reference of the BLEU drift
+QUANTIZATION_LEVELS = ("float32", "bfloat16", "float16", "int16", "int8_float32", "int8_bfloat16", "int8_float16", "int8")
+QUANTIZATION_DIR_NAMES = {"float32": "ct2_fp32_model", "float16": "ct2_fp16_model"}
+
+SUPPORTED_ACTIVATIONS = {
+    "gelu": common_spec.Activation.GELU,
+    "relu": common_spec.Activation.RELU,
+    "swish": common_spec.Activation.SWISH,
+}
+
+
+def get_output_dir_name(quantization: str) -> str:
+    return QUANTIZATION_DIR_NAMES.get(quantization, f"ct2_{quantization}_model")
+
+
+def load_hf_vocab(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        token_to_id = json.load(f)
+    vocab = sorted(token_to_id, key=token_to_id.get)
+    return ["<blank>" if token == "<pad>" else token for token in vocab]
+
+
+class IndicTransHFConverter(Converter):
+    """
+    Converts HuggingFace `IndicTransForConditionalGeneration` checkpoints, whose modules mirror the fairseq ones,
+    so the weight setters of the ctranslate2 fairseq converter are reused.
+
+    Args:
+        model_dir (str): directory with the HF model and its `dict.SRC.json`/`dict.TGT.json` vocabularies.
+    """
+
+    def __init__(self, model_dir: str):
+        self.model_dir = model_dir
+
+    def _load(self):
+        import torch
+
+        sys.path.insert(0, ROOT_DIR)
+        from huggingface_interface.modeling_indictrans import IndicTransForConditionalGeneration
+
+        with torch.no_grad():
+            model = IndicTransForConditionalGeneration.from_pretrained(self.model_dir, torch_dtype=torch.float32)
+            model.eval()
+            config = model.config
+
+            if config.activation_function not in SUPPORTED_ACTIVATIONS:
+                raise ValueError(f"Unsupported activation function: {config.activation_function}")
+            if config.encoder_normalize_before != config.decoder_normalize_before:
+                raise ValueError("Encoder and decoder must use the same layer norm placement")
+
+            spec = transformer_spec.TransformerSpec.from_config(
+                (config.encoder_layers, config.decoder_layers),
+                config.encoder_attention_heads,
+                pre_norm=config.encoder_normalize_before,
+                activation=SUPPORTED_ACTIVATIONS[config.activation_function],
+                layernorm_embedding=config.layernorm_embedding,
+            )
+
+            set_transformer_encoder(spec.encoder, model.model.encoder)
+
+            decoder = model.model.decoder
+            set_input_layers(spec.decoder, decoder)
+            set_linear(spec.decoder.projection, model.lm_head)
+            for layer_spec, layer in zip(spec.decoder.layer, decoder.layers):
+                set_transformer_decoder_layer(layer_spec, layer)
+            if decoder.layer_norm is not None:
+                set_layer_norm(spec.decoder.layer_norm, decoder.layer_norm)
+            if decoder.layernorm_embedding is not None:
+                set_layer_norm(spec.decoder.layernorm_embedding, decoder.layernorm_embedding)
+
+        spec.register_source_vocabulary(load_hf_vocab(os.path.join(self.model_dir, "dict.SRC.json")))
+        spec.register_target_vocabulary(load_hf_vocab(os.path.join(self.model_dir, "dict.TGT.json")))
+        spec.config.decoder_start_token = spec.config.eos_token
+        spec.config.add_source_eos = True
+        return spec
+
+
+def get_converter(args) -> Converter:
+    if args.hf_dir:
+        return IndicTransHFConverter(args.hf_dir)
+
+    kwargs = {}
+    # fairseq checkpoints store their arguments as an `argparse.Namespace`, which recent ctranslate2
+    # versions refuse to unpickle unless explicitly allowed
+    if "unsafe_deserialization" in inspect.signature(FairseqConverter.__init__).parameters:
+        kwargs["unsafe_deserialization"] = True
+    return FairseqConverter(
+        os.path.join(args.fairseq_dir, "model", "checkpoint_best.pt"),
+        os.path.join(args.fairseq_dir, "final_bin"),
+        source_lang="SRC",
+        target_lang="TGT",
+        user_dir=os.path.join(ROOT_DIR, "model_configs"),
+        **kwargs,
+    )
+
+
+def copy_spm_models(args, output_dir: str):
+    """
+    Copies the sentence piece models to `<output_dir>/vocab`, where `Model` looks for them.
+    """
+    src_dir = args.hf_dir if args.hf_dir else os.path.join(args.fairseq_dir, "vocab")
+    if os.path.isdir(os.path.join(src_dir, "vocab")):
+        src_dir = os.path.join(src_dir, "vocab")
+
+    os.makedirs(os.path.join(output_dir, "vocab"), exist_ok=True)
+    for name in ("model.SRC", "model.TGT"):
+        path = os.path.join(src_dir, name)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Sentence piece model not found: {path}")
+        shutil.copy(path, os.path.join(output_dir, "vocab", name))
+
+
+def smoke_test(ckpt_dir: str, src_lang: str, tgt_lang: str, sample_dir: str) -> Dict[str, float]:
+    """
+    Loads a converted model on CPU and translates the bundled sample with it.
+
+    Returns:
+        Dict[str, float]: load time in seconds, throughput in sentences per second and BLEU against the
+            sample references (if a reference file exists for `tgt_lang`).
+    """
+    from sacrebleu.metrics import BLEU
+
+    from .engine import Model
+
+    start = time.perf_counter()
+    ctranslate2.Translator(ckpt_dir, device="cpu")
+    load_seconds = time.perf_counter() - start
+
+    sents = read_lines(os.path.join(sample_dir, f"sample.{src_lang}"))
+    model = Model(ckpt_dir, device="cpu", model_type="ctranslate2")
+
+    start = time.perf_counter()
+    hyps = model.paragraphs_batch_translate__multilingual([(sent, src_lang, tgt_lang) for sent in sents])
+    throughput = len(sents) / (time.perf_counter() - start)
+
+    if not all(hyps):
+        raise RuntimeError(f"Smoke test failed, empty translations from {ckpt_dir}")
+
+    result = {"load_seconds": round(load_seconds, 3), "sentences_per_second": round(throughput, 2)}
+    ref_path = os.path.join(sample_dir, f"sample.{tgt_lang}")
+    if os.path.isfile(ref_path):
+        result["bleu"] = round(BLEU().corpus_score(hyps, [read_lines(ref_path)]).score, 2)
+    return result
+
+
+def print_report(report: List[dict]):
+    headers = ["quantization", "size_mb", "load_seconds", "sentences_per_second", "bleu", "bleu_drift"]
+    print("\t".join(headers))
+    for row in report:
+        print("\t".join(str(row.get(key, "-")) for key in headers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--fairseq_dir",
+        type=str,
+        help="fairseq model directory with `model/checkpoint_best.pt`, `final_bin` and `vocab`",
+    )
+    source.add_argument(
+        "--hf_dir",
+        type=str,
+        help="HF model directory with `dict.SRC.json`, `dict.TGT.json`, `model.SRC` and `model.TGT`",
+    )
+    parser.add_argument("--output_dir", type=str, required=True, help="directory to write the ct2 models to")
+    parser.add_argument(
+        "--quantization", type=str, nargs="+", default=["int8"], choices=QUANTIZATION_LEVELS
+    )
+    parser.add_argument("--force", action="store_true", help="overwrite existing ct2 model directories")
+    parser.add_argument("--skip_smoke_test", action="store_true")
+    parser.add_argument("--src_lang", type=str, default="eng_Latn", help="flores code of the sample source")
+    parser.add_argument("--tgt_lang", type=str, default="hin_Deva", help="flores code of the sample target")
+    parser.add_argument("--sample_dir", type=str, default=SAMPLE_DIR, help="directory with `sample.{lang}` files")
+    parser.add_argument("--report_json", type=str, default=None)
+    args = parser.parse_args()
+
+    converter = get_converter(args)
+    quantizations = sorted(set(args.quantization), key=QUANTIZATION_LEVELS.index)
+
+    report = []
+    for quantization in quantizations:
+        output_dir = os.path.join(args.output_dir, get_output_dir_name(quantization))
+        print(f"Converting to {output_dir} ({quantization})")
+        converter.convert(output_dir, quantization=quantization, force=args.force)
+        copy_spm_models(args, output_dir)
+
+        row = {"quantization": quantization, "path": output_dir, "size_mb": round(get_dir_size(output_dir) / 2**20, 1)}
+        if not args.skip_smoke_test:
+            row.update(smoke_test(output_dir, args.src_lang, args.tgt_lang, args.sample_dir))
+            if "bleu" in row:
+                row["bleu_drift"] = round(row["bleu"] - report[0]["bleu"], 2) if report else 0.0
+        report.append(row)
+
+    print_report(report)
+    if args.report_json:
+        with open(args.report_json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
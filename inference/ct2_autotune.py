@@ -0,0 +1,153 @@
+"""
+Benchmarks CTranslate2 compute types and thread layouts on the local machine and writes the fastest setting
+next to the model, where `inference/server.py` and the Triton backend pick it up.
+
+Only decoding is timed: the sample sentences are preprocessed once and then translated in batches, with
+`inter_threads` batches in flight at a time so that every translator replica is kept busy. The outputs of every
+compute type are compared to those of `float32` to flag quantisation drift.
+
+Usage (from the root directory):
+    python3 -m inference.ct2_autotune --ckpt_dir checkpoints/en-indic/ct2_fp16_model \\
+        --input flores/devtest/eng_Latn.devtest --src_lang eng_Latn --tgt_lang hin_Deva --num_cores 8
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+CT2_SETTINGS_FILE = "ct2_settings.json"
+CPU_COMPUTE_TYPES = ("int8", "int8_float32", "int16", "float32")
+REFERENCE_COMPUTE_TYPE = "float32"
+
+
+def load_ct2_settings(ckpt_dir: str) -> Dict[str, object]:
+    """
+    Reads the setting written by the auto-tuner for a checkpoint, if any.
+
+    Args:
+        ckpt_dir (str): path of the ctranslate2 model directory.
+
+    Returns:
+        Dict[str, object]: `compute_type`, `inter_threads` and `intra_threads` keyword arguments for `Model`,
+            or an empty dict if the model was not tuned.
+    """
+    path = os.path.join(ckpt_dir, CT2_SETTINGS_FILE)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        best = json.load(f)["best"]
+    return {key: best[key] for key in ("compute_type", "inter_threads", "intra_threads")}
+
+
+def thread_layouts(num_cores: int) -> List[Tuple[int, int]]:
+    """
+    Lists the `(inter_threads, intra_threads)` splits of `num_cores` to try, from one replica using all the
+    cores to one single-threaded replica per core.
+    """
+    return [(x, num_cores // x) for x in range(1, num_cores + 1) if num_cores % x == 0]
+
+
+def benchmark(
+    model, lines: List[List[str]], batch_size: int, inter_threads: int, repeats: int = 1
+) -> Tuple[float, List[List[str]]]:
+    """
+    Times the translation of preprocessed (tagged and tokenized) `lines` with `inter_threads` batches in flight.
+
+    Returns:
+        Tuple[float, List[List[str]]]: throughput in sentences per second and the output tokens of `lines`.
+    """
+    batches = [lines[i : i + batch_size] for i in range(0, len(lines), batch_size)]
+    translate = lambda batch: model.translate_lines(batch, [0] * len(batch))
+
+    translate(batches[0])  # warm-up
+    with ThreadPoolExecutor(max_workers=inter_threads) as executor:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            translations = [x for batch in executor.map(translate, batches) for x in batch]
+        seconds = time.perf_counter() - start
+    return len(lines) * repeats / seconds, translations
+
+
+def autotune(args) -> dict:
+    import ctranslate2
+
+    from .engine import Model
+
+    supported = ctranslate2.get_supported_compute_types("cpu")
+    compute_types = [x for x in args.compute_types.split(",") if x in supported]
+    skipped = sorted(set(args.compute_types.split(",")) - set(compute_types))
+    if skipped:
+        print(f"Skipping compute types not supported on this CPU: {', '.join(skipped)}")
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        sents = [line.strip() for line in f if line.strip()][: args.num_sentences]
+
+    lines, results, outputs = None, [], {}
+    for compute_type in compute_types:
+        for inter_threads, intra_threads in thread_layouts(args.num_cores):
+            model = Model(
+                args.ckpt_dir,
+                device="cpu",
+                model_type="ctranslate2",
+                compute_type=compute_type,
+                inter_threads=inter_threads,
+                intra_threads=intra_threads,
+            )
+            if lines is None:
+                lines, _ = model.preprocess_batch(sents, args.src_lang, args.tgt_lang)
+
+            throughput, translations = benchmark(model, lines, args.batch_size, inter_threads, args.repeats)
+            outputs[compute_type] = translations
+            results.append(
+                {
+                    "compute_type": compute_type,
+                    "inter_threads": inter_threads,
+                    "intra_threads": intra_threads,
+                    "sentences_per_second": round(throughput, 2),
+                }
+            )
+            print(
+                f"{compute_type:>14} inter_threads={inter_threads:<3} intra_threads={intra_threads:<3} "
+                f"{throughput:8.2f} sents/s"
+            )
+            del model
+
+    if REFERENCE_COMPUTE_TYPE in outputs:
+        reference = outputs[REFERENCE_COMPUTE_TYPE]
+        for result in results:
+            hyps = outputs[result["compute_type"]]
+            result["match_with_float32"] = round(sum(h == r for h, r in zip(hyps, reference)) / len(reference), 4)
+
+    results.sort(key=lambda x: x["sentences_per_second"], reverse=True)
+    return {"num_cores": args.num_cores, "num_sentences": len(sents), "best": results[0], "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt_dir", type=str, required=True, help="ctranslate2 model directory")
+    parser.add_argument("--input", type=str, required=True, help="file with one raw source sentence per line")
+    parser.add_argument("--src_lang", type=str, required=True, help="flores code of the input sentences")
+    parser.add_argument("--tgt_lang", type=str, required=True, help="flores code to translate into")
+    parser.add_argument("--num_sentences", type=int, default=256)
+    parser.add_argument("--batch_size", type=int, default=16, help="sentences per translation call")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--compute_types", type=str, default=",".join(CPU_COMPUTE_TYPES))
+    parser.add_argument(
+        "--num_cores", type=int, default=len(os.sched_getaffinity(0)), help="cores available to one replica"
+    )
+    parser.add_argument("--output", type=str, default=None, help=f"defaults to `<ckpt_dir>/{CT2_SETTINGS_FILE}`")
+    args = parser.parse_args()
+
+    report = autotune(args)
+    output = args.output or os.path.join(args.ckpt_dir, CT2_SETTINGS_FILE)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    best = report["best"]
+    print(
+        f"Best: compute_type={best['compute_type']} inter_threads={best['inter_threads']} "
+        f"intra_threads={best['intra_threads']} ({best['sentences_per_second']} sents/s), written to {output}"
+    )
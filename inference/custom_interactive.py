@@ -86,10 +86,17 @@ class Translator:
     """
     
     def __init__(
-        self, data_dir, checkpoint_path, batch_size=25, constrained_decoding=False
+        self,
+        data_dir,
+        checkpoint_path,
+        batch_size=25,
+        constrained_decoding=False,
+        max_len_a=0,
+        max_len_b=200,
     ):
 
         self.constrained_decoding = constrained_decoding
+        self.default_max_len = (max_len_a, max_len_b)
         self.parser = options.get_generation_parser(interactive=True)
         # buffer_size is currently not used but we just initialize it to batch
         # size + 1 to avoid any assertion errors.
@@ -100,6 +107,8 @@ class Translator:
                 constraints="ordered",
                 batch_size=batch_size,
                 buffer_size=batch_size + 1,
+                max_len_a=max_len_a,
+                max_len_b=max_len_b,
             )
         else:
             self.parser.set_defaults(
@@ -108,6 +117,8 @@ class Translator:
                 num_workers=-1,
                 batch_size=batch_size,
                 buffer_size=batch_size + 1,
+                max_len_a=max_len_a,
+                max_len_b=max_len_b,
             )
         args = options.parse_args_and_arch(self.parser, input_args=[data_dir])
         # we are explictly setting src_lang and tgt_lang here
@@ -200,6 +211,13 @@ class Translator:
             self.task.max_positions(), *[model.max_positions() for model in self.models]
         )
 
+    def set_max_len(self, max_len_a, max_len_b):
+        """
+        Sets the maximum decoding length of the next `translate` calls to `max_len_a * src_len + max_len_b`.
+        """
+        self.generator.max_len_a = max_len_a
+        self.generator.max_len_b = max_len_b
+
     def encode_fn(self, x):
         if self.tokenizer is not None:
             x = self.tokenizer.encode(x)
@@ -1,9 +1,9 @@
 import hashlib
+import math
 import os
 import uuid
-from typing import List, Tuple, Union, Dict
+from typing import List, Optional, Tuple, Union, Dict
 
-import regex as re
 import sentencepiece as spm
 from indicnlp.normalize import indic_normalize
 from indicnlp.tokenize import indic_detokenize, indic_tokenize
@@ -15,7 +15,22 @@ from sacremoses import MosesDetokenizer, MosesPunctNormalizer, MosesTokenizer
 from tqdm import tqdm
 
 from .flores_codes_map_indic import flores_codes, iso_to_flores
-from .normalize_punctuation import punc_norm
+from .lang_id import matches_script, script_fractions
+from .length_ratio import LengthLimits
+from .metrics import (
+    BATCH_PADDING_RATIO,
+    BATCH_SENTENCES,
+    DECODING_LIMIT_REACHED,
+    INPUT_TOKENS,
+    MAX_DECODING_LENGTH,
+    OUTPUT_TOKENS,
+    PARAGRAPHS,
+    PASSTHROUGH,
+    REQUESTS,
+    SENTENCES,
+    STAGE_SECONDS,
+)
+from .normalize_punctuation import punc_norm, punc_norm_lang
 from .normalize_regex_inference import EMAIL_PATTERN, normalize
 
 
@@ -31,10 +46,6 @@ def split_sentences(paragraph: str, lang: str) -> List[str]:
     Returns:
         List[str] -> list of sentences.
     """
-    
-    print("split_sentence")
-    print("3rd test")
-    print("4th test")
     if lang == "eng_Latn":
         with MosesSentenceSplitter(flores_codes[lang]) as splitter:
             sents_moses = splitter([paragraph])
@@ -65,57 +76,47 @@ def add_token(sent: str, src_lang: str, tgt_lang: str, delimiter: str = " ") ->
     return src_lang + delimiter + tgt_lang + delimiter + sent
 
 
-def apply_lang_tags(sents: List[str], src_lang: str, tgt_lang: str) -> List[str]:
+def apply_lang_tags(sents: List[List[str]], src_lang: str, tgt_lang: str) -> List[List[str]]:
     """
-    Add special tokens indicating source and target language to the start of the each input sentence.
-    Each resulting input sentence will have the format: "`{src_lang} {tgt_lang} {input_sentence}`".
+    Add special tokens indicating source and target language to the start of the each tokenized input sentence.
+    Each resulting input sentence will have the format: `[src_lang, tgt_lang, *input_tokens]`.
 
     Args:
-        sent (str): input sentence to be translated.
+        sents (List[List[str]]): input sentences to be translated, as lists of sentence piece tokens.
         src_lang (str): flores lang code of the input sentence.
         tgt_lang (str): flores lang code in which the input sentence will be translated.
 
     Returns:
-        List[str]: list of input sentences with the special tokens added to the start.
+        List[List[str]]: list of tokenized input sentences with the special tokens added to the start.
     """
-    tagged_sents = []
-    for sent in sents:
-        tagged_sent = add_token(sent.strip(), src_lang, tgt_lang)
-        tagged_sents.append(tagged_sent)
-    return tagged_sents
+    return [[src_lang, tgt_lang] + tokens for tokens in sents]
 
 
 def truncate_long_sentences(
-    sents: List[str], placeholder_entity_map_sents: List[Dict]
-) -> Tuple[List[str], List[Dict]]:
+    sents: List[List[str]], placeholder_entity_map_sents: List[Dict]
+) -> Tuple[List[List[str]], List[Dict]]:
     """
-    Truncates the sentences that exceed the maximum sequence length.
+    Splits the sentences that exceed the maximum sequence length into chunks of at most that length.
     The maximum sequence for the IndicTrans2 model is limited to 256 tokens.
 
     Args:
-        sents (List[str]): list of input sentences to truncate.
+        sents (List[List[str]]): list of tokenized input sentences to truncate.
 
     Returns:
-        Tuple[List[str], List[Dict]]: tuple containing the list of sentences with truncation applied and the updated placeholder entity maps.
+        Tuple[List[List[str]], List[Dict]]: tuple containing the list of sentences with truncation applied and the updated placeholder entity maps.
     """
     MAX_SEQ_LEN = 256
     new_sents = []
     placeholders = []
 
-    for j, sent in enumerate(sents):
-        words = sent.split()
-        num_words = len(words)
-        if num_words > MAX_SEQ_LEN:
-            sents = []
-            i = 0
-            while i <= len(words):
-                sents.append(" ".join(words[i : i + MAX_SEQ_LEN]))
-                i += MAX_SEQ_LEN
-            placeholders.extend([placeholder_entity_map_sents[j]] * (len(sents)))
-            new_sents.extend(sents)
+    for j, tokens in enumerate(sents):
+        if len(tokens) > MAX_SEQ_LEN:
+            chunks = [tokens[i : i + MAX_SEQ_LEN] for i in range(0, len(tokens), MAX_SEQ_LEN)]
+            placeholders.extend([placeholder_entity_map_sents[j]] * len(chunks))
+            new_sents.extend(chunks)
         else:
             placeholders.append(placeholder_entity_map_sents[j])
-            new_sents.append(sent)
+            new_sents.append(tokens)
     return new_sents, placeholders
 
 
@@ -130,6 +131,15 @@ class Model:
         device: str = "cuda",
         input_lang_code_format: str = "flores",
         model_type: str = "ctranslate2",
+        direction: str = None,
+        compute_type: str = "default",
+        inter_threads: int = 1,
+        intra_threads: int = 0,
+        cpu_cores: Optional[List[int]] = None,
+        draft_ckpt_dir: Optional[str] = None,
+        num_draft_tokens: int = 4,
+        length_ratio_file: Optional[str] = None,
+        early_stopping_margin: Optional[float] = None,
     ):
         """
         Initialize the model class.
@@ -137,22 +147,50 @@ class Model:
         Args:
             ckpt_dir (str): path of the model checkpoint directory.
             device (str, optional): where to load the model (defaults: cuda).
+            direction (str, optional): name used to label the metrics of this model, e.g. `en-indic`
+                (defaults: name of the checkpoint directory).
+            compute_type (str, optional): ctranslate2 compute type, e.g. `int8`, `int8_float32`, `int16` or
+                `float32` on CPU (defaults: default, i.e. the type the model was converted with).
+            inter_threads (int, optional): number of batches translated in parallel by ctranslate2 (defaults: 1).
+            intra_threads (int, optional): number of threads used per batch, 0 lets the backend decide (defaults: 0).
+                With `model_type="onnx"`, this is the number of ONNX Runtime intra-op threads.
+            cpu_cores (List[int], optional): CPU cores to pin the current process to before loading the model,
+                so that replicas sharing a machine do not compete for the same cores (defaults: None, no pinning).
+            draft_ckpt_dir (str, optional): with `model_type="speculative"`, HF directory of the distilled model
+                drafting tokens for the HF model in `ckpt_dir` (defaults: None, plain greedy decoding).
+            num_draft_tokens (int, optional): with `model_type="speculative"`, tokens drafted before each
+                verification by the model in `ckpt_dir` (defaults: 4).
+            length_ratio_file (str, optional): maximum decoding lengths fitted with `inference.length_ratio`
+                (defaults: None, `<ckpt_dir>/length_ratio.json` if it exists, otherwise a fixed limit of 256 tokens).
+            early_stopping_margin (float, optional): with `model_type="onnx"`, the beam search of a sentence stops
+                once its best finished hypothesis scores this much above every active beam (defaults: None, only
+                the stopping criterion of `transformers`).
         """
+        if cpu_cores:
+            os.sched_setaffinity(0, cpu_cores)
+
         self.ckpt_dir = ckpt_dir
+        self.direction = direction or os.path.basename(os.path.normpath(ckpt_dir))
         self.en_tok = MosesTokenizer(lang="en")
         self.en_normalizer = MosesPunctNormalizer()
         self.en_detok = MosesDetokenizer(lang="en")
         self.xliterator = unicode_transliterate.UnicodeIndicTransliterator()
 
         print("Initializing sentencepiece model for SRC and TGT")
+        # HF model directories keep the sentence piece models next to the weights
+        spm_dir = os.path.join(ckpt_dir, "vocab") if os.path.isdir(os.path.join(ckpt_dir, "vocab")) else ckpt_dir
         self.sp_src = spm.SentencePieceProcessor(
-            model_file=os.path.join(ckpt_dir, "vocab", "model.SRC")
+            model_file=os.path.join(spm_dir, "model.SRC")
         )
         self.sp_tgt = spm.SentencePieceProcessor(
-            model_file=os.path.join(ckpt_dir, "vocab", "model.TGT")
+            model_file=os.path.join(spm_dir, "model.TGT")
         )
+        self.unk_piece = self.sp_tgt.id_to_piece(self.sp_tgt.unk_id())
+        # batches are encoded on the cores the process may run on (see `cpu_cores`)
+        self.spm_threads = len(os.sched_getaffinity(0))
 
         self.input_lang_code_format = input_lang_code_format
+        self.length_limits = LengthLimits.load(ckpt_dir, length_ratio_file)
 
         print("Initializing model for translation")
         # initialize the model
@@ -160,18 +198,46 @@ class Model:
             import ctranslate2
 
             self.translator = ctranslate2.Translator(
-                self.ckpt_dir, device=device
-            )  # , compute_type="auto")
+                self.ckpt_dir,
+                device=device,
+                compute_type=compute_type,
+                inter_threads=inter_threads,
+                intra_threads=intra_threads,
+            )
             self.translate_lines = self.ctranslate2_translate_lines
         elif model_type == "fairseq":
+            import torch
+
             from .custom_interactive import Translator
 
+            if intra_threads:
+                torch.set_num_threads(intra_threads)
             self.translator = Translator(
                 data_dir=os.path.join(self.ckpt_dir, "final_bin"),
                 checkpoint_path=os.path.join(self.ckpt_dir, "model", "checkpoint_best.pt"),
                 batch_size=100,
             )
             self.translate_lines = self.fairseq_translate_lines
+        elif model_type == "onnx":
+            from .onnx_translator import OnnxTranslator
+
+            # `OnnxTranslator` provides the `translate_batch` interface of ctranslate2
+            self.translator = OnnxTranslator(
+                self.ckpt_dir, intra_threads=intra_threads, early_stopping_margin=early_stopping_margin
+            )
+            self.translate_lines = self.ctranslate2_translate_lines
+        elif model_type == "speculative":
+            from .speculative_translator import SpeculativeTranslator
+
+            # greedy decoding of the HF model in `ckpt_dir`, with tokens drafted by the model in `draft_ckpt_dir`
+            self.translator = SpeculativeTranslator(
+                self.ckpt_dir,
+                draft_model_dir=draft_ckpt_dir,
+                device=device,
+                num_draft_tokens=num_draft_tokens,
+                intra_threads=intra_threads,
+            )
+            self.translate_lines = self.ctranslate2_translate_lines
         else:
             raise NotImplementedError(f"Unknown model_type: {model_type}")
 
@@ -180,13 +246,10 @@ class Model:
             ('\u0041', '\u005A'),  # A-Z (uppercase English letters)
             ('\u0061', '\u007A')   # a-z (lowercase English letters)
         ]
-        print(f"char : - {char}")
         # Iterate through each word in the list
         for word in char:
-            print(f"word: {word}")
             # Now iterate through each character in the word
             for character in word:
-                print(f"character: {character}")
                 # Check if the character is not in the ignore list and is within the allowed ranges
                 if character not in ignore_list and any(start <= character <= end for start, end in allowed_ranges):
                     
@@ -195,118 +258,148 @@ class Model:
         return False
     
     
-    def ctranslate2_translate_lines(self,  lines: List[str], len_id: list) -> List[str]:
-        tokenized_sents = [x.strip().split(" ") for x in lines]
-        if tokenized_sents[0][0] == "eng_Latn":
-            print(f"ctranslate2_translate_lines : tokenized sents{lines}")
-            print(f"ctranslate2_translate_lines : tokenized sents{tokenized_sents}")
-            translations = self.translator.translate_batch(
-                tokenized_sents,
-                max_batch_size=9216,
-                batch_type="tokens",
-                max_input_length=160,
-                max_decoding_length=256,
-                return_scores=True,
-                beam_size=5,
-                num_hypotheses = 5
-                # target_prefix = [["नरेंद्र मोदी स्वतंत्रता दिवस पर लोगों को संबोधित कर रहे हैं।"]]
-            )
-            final_response = []
-            for i, len_ids in zip(translations,len_id):
-                
-                found_correct = False
-                for j in i.hypotheses:
-                    
-                    if len_ids == 0:
-                        ignore_list = []
-                        
-                    else:
-                        ignore_list = ['I',"D"] 
-                        
-                    if not self.is_english(j,ignore_list):
-                        
-                        final_response.append(j)
-                        found_correct = True
-                        break
-                if not found_correct:
-                    final_response.append(i.hypotheses[0])                  
-            translations = [" ".join(x) for x in final_response]   
-            
-            return translations         
-        else:
-            
-            tokenized_sents = [x.strip().split(" ") for x in lines]
-            
-            translations = self.translator.translate_batch(
+    def ctranslate2_translate_lines(
+        self, tokenized_sents: List[List[str]], len_id: Optional[List[int]] = None
+    ) -> List[List[str]]:
+        """
+        Translates tagged and sentence piece encoded sentences in a single batch, whatever their directions. The
+        decoding policy is chosen per sentence from its source tag: sentences translated from English keep the first
+        of their 5 best hypotheses without English letters (see `is_english`), the others keep their best one.
+
+        Args:
+            tokenized_sents (List[List[str]]): tagged and sentence piece encoded input sentences, as token lists.
+            len_id (List[int], optional): number of placeholders of every sentence, whose letters `I` and `D` are
+                not counted as English (defaults: None, no placeholders).
+
+        Returns:
+            List[List[str]]: output tokens of every sentence.
+        """
+        if len_id is None:
+            len_id = [0] * len(tokenized_sents)
+        rerank = [tokens[0] == "eng_Latn" for tokens in tokenized_sents]
+
+        translations = self.translate_tokenized(
             tokenized_sents,
             max_batch_size=9216,
             batch_type="tokens",
             max_input_length=160,
-            max_decoding_length=256,
             beam_size=5,
+            # hypotheses to rerank are only needed if the batch has English sources
+            num_hypotheses=5 if any(rerank) else 1,
+        )
+
+        final_response = []
+        for translation, rerank_sent, len_ids in zip(translations, rerank, len_id):
+            hypothesis = translation.hypotheses[0]
+            if rerank_sent:
+                ignore_list = ["I", "D"] if len_ids else []
+                for j in translation.hypotheses:
+                    if not self.is_english(j, ignore_list):
+                        hypothesis = j
+                        break
+            final_response.append(hypothesis)
+        return final_response
+
+    def max_decoding_length(self, tokens: List[str]) -> int:
+        """
+        Returns the maximum decoding length of a tagged and tokenized sentence, from `self.length_limits`, rounded up
+        to a multiple of 8 tokens so that sentences of similar lengths are translated together.
+        """
+        return min(-(-self.length_limits.max_length(tokens) // 8) * 8, self.length_limits.max_decoding_length)
+
+    def translate_tokenized(self, tokenized_sents: List[List[str]], **kwargs) -> list:
+        """
+        Translates tagged and tokenized sentences with `translate_batch` of the translator, with one call per
+        maximum decoding length (see `max_decoding_length`).
+
+        Args:
+            tokenized_sents (List[List[str]]): tagged and sentence piece encoded sentences, split into tokens.
+            **kwargs: other options of `translate_batch`.
+
+        Returns:
+            list: the translation result of every sentence, in order.
+        """
+        groups = {}
+        for i, tokens in enumerate(tokenized_sents):
+            groups.setdefault(self.max_decoding_length(tokens), []).append(i)
+
+        results = [None] * len(tokenized_sents)
+        for limit, ids in sorted(groups.items()):
+            translations = self.translator.translate_batch(
+                [tokenized_sents[i] for i in ids], max_decoding_length=limit, **kwargs
             )
-            translations = [" ".join(x.hypotheses[0]) for x in translations]
-            return translations
+            for i, translation in zip(ids, translations):
+                results[i] = translation
+        return results
 
-    def fairseq_translate_lines(self, lines: List[str]) -> List[str]:
-        return self.translator.translate(lines)
+    def fairseq_translate_lines(
+        self, tokenized_sents: List[List[str]], len_id: Optional[List[int]] = None
+    ) -> List[List[str]]:
+        """
+        Translates tagged and tokenized sentences with fairseq, one call per direction, each with the length limit of
+        its direction (see `LengthLimits`).
+        """
+        groups = {}
+        for i, tokens in enumerate(tokenized_sents):
+            groups.setdefault(self.length_limits.get(tokens[0], tokens[1]), []).append(i)
+
+        results = [None] * len(tokenized_sents)
+        for ratio, ids in groups.items():
+            if ratio is None:
+                # directions without a fit keep the fixed limit the translator was built with
+                self.translator.set_max_len(*self.translator.default_max_len)
+            else:
+                # fairseq measures the source length with the language tags and `</s>`
+                self.translator.set_max_len(ratio.a, math.ceil(ratio.b - 3 * ratio.a))
+            translations = self.translator.translate([" ".join(tokenized_sents[i]) for i in ids])
+            for i, translation in zip(ids, translations):
+                results[i] = translation.split(" ") if translation else []
+        return results
+
+    def record_decoder_batch(self, tokenized_sents: List[List[str]], translations: List[List[str]]):
+        """
+        Records the sentence, token, batch size, padding and decoding length metrics of a decoder call.
 
+        Args:
+            tokenized_sents (List[List[str]]): tagged and sentence piece encoded input sentences sent to the decoder.
+            translations (List[List[str]]): output tokens generated by the decoder.
+        """
+        lengths = [len(tokens) for tokens in tokenized_sents]
+        for tokens, translation in zip(tokenized_sents, translations):
+            limit = self.max_decoding_length(tokens)
+            MAX_DECODING_LENGTH.observe(limit, direction=self.direction)
+            if len(translation) >= limit:
+                DECODING_LIMIT_REACHED.inc(direction=self.direction)
+        SENTENCES.inc(len(tokenized_sents), direction=self.direction)
+        INPUT_TOKENS.inc(sum(lengths), direction=self.direction)
+        OUTPUT_TOKENS.inc(sum(len(x) for x in translations), direction=self.direction)
+        BATCH_SENTENCES.observe(len(tokenized_sents), direction=self.direction)
+        if lengths:
+            BATCH_PADDING_RATIO.observe(
+                1 - sum(lengths) / (len(lengths) * max(lengths)), direction=self.direction
+            )
 
-    def char_percent_check(self, input):
+    def is_passthrough(self, paragraph: str, src_lang: str) -> bool:
         """
-        
-        Calculate the percentage of Roman characters (English letters and digits) 
-        in the given input string after removing special characters, spaces, 
-        newlines, emails, and URLs.
+        Checks whether a paragraph is returned untranslated because it is not written in the script of its source
+        language (see `inference.lang_id.matches_script`): at most half of its letters in Latin for English sources,
+        less than a fifth of its letters in the script of the source language for Indic sources, which are often
+        mixed with English words. URLs and emails are ignored. English paragraphs without letters or digits (e.g.
+        empty or only symbols) are passed through, other paragraphs without letters are translated.
 
         Args:
-            input (str): The input string to analyze.
+            paragraph (str): input text paragraph.
+            src_lang (str): flores language code of the paragraph.
 
         Returns:
-            float: The percentage of Roman characters in the total valid characters 
-                of the string. Returns 0 if the total valid characters are zero.
-        
+            bool: whether to pass the paragraph through.
         """
-       
-        input_len = len(list(input))
-        print(input_len)
-        spaces = len(re.findall('\s', input))
-        newlines = len(re.findall('\n', input))
-        email_pattern = re.compile(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+')
-        url_pattern = re.compile(r'(https?://\S+|www\.\S+)')
-        emails = email_pattern.findall(input)
-        urls = url_pattern.findall(input)
-        
-        email_len = sum(len(email) for email in emails)
-       
-        urls = url_pattern.findall(input)
-        url_len = sum(len(url) for url in urls)
-     
-        input_str_no_emails_urls = email_pattern.sub('', input)
-        input_str_no_emails_urls = url_pattern.sub('', input_str_no_emails_urls)
-
-        special_char_pattern = re.compile('[@_!#$%^&*()<>?/\|}{~:]')
-        special_char_matches = special_char_pattern.findall(input_str_no_emails_urls)
-        special_chars = len(special_char_matches)
-        total_chars = input_len - ( special_chars + spaces + newlines + email_len + url_len)
-        print(f"input_len :{input_len}")
-        print(f"special_chars :{special_chars}")
-        print(f"spaces :{spaces}")
-        print(f"newlines :{newlines}")
-        print(f"email_len :{email_len}")
-        print(f"url_len :{url_len}")
-        
-        en_pattern = re.compile('[a-zA-Z0-9]')
-        en_matches = en_pattern.findall(input_str_no_emails_urls)
-        en_chars = len(en_matches)
-        print(f"en_chars :{en_chars}")
-        print(f"total_chars :{total_chars}")
-        
-        if total_chars == 0:
-            return 0
-        return (en_chars/total_chars)
-    
-    
+        if src_lang == "eng_Latn":
+            if not script_fractions(paragraph) and not any(char.isdigit() for char in paragraph):
+                return True
+            return not matches_script(paragraph, src_lang, min_fraction=0.5)
+        return not matches_script(paragraph, src_lang, min_fraction=0.2)
+
     def paragraphs_batch_translate__multilingual(self, batch_payloads: List[tuple]) -> List[str]:
         """
         Translates a batch of input paragraphs (including pre/post processing) 
@@ -324,7 +417,8 @@ class Model:
         global__preprocessed_sents_placeholder_entity_map = []
         
         len_id = []
-        dict_of_non_english = {}
+        REQUESTS.inc(direction=self.direction)
+        PARAGRAPHS.inc(len(batch_payloads), direction=self.direction)
         for i in range(len(batch_payloads)):
             paragraph, src_lang, tgt_lang = batch_payloads[i]
             
@@ -332,15 +426,14 @@ class Model:
             if self.input_lang_code_format == "iso":
                 src_lang, tgt_lang = iso_to_flores[src_lang], iso_to_flores[tgt_lang]
             
-            if src_lang == "eng_Latn":
-                print(f"char_percent_check: - {self.char_percent_check(paragraph)}")
-                if  self.char_percent_check(paragraph) <= 0.5:
-                    dict_of_non_english[i] = paragraph
-            
-            
-            
-            
-            batch = split_sentences(paragraph, src_lang)
+            if self.is_passthrough(paragraph, src_lang):
+                # returned as is, without splitting, preprocessing or decoding
+                PASSTHROUGH.inc(direction=self.direction)
+                paragraph_id_to_sentence_range.append(None)
+                continue
+
+            with STAGE_SECONDS.time(direction=self.direction, stage="split"):
+                batch = split_sentences(paragraph, src_lang)
             global__sents.extend(batch)
 
             preprocessed_sents, placeholder_entity_map_sents = self.preprocess_batch(batch, src_lang, tgt_lang)
@@ -349,35 +442,36 @@ class Model:
             for i in range(len(placeholder_entity_map_sents)):
                 
                 len_id.append(len(placeholder_entity_map_sents[i]))
-            print(f"Len ID : -{len_id}")
-            print(f"placeholder_entity_map_sents {placeholder_entity_map_sents}")
             # ***************************************
             global_sentence_start_index = len(global__preprocessed_sents)
             global__preprocessed_sents.extend(preprocessed_sents)
             global__preprocessed_sents_placeholder_entity_map.extend(placeholder_entity_map_sents)
             paragraph_id_to_sentence_range.append((global_sentence_start_index, len(global__preprocessed_sents)))
         
-        translations = self.translate_lines(global__preprocessed_sents,len_id)
+        translations = []
+        if global__preprocessed_sents:
+            with STAGE_SECONDS.time(direction=self.direction, stage="decode"):
+                translations = self.translate_lines(global__preprocessed_sents, len_id)
+            self.record_decoder_batch(global__preprocessed_sents, translations)
 
         translated_paragraphs = []
         for paragraph_id, sentence_range in enumerate(paragraph_id_to_sentence_range):
+            if sentence_range is None:
+                translated_paragraphs.append(batch_payloads[paragraph_id][0])
+                continue
             tgt_lang = batch_payloads[paragraph_id][2]
             if self.input_lang_code_format == "iso":
                 tgt_lang = iso_to_flores[tgt_lang]
             
-            postprocessed_sents = self.postprocess(
-                translations[sentence_range[0]:sentence_range[1]],
-                global__preprocessed_sents_placeholder_entity_map[sentence_range[0]:sentence_range[1]],
-                tgt_lang,
-            )
+            with STAGE_SECONDS.time(direction=self.direction, stage="postprocess"):
+                postprocessed_sents = self.postprocess(
+                    translations[sentence_range[0]:sentence_range[1]],
+                    global__preprocessed_sents_placeholder_entity_map[sentence_range[0]:sentence_range[1]],
+                    tgt_lang,
+                )
             translated_paragraph = " ".join(postprocessed_sents)
             translated_paragraphs.append(translated_paragraph)
-        
-        print(f"translated_paragraphs: - {translated_paragraphs}")
-        for index, new_sentence in dict_of_non_english.items():
-            translated_paragraphs[index] = new_sentence
-        print(f"translated_paragraphs: - {translated_paragraphs}")
-        
+
         return translated_paragraphs
 
     # translate a batch of sentences from src_lang to tgt_lang
@@ -400,11 +494,17 @@ class Model:
         if self.input_lang_code_format == "iso":
             src_lang, tgt_lang = iso_to_flores[src_lang], iso_to_flores[tgt_lang]
 
+        REQUESTS.inc(direction=self.direction)
         preprocessed_sents, placeholder_entity_map_sents = self.preprocess_batch(
             batch, src_lang, tgt_lang
         )
-        translations = self.translate_lines(preprocessed_sents)
-        return self.postprocess(translations, placeholder_entity_map_sents, tgt_lang)
+        with STAGE_SECONDS.time(direction=self.direction, stage="decode"):
+            translations = self.translate_lines(
+                preprocessed_sents, [len(x) for x in placeholder_entity_map_sents]
+            )
+        self.record_decoder_batch(preprocessed_sents, translations)
+        with STAGE_SECONDS.time(direction=self.direction, stage="postprocess"):
+            return self.postprocess(translations, placeholder_entity_map_sents, tgt_lang)
 
     # translate a paragraph from src_lang to tgt_lang
     def translate_paragraph(self, paragraph: str, src_lang: str, tgt_lang: str) -> str:
@@ -428,16 +528,25 @@ class Model:
         else:
             flores_src_lang = src_lang
 
-        sents = split_sentences(paragraph, flores_src_lang)
+        PARAGRAPHS.inc(direction=self.direction)
+        if self.is_passthrough(paragraph, flores_src_lang):
+            PASSTHROUGH.inc(direction=self.direction)
+            return paragraph
+
+        with STAGE_SECONDS.time(direction=self.direction, stage="split"):
+            sents = split_sentences(paragraph, flores_src_lang)
         postprocessed_sents = self.batch_translate(sents, src_lang, tgt_lang)
         translated_paragraph = " ".join(postprocessed_sents)
 
         return translated_paragraph
 
-    def preprocess_batch(self, batch: List[str], src_lang: str, tgt_lang: str) -> List[str]:
+    def preprocess_batch(
+        self, batch: List[str], src_lang: str, tgt_lang: str
+    ) -> Tuple[List[List[str]], List[Dict]]:
         """
         Preprocess an array of sentences by normalizing, tokenization, and possibly transliterating it. It also tokenizes the
         normalized text sequences using sentence piece tokenizer and also adds language tags.
+        The sentences are returned as token lists, which are passed to the decoder as they are.
 
         Args:
             batch (List[str]): input list of sentences to preprocess.
@@ -445,28 +554,31 @@ class Model:
             tgt_lang (str): flores language code of the output text sentences.
 
         Returns:
-            Tuple[List[str], List[Dict]]: a tuple of list of preprocessed input text sentences and also a corresponding list of dictionary
+            Tuple[List[List[str]], List[Dict]]: a tuple of list of tagged and tokenized input sentences and also a corresponding list of dictionary
                 mapping placeholders to their original values.
         """
-        preprocessed_sents, placeholder_entity_map_sents = self.preprocess(batch, lang=src_lang)
-        tokenized_sents = self.apply_spm(preprocessed_sents)
+        with STAGE_SECONDS.time(direction=self.direction, stage="preprocess"):
+            preprocessed_sents, placeholder_entity_map_sents = self.preprocess(batch, lang=src_lang)
+        with STAGE_SECONDS.time(direction=self.direction, stage="spm"):
+            tokenized_sents = self.apply_spm(preprocessed_sents)
         tokenized_sents, placeholder_entity_map_sents = truncate_long_sentences(
             tokenized_sents, placeholder_entity_map_sents
         )
         tagged_sents = apply_lang_tags(tokenized_sents, src_lang, tgt_lang)
         return tagged_sents, placeholder_entity_map_sents
 
-    def apply_spm(self, sents: List[str]) -> List[str]:
+    def apply_spm(self, sents: List[str]) -> List[List[str]]:
         """
-        Applies sentence piece encoding to the batch of input sentences.
+        Applies sentence piece encoding to the batch of input sentences, in a single call which encodes them in
+        parallel with `self.spm_threads` threads.
 
         Args:
             sents (List[str]): batch of the input sentences.
 
         Returns:
-            List[str]: batch of encoded sentences with sentence piece model
+            List[List[str]]: batch of sentence piece tokens of every sentence.
         """
-        return [" ".join(self.sp_src.encode(sent, out_type=str)) for sent in sents]
+        return self.sp_src.encode(sents, out_type=str, num_threads=self.spm_threads)
 
     def preprocess_sent(
         self,
@@ -487,7 +599,8 @@ class Model:
             mapping placeholders to their original values.
         """
         iso_lang = flores_codes[lang]
-        sent = punc_norm(sent, iso_lang)
+        # same language code as `normalize_punctuation.sh` on the training data
+        sent = punc_norm(sent, punc_norm_lang(lang) or "en")
         sent, placeholder_entity_map = normalize(sent)
 
         transliterate = True
@@ -545,16 +658,18 @@ class Model:
 
     def postprocess(
         self,
-        sents: List[str],
+        sents: List[List[str]],
         placeholder_entity_map: List[Dict],
         lang: str,
         common_lang: str = "hin_Deva",
     ) -> List[str]:
         """
-        Postprocesses a batch of input sentences after the translation generations.
+        Postprocesses a batch of input sentences after the translation generations. The sentence pieces of the
+        batch are decoded in a single call, then every sentence goes through the script fixes, the placeholder
+        restoration, the detokenization and the transliteration in one pass.
 
         Args:
-            sents (List[str]): batch of translated sentences to postprocess.
+            sents (List[List[str]]): batch of translated sentences to postprocess, as sentence piece tokens.
             placeholder_entity_map (List[Dict]): dictionary mapping placeholders to the original entity values.
             lang (str): flores language code of the input sentences.
             common_lang (str, optional): flores language code of the transliterated language (defaults: hin_Deva).
@@ -562,49 +677,44 @@ class Model:
         Returns:
             List[str]: postprocessed batch of input sentences.
         """
+        assert len(sents) == len(placeholder_entity_map)
 
         lang_code, script_code = lang.split("_")
-        # SPM decode
-        for i in range(len(sents)):
-            # sent_tokens = sents[i].split(" ")
-            # sents[i] = self.sp_tgt.decode(sent_tokens)
+        decoded_sents = self.sp_tgt.decode(sents, num_threads=self.spm_threads) if sents else []
 
-            sents[i] = sents[i].replace(" ", "").replace("▁", " ").strip()
+        postprocessed_sents = []
+        for pieces, sent, placeholders in zip(sents, decoded_sents, placeholder_entity_map):
+            # sentencepiece renders the unknown piece as " ⁇ " and keeps a trailing "▁" as a space, the pieces are
+            # joined as before when they contain `<unk>`, and the decoded text is stripped like the joined pieces
+            if self.unk_piece in pieces:
+                sent = "".join(pieces).replace("▁", " ")
+            sent = sent.strip()
 
             # Fixes for Perso-Arabic scripts
             # TODO: Move these normalizations inside indic-nlp-library
             if script_code in {"Arab", "Aran"}:
                 # UrduHack adds space before punctuations. Since the model was trained without fixing this issue, let's fix it now
-                sents[i] = sents[i].replace(" ؟", "؟").replace(" ۔", "۔").replace(" ،", "،")
+                sent = sent.replace(" ؟", "؟").replace(" ۔", "۔").replace(" ،", "،")
                 # Kashmiri bugfix for palatalization: https://github.com/AI4Bharat/IndicTrans2/issues/11
-                sents[i] = sents[i].replace("ٮ۪", "ؠ")
-
-        assert len(sents) == len(placeholder_entity_map)
+                sent = sent.replace("ٮ۪", "ؠ")
 
-        for i in range(0, len(sents)):
-            for key in placeholder_entity_map[i].keys():
-                sents[i] = sents[i].replace(key, placeholder_entity_map[i][key])
-
-        # Detokenize and transliterate to native scripts if applicable
-        postprocessed_sents = []
+            for key, value in placeholders.items():
+                sent = sent.replace(key, value)
 
-        if lang == "eng_Latn":
-            for sent in sents:
-                postprocessed_sents.append(self.en_detok.detokenize(sent.split(" ")))
-        else:
-            for sent in sents:
+            # Detokenize and transliterate to native scripts if applicable
+            if lang == "eng_Latn":
+                outstr = self.en_detok.detokenize(sent.split(" "))
+            else:
                 outstr = indic_detokenize.trivial_detokenize(
-                    self.xliterator.transliterate(
-                        sent, flores_codes[common_lang], flores_codes[lang]
-                    ),
+                    self.xliterator.transliterate(sent, flores_codes[common_lang], flores_codes[lang]),
                     flores_codes[lang],
                 )
-                
+
                 # Oriya bug: indic-nlp-library produces ଯ଼ instead of ୟ when converting from Devanagari to Odia
                 # TODO: Find out what's the issue with unicode transliterator for Oriya and fix it
                 if lang_code == "ory":
                     outstr = outstr.replace("ଯ଼", 'ୟ')
 
-                postprocessed_sents.append(outstr)
+            postprocessed_sents.append(outstr)
 
         return postprocessed_sents
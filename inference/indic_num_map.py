@@ -115,3 +115,6 @@ INDIC_NUM_MAP = {
     "\u1c59": "9",
     "\u0c6f": "9",
 }
+
+# `INDIC_NUM_MAP` compiled for `str.translate`, which maps all the characters of a string in one pass
+INDIC_NUM_TABLE = str.maketrans(INDIC_NUM_MAP)
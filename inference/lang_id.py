@@ -0,0 +1,260 @@
+"""
+Fast script and language identification of input text, used to pass through paragraphs that are not written in the
+script of their source language, and to validate or correct the language of requests before routing them.
+
+The script of a text is read from a histogram of the Unicode blocks of its letters, computed with a lookup table in
+numpy (tens of microseconds per paragraph). The script gives the language, except for the languages sharing a script
+(e.g. `hin_Deva`, `mar_Deva` and `npi_Deva`): with n-gram profiles, they are told apart by scoring the character 1 to
+3-grams of the text with each profile (naive Bayes). Profiles are built from the training data with:
+
+    python3 -m inference.lang_id --data_dir en-indic-exp --langs hin_Deva mar_Deva npi_Deva --output lang_id.json
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Unicode ranges of the scripts of the IndicTrans2 languages, by ISO 15924 code
+SCRIPT_RANGES = {
+    "Latn": [(0x0041, 0x005A), (0x0061, 0x007A), (0x00C0, 0x024F), (0x1E00, 0x1EFF)],
+    "Arab": [(0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)],
+    "Deva": [(0x0900, 0x097F), (0x1CD0, 0x1CFF), (0xA8E0, 0xA8FF)],
+    "Beng": [(0x0980, 0x09FF)],
+    "Guru": [(0x0A00, 0x0A7F)],
+    "Gujr": [(0x0A80, 0x0AFF)],
+    "Orya": [(0x0B00, 0x0B7F)],
+    "Taml": [(0x0B80, 0x0BFF)],
+    "Telu": [(0x0C00, 0x0C7F)],
+    "Knda": [(0x0C80, 0x0CFF)],
+    "Mlym": [(0x0D00, 0x0D7F)],
+    "Olck": [(0x1C50, 0x1C7F)],
+    "Mtei": [(0xAAE0, 0xAAFF), (0xABC0, 0xABFF)],
+}
+SCRIPTS = list(SCRIPT_RANGES)
+
+# language of each script without n-gram profiles
+SCRIPT_LANGS = {
+    "Latn": "eng_Latn",
+    "Arab": "urd_Arab",
+    "Deva": "hin_Deva",
+    "Beng": "ben_Beng",
+    "Guru": "pan_Guru",
+    "Gujr": "guj_Gujr",
+    "Orya": "ory_Orya",
+    "Taml": "tam_Taml",
+    "Telu": "tel_Telu",
+    "Knda": "kan_Knda",
+    "Mlym": "mal_Mlym",
+    "Olck": "sat_Olck",
+    "Mtei": "mni_Mtei",
+}
+
+# script of every code point of the basic multilingual plane: 0 for non-letters, 1 for letters of other scripts and
+# 2 + the index in `SCRIPTS` otherwise. Other planes count as non-letters.
+_OTHER, _FIRST_SCRIPT = 1, 2
+_SCRIPT_TABLE = np.zeros(0x10000, dtype=np.uint8)
+for _cp in range(0x10000):
+    if unicodedata.category(chr(_cp))[0] in "LM":
+        _SCRIPT_TABLE[_cp] = _OTHER
+for _i, _script in enumerate(SCRIPTS):
+    for _start, _end in SCRIPT_RANGES[_script]:
+        _block = _SCRIPT_TABLE[_start : _end + 1]
+        _block[_block == _OTHER] = _FIRST_SCRIPT + _i
+
+# URLs and emails are written in Latin whatever the language of the text
+URL_EMAIL_PATTERN = re.compile(r"https?://\S+|www\.\S+|\S+@\S+")
+
+
+def char_script(char: str) -> Optional[str]:
+    value = int(_SCRIPT_TABLE[ord(char)]) if ord(char) < 0x10000 else 0
+    return SCRIPTS[value - _FIRST_SCRIPT] if value >= _FIRST_SCRIPT else None
+
+
+def lang_script(lang: str) -> str:
+    """
+    Returns the script of a flores language code, e.g. `Deva` for `hin_Deva`. `Aran` (Nastaliq) is written with the
+    Arabic block.
+    """
+    script = lang.split("_")[1]
+    return "Arab" if script == "Aran" else script
+
+
+def script_fractions(text: str) -> Dict[Optional[str], float]:
+    """
+    Returns the fraction of the letters and marks of `text` in each script (`None` for other scripts), empty if it
+    has none. URLs and emails are ignored.
+    """
+    if "@" in text or "/" in text or "www." in text:
+        text = URL_EMAIL_PATTERN.sub(" ", text)
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    counts = np.bincount(_SCRIPT_TABLE[np.minimum(codepoints, 0xFFFF)], minlength=_FIRST_SCRIPT + len(SCRIPTS))
+    total = int(counts[_OTHER:].sum())
+    if not total:
+        return {}
+    fractions = {SCRIPTS[i]: int(count) / total for i, count in enumerate(counts[_FIRST_SCRIPT:]) if count}
+    if counts[_OTHER]:
+        fractions[None] = int(counts[_OTHER]) / total
+    return fractions
+
+
+def detect_script(text: str) -> Optional[str]:
+    """
+    Returns the script of most of the letters of `text`, `None` if it has no letters or most are in other scripts.
+    """
+    fractions = script_fractions(text)
+    return max(fractions, key=fractions.get) if fractions else None
+
+
+def matches_script(text: str, lang: str, min_fraction: float = 0.2) -> bool:
+    """
+    Checks whether at least `min_fraction` of the letters of `text` are in the script of `lang`. Texts without
+    letters match every language. The default fraction accepts Indic text mixed with English words.
+    """
+    fractions = script_fractions(text)
+    return not fractions or fractions.get(lang_script(lang), 0.0) >= min_fraction
+
+
+def extract_ngrams(text: str, script: str, max_chars: int = 300) -> List[str]:
+    """
+    Returns the character 1 to 3-grams of the words of `text` written in `script`, with the word boundaries as spaces.
+    Only the first `max_chars` characters are used.
+    """
+    ngrams = []
+    for word in text[:max_chars].split():
+        if char_script(word[0]) != script:
+            continue
+        word = f" {word} "
+        for n in (1, 2, 3):
+            ngrams += [word[i : i + n] for i in range(len(word) - n + 1)]
+    return ngrams
+
+
+class LanguageIdentifier:
+    """
+    Identifies the flores language code of a text from its script and, for the languages with a profile, from its
+    character n-grams.
+
+    Args:
+        profiles (Dict[str, Dict[str, float]], optional): log probabilities of the n-grams of every language, with the
+            log probability of unseen n-grams under the `<unk>` key (defaults: None, script only).
+    """
+
+    def __init__(self, profiles: Optional[Dict[str, Dict[str, float]]] = None):
+        self.profiles = profiles or {}
+        self.script_profiles = {}
+        for lang in self.profiles:
+            self.script_profiles.setdefault(lang_script(lang), []).append(lang)
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "LanguageIdentifier":
+        if not path:
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.profiles, f, ensure_ascii=False)
+
+    def score(self, text: str, langs: List[str]) -> Dict[str, float]:
+        """
+        Returns the mean n-gram log probability of `text` under the profile of each of `langs` (same script).
+        """
+        ngrams = extract_ngrams(text, lang_script(langs[0]))
+        scores = {}
+        for lang in langs:
+            profile = self.profiles[lang]
+            unk = profile["<unk>"]
+            scores[lang] = sum(profile.get(g, unk) for g in ngrams) / max(len(ngrams), 1)
+        return scores
+
+    def detect(self, text: str) -> Optional[str]:
+        """
+        Returns the flores language code of `text`, `None` if it has no letters of a supported script.
+        """
+        script = detect_script(text)
+        if script is None:
+            return None
+        langs = self.script_profiles.get(script, [])
+        if len(langs) > 1:
+            scores = self.score(text, langs)
+            return max(scores, key=scores.get)
+        return langs[0] if langs else SCRIPT_LANGS[script]
+
+    def matches(self, text: str, lang: str, min_script_fraction: float = 0.2) -> bool:
+        """
+        Checks whether `text` may be in `lang`: it matches the script of `lang` (see `matches_script`) and, with a
+        profile for `lang`, it scores best with it among the languages of its script.
+        """
+        if not matches_script(text, lang, min_script_fraction):
+            return False
+        langs = self.script_profiles.get(lang_script(lang), [])
+        if lang not in langs or len(langs) < 2:
+            return True
+        scores = self.score(text, langs)
+        return max(scores, key=scores.get) == lang
+
+
+def build_profile(lines: List[str], script: str, max_ngrams: int) -> Dict[str, float]:
+    counts = Counter()
+    for line in lines:
+        counts.update(extract_ngrams(line, script, max_chars=len(line)))
+    counts = dict(counts.most_common(max_ngrams))
+    # add-one smoothing over the kept n-grams and one unseen n-gram
+    total = sum(counts.values()) + len(counts) + 1
+    profile = {g: round(math.log((c + 1) / total), 4) for g, c in counts.items()}
+    profile["<unk>"] = round(math.log(1 / total), 4)
+    return profile
+
+
+def read_train_lines(data_dir: str, lang: str, max_lines: int) -> List[str]:
+    """
+    Reads up to `max_lines` sentences of `lang` from the `train/{src_lang}-{tgt_lang}/train.{lang}` files of
+    `data_dir`, on either side of the pairs.
+    """
+    lines = []
+    paths = glob.glob(os.path.join(data_dir, "train", f"*-{lang}", f"train.{lang}"))
+    paths += glob.glob(os.path.join(data_dir, "train", f"{lang}-*", f"train.{lang}"))
+    for path in sorted(paths):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if len(lines) >= max_lines:
+                    return lines
+                lines.append(line.strip())
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_dir", type=str, required=True, help="directory with `train/{src}-{tgt}/train.{lang}`")
+    parser.add_argument("--langs", type=str, nargs="+", default=["hin_Deva", "mar_Deva", "npi_Deva"])
+    parser.add_argument("--max_lines", type=int, default=100000, help="training sentences per language")
+    parser.add_argument("--max_ngrams", type=int, default=5000, help="most frequent n-grams kept per language")
+    parser.add_argument("--dev_fraction", type=float, default=0.1, help="sentences held out to report accuracy")
+    parser.add_argument("--output", type=str, required=True)
+    args = parser.parse_args()
+
+    profiles, dev_sets = {}, {}
+    for lang in args.langs:
+        lines = read_train_lines(args.data_dir, lang, args.max_lines)
+        if not lines:
+            raise FileNotFoundError(f"No training sentences for {lang} in {args.data_dir}")
+        num_dev = int(len(lines) * args.dev_fraction)
+        dev_sets[lang] = lines[:num_dev]
+        profiles[lang] = build_profile(lines[num_dev:], lang_script(lang), args.max_ngrams)
+
+    lang_id = LanguageIdentifier(profiles)
+    for lang, lines in dev_sets.items():
+        if lines:
+            accuracy = sum(lang_id.detect(line) == lang for line in lines) / len(lines)
+            print(json.dumps({"lang": lang, "dev_sentences": len(lines), "accuracy": round(accuracy, 4)}))
+    lang_id.save(args.output)
+    print(f"Profiles of {', '.join(args.langs)} written to {args.output}")
@@ -0,0 +1,174 @@
+"""
+Source-length-aware decoding limits. The length of a translation grows linearly with the length of its source, so
+instead of letting every sentence decode up to 256 tokens, decoding stops after `a * source_length + b` target
+tokens, where `source_length` is the number of source subword tokens without the language tags.
+
+`a` and `b` are fitted per direction (`{src_lang}-{tgt_lang}`) on the training data: `a` and an initial `b` by least
+squares on the subword lengths of the sentence pairs, then `b` is raised so that `--coverage` of the training
+targets fit within the limit. Directions without a fit use the fit over all the training pairs. Without a fitted file,
+every sentence keeps the fixed limit of 256 tokens.
+
+Usage (from the root directory):
+    python3 -m inference.length_ratio --data_dir en-indic-exp --spm_dir <ckpt_dir>/vocab \\
+        --output <ckpt_dir>/length_ratio.json
+
+`inference.engine.Model` loads `<ckpt_dir>/length_ratio.json` if it exists.
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+LENGTH_RATIO_FILE = "length_ratio.json"
+MAX_DECODING_LENGTH = 256
+
+
+class LengthRatio(NamedTuple):
+    a: float
+    b: float
+
+    def max_length(self, src_len: int, max_decoding_length: int = MAX_DECODING_LENGTH) -> int:
+        return max(1, min(max_decoding_length, math.ceil(self.a * src_len + self.b)))
+
+
+
+class LengthLimits:
+    """
+    Maximum decoding lengths of tagged sentences (`{src_lang} {tgt_lang} {subword tokens}`).
+
+    Args:
+        ratios (Dict[str, LengthRatio], optional): fitted ratio of every `{src_lang}-{tgt_lang}` direction
+            (defaults: None, no direction).
+        default (LengthRatio, optional): fitted ratio of the other directions (defaults: None, the other directions
+            decode up to `max_decoding_length`).
+        max_decoding_length (int, optional): upper bound of every limit (defaults: 256).
+    """
+
+    def __init__(
+        self,
+        ratios: Optional[Dict[str, LengthRatio]] = None,
+        default: Optional[LengthRatio] = None,
+        max_decoding_length: int = MAX_DECODING_LENGTH,
+    ):
+        self.ratios = ratios or {}
+        self.default = default
+        self.max_decoding_length = max_decoding_length
+
+    @classmethod
+    def from_file(cls, path: str) -> "LengthLimits":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            ratios={k: LengthRatio(**v) for k, v in data["directions"].items()},
+            default=LengthRatio(**data["default"]) if data.get("default") else None,
+            max_decoding_length=data.get("max_decoding_length", MAX_DECODING_LENGTH),
+        )
+
+    @classmethod
+    def load(cls, ckpt_dir: str, path: Optional[str] = None) -> "LengthLimits":
+        """
+        Loads `path`, or `<ckpt_dir>/length_ratio.json` if it exists, and falls back to the fixed limit of
+        `MAX_DECODING_LENGTH` tokens.
+        """
+        path = path or os.path.join(ckpt_dir, LENGTH_RATIO_FILE)
+        return cls.from_file(path) if os.path.isfile(path) else cls()
+
+    def save(self, path: str):
+        data = {
+            "max_decoding_length": self.max_decoding_length,
+            "default": self.default._asdict() if self.default else None,
+            "directions": {k: v._asdict() for k, v in sorted(self.ratios.items())},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def get(self, src_lang: str, tgt_lang: str) -> Optional[LengthRatio]:
+        """
+        Returns the fitted ratio of a direction, `None` without a fit (the fixed limit applies).
+        """
+        return self.ratios.get(f"{src_lang}-{tgt_lang}", self.default)
+
+    def direction_max_length(
+        self, src_lang: str, tgt_lang: str, src_len: int, max_decoding_length: Optional[int] = None
+    ) -> int:
+        """
+        Returns the maximum decoding length of a source of `src_len` subword tokens (without the language tags).
+        """
+        max_decoding_length = max_decoding_length or self.max_decoding_length
+        ratio = self.get(src_lang, tgt_lang)
+        return ratio.max_length(src_len, max_decoding_length) if ratio else max_decoding_length
+
+    def max_length(self, tokens: List[str]) -> int:
+        """
+        Returns the maximum decoding length of a tagged and sentence piece encoded sentence, split into tokens.
+        """
+        return self.direction_max_length(tokens[0], tokens[1], len(tokens) - 2)
+
+
+def fit_length_ratio(src_lengths: List[int], tgt_lengths: List[int], coverage: float = 0.999) -> LengthRatio:
+    """
+    Fits `tgt_len <= a * src_len + b` on sentence pairs, so that a fraction `coverage` of them satisfies it.
+    """
+    src, tgt = np.asarray(src_lengths, dtype=np.float64), np.asarray(tgt_lengths, dtype=np.float64)
+    a, b = np.polyfit(src, tgt, 1) if len(set(src_lengths)) > 1 else (0.0, float(tgt.mean()))
+    a = max(float(a), 0.0)
+    b = float(np.quantile(tgt - a * src, coverage))
+    return LengthRatio(a=round(a, 4), b=round(b, 2))
+
+
+def count_pieces(path: str, sp) -> List[int]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [len(sp.encode(line.strip())) for line in f]
+
+
+if __name__ == "__main__":
+    import sentencepiece as spm
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_dir", type=str, required=True, help="directory with `train/{src}-{tgt}/train.{lang}`")
+    parser.add_argument("--spm_dir", type=str, required=True, help="directory with `model.SRC` and `model.TGT`")
+    parser.add_argument("--coverage", type=float, default=0.999, help="fraction of training targets within the limit")
+    parser.add_argument("--max_pairs", type=int, default=200000, help="sentence pairs used per direction, 0 for all")
+    parser.add_argument("--max_decoding_length", type=int, default=MAX_DECODING_LENGTH)
+    parser.add_argument("--output", type=str, required=True)
+    args = parser.parse_args()
+
+    sp_src = spm.SentencePieceProcessor(model_file=os.path.join(args.spm_dir, "model.SRC"))
+    sp_tgt = spm.SentencePieceProcessor(model_file=os.path.join(args.spm_dir, "model.TGT"))
+
+    ratios, all_src, all_tgt = {}, [], []
+    for pair_dir in sorted(glob.glob(os.path.join(args.data_dir, "train", "*-*"))):
+        direction = os.path.basename(pair_dir)
+        src_lang, tgt_lang = direction.split("-")
+        src_lengths = count_pieces(os.path.join(pair_dir, f"train.{src_lang}"), sp_src)
+        tgt_lengths = count_pieces(os.path.join(pair_dir, f"train.{tgt_lang}"), sp_tgt)
+        if args.max_pairs:
+            src_lengths, tgt_lengths = src_lengths[: args.max_pairs], tgt_lengths[: args.max_pairs]
+
+        ratios[direction] = fit_length_ratio(src_lengths, tgt_lengths, args.coverage)
+        all_src += src_lengths
+        all_tgt += tgt_lengths
+        limits = [ratios[direction].max_length(x, args.max_decoding_length) for x in src_lengths]
+        print(
+            json.dumps(
+                {
+                    "direction": direction,
+                    **ratios[direction]._asdict(),
+                    "pairs": len(src_lengths),
+                    "training_coverage": round(np.mean([t <= l for t, l in zip(tgt_lengths, limits)]), 4),
+                    "mean_max_length": round(float(np.mean(limits)), 1),
+                }
+            )
+        )
+
+    if not ratios:
+        raise FileNotFoundError(f"No training pairs in {os.path.join(args.data_dir, 'train')}")
+
+    limits = LengthLimits(ratios, fit_length_ratio(all_src, all_tgt, args.coverage), args.max_decoding_length)
+    limits.save(args.output)
+    print(f"Default: {json.dumps(limits.default._asdict())}, written to {args.output}")
@@ -0,0 +1,286 @@
+"""
+Dependency-free metrics registry for the translation engine and servers.
+
+Metrics follow the Prometheus data model (counters, gauges and histograms with labels) and are rendered in
+the Prometheus text exposition format, so they can be scraped from the standalone server (`/metrics`) or the
+Triton backend (see `start_metrics_http_server`) without requiring `prometheus_client`.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+TOKEN_LENGTH_BUCKETS = (8, 16, 24, 32, 48, 64, 96, 128, 192, 256)
+RATIO_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    escaped = [
+        (key, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for key, value in labels
+    ]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the text exposition format.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric: "Metric") -> "Metric":
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric `{metric.name}` is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Metric:
+    """
+    Base class of all metrics. Values are kept per combination of label values.
+
+    Args:
+        name (str): metric name.
+        documentation (str): help text shown in the exposition format.
+        labelnames (Sequence[str]): names of the labels every observation must provide.
+        registry (MetricsRegistry, optional): registry to add the metric to (defaults: global `REGISTRY`).
+    """
+
+    type_name = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric `{self.name}` expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[Tuple[str, Sequence[Tuple[str, str]], float]]:
+        with self.lock:
+            return [
+                (self.name, list(zip(self.labelnames, key)), value) for key, value in sorted(self.values.items())
+            ]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observations over cumulative buckets, along with their count and sum.
+
+    Args:
+        buckets (Sequence[float]): upper bounds of the buckets (defaults: latency buckets in seconds).
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=None, **kwargs):
+        super().__init__(name, documentation, labelnames, **kwargs)
+        self.buckets = tuple(sorted(buckets or DEFAULT_LATENCY_BUCKETS)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            if key not in self.values:
+                self.values[key] = {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+            state = self.values[key]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+                    break
+            state["count"] += 1
+            state["sum"] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Context manager observing the wall-clock duration of its block in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get(self, **labels) -> Tuple[int, float]:
+        state = self.values.get(self._key(labels))
+        return (state["count"], state["sum"]) if state else (0, 0.0)
+
+    def _samples(self):
+        samples = []
+        with self.lock:
+            for key, state in sorted(self.values.items()):
+                labels = list(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets, state["buckets"]):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", labels + [("le", _format_value(bound))], cumulative))
+                samples.append((f"{self.name}_count", labels, state["count"]))
+                samples.append((f"{self.name}_sum", labels, state["sum"]))
+        return samples
+
+
+def start_metrics_http_server(port: int, host: str = "0.0.0.0", registry: MetricsRegistry = REGISTRY, max_tries: int = 16):
+    """
+    Serves `registry` in text exposition format on `http://host:port/metrics` from a daemon thread. This is used
+    by the Triton backend, whose model instances run in their own processes; if `port` is already taken by another
+    instance, the next free port (up to `max_tries`) is used.
+
+    Returns:
+        int: the port the metrics are served on.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            payload = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    for offset in range(max_tries):
+        try:
+            server = ThreadingHTTPServer((host, port + offset), MetricsHandler)
+        except OSError:
+            continue
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return port + offset
+    raise OSError(f"No free port for the metrics server in [{port}, {port + max_tries})")
+
+
+# ---------------------------------------------------------------------------
+#                        Translation engine metrics
+# ---------------------------------------------------------------------------
+REQUESTS = Counter("nmt_requests_total", "Translation calls made to the engine.", ["direction"])
+PARAGRAPHS = Counter("nmt_paragraphs_total", "Input paragraphs received by the engine.", ["direction"])
+SENTENCES = Counter("nmt_sentences_total", "Sentences sent to the decoder after splitting.", ["direction"])
+INPUT_TOKENS = Counter("nmt_input_tokens_total", "Source subword tokens sent to the decoder.", ["direction"])
+OUTPUT_TOKENS = Counter("nmt_output_tokens_total", "Target subword tokens generated by the decoder.", ["direction"])
+PASSTHROUGH = Counter(
+    "nmt_passthrough_total",
+    "Paragraphs returned untranslated because their letters are not written in the script of their source language "
+    "(or, for English, because they have no letters or digits), see `Model.is_passthrough`.",
+    ["direction"],
+)
+STAGE_SECONDS = Histogram(
+    "nmt_stage_seconds",
+    "Latency of each pipeline stage invocation: split, preprocess, spm and postprocess run per paragraph, "
+    "decode runs once per engine call.",
+    ["direction", "stage"],
+)
+BATCH_SENTENCES = Histogram(
+    "nmt_batch_sentences", "Number of sentences per decoder call.", ["direction"], buckets=BATCH_SIZE_BUCKETS
+)
+BATCH_PADDING_RATIO = Histogram(
+    "nmt_batch_padding_ratio",
+    "Fraction of padding tokens per decoder call if its sentences were padded to the longest one.",
+    ["direction"],
+    buckets=RATIO_BUCKETS,
+)
+LANGUAGE_MISMATCH = Counter(
+    "nmt_language_mismatch_total",
+    "Inputs whose text does not match their labelled source language, by labelled and detected language.",
+    ["labelled", "detected"],
+)
+MAX_DECODING_LENGTH = Histogram(
+    "nmt_max_decoding_length",
+    "Maximum decoding length of each sentence, derived from its source length (see `inference.length_ratio`).",
+    ["direction"],
+    buckets=TOKEN_LENGTH_BUCKETS,
+)
+DECODING_LIMIT_REACHED = Counter(
+    "nmt_decoding_limit_reached_total",
+    "Sentences whose translation was cut off at its maximum decoding length.",
+    ["direction"],
+)
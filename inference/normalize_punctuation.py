@@ -1,60 +1,243 @@
-# IMPORTANT NOTE: DO NOT DIRECTLY EDIT THIS FILE
-# This file was manually ported from `normalize-punctuation.perl`
-# TODO: Only supports English, add others
-
-import regex as re
-multispace_regex = re.compile("[ ]{2,}")
-multidots_regex = re.compile(r"\.{2,}")
-end_bracket_space_punc_regex = re.compile(r"\) ([\.!:?;,])")
-digit_space_percent = re.compile(r"(\d) %")
-double_quot_punc = re.compile(r"\"([,\.]+)")
-digit_nbsp_digit = re.compile(r"(\d) (\d)")
-
-def punc_norm(text, lang="en"):
-    text = text.replace('\r', '') \
-                .replace('(', " (") \
-                .replace(')', ") ") \
-                \
-                .replace("( ", "(") \
-                .replace(" )", ")") \
-                \
-                .replace(" :", ':') \
-                .replace(" ;", ';') \
-                .replace('`', "'") \
-                \
-                .replace('„', '"') \
-                .replace('“', '"') \
-                .replace('”', '"') \
-                .replace('–', '-') \
-                .replace('—', " - ") \
-                .replace('´', "'") \
-                .replace('‘', "'") \
-                .replace('‚', "'") \
-                .replace('’', "'") \
-                .replace("''", "\"") \
-                .replace("´´", '"') \
-                .replace('…', "...") \
-                .replace(" « ", " \"") \
-                .replace("« ", '"') \
-                .replace('«', '"') \
-                .replace(" » ", "\" ") \
-                .replace(" »", '"') \
-                .replace('»', '"') \
-                .replace(" %", '%') \
-                .replace("nº ", "nº ") \
-                .replace(" :", ':') \
-                .replace(" ºC", " ºC") \
-                .replace(" cm", " cm") \
-                .replace(" ?", '?') \
-                .replace(" !", '!') \
-                .replace(" ;", ';') \
-                .replace(", ", ", ") \
-                
-    
-    text = multispace_regex.sub(' ', text)
-    text = multidots_regex.sub('.', text)
-    text = end_bracket_space_punc_regex.sub(r")\1", text)
-    text = digit_space_percent.sub(r"\1%", text)
-    text = double_quot_punc.sub(r'\1"', text) # English "quotation," followed by comma, style
-    text = digit_nbsp_digit.sub(r"\1.\2", text) # What does it mean?
-    return text.strip(' ')
\ No newline at end of file
+"""
+Python port of `normalize-punctuation.perl` (Moses), with identical output for every language code the script takes.
+
+The perl script applies about 45 substitutions one after the other, all on every line. Here they are compiled once
+per language into a few passes: single characters are mapped with `str.translate` tables, the rules that can be
+applied together with one alternation regex and a lookup dict, and the passes whose trigger characters are absent
+from a line (e.g. the guillemet and non-breaking space rules) are skipped. Rules are only merged where applying them
+in one pass gives the same output as applying them in the order of the perl script.
+
+The perl script works on UTF-8 bytes, so `\\d`, `\\s` and `[a-z]` only match ASCII characters in its patterns. The
+regexes here are compiled with `re.ASCII` for the same reason.
+
+Output is checked against the perl script with (from the root directory):
+    python3 -m inference.normalize_punctuation --check --lang hin_Deva < corpus.txt
+
+which compares every line normalized as a line of a file and as a sentence without its newline (like the engine),
+with the language code the engine uses for a FLORES code.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+PERL_SCRIPT = os.path.join(ROOT_DIR, "normalize-punctuation.perl")
+LANG_MAP_FILE = os.path.join(ROOT_DIR, "utils.map_token_lang.tsv")
+
+NBSP = "\xa0"
+
+# rules of the perl script, in its order, grouped into passes applied one after the other
+_OPEN_CLOSE_BRACKETS = str.maketrans({"\r": "", "(": " (", ")": ") "})
+_MULTISPACE = re.compile(" {2,}")
+_BRACKET_SPACE_PUNC = re.compile(r"\) ([.!:?;,])")
+# `( ` -> `(`, ` )` -> `)`, `<digit> %` -> `<digit>%`, ` :` -> `:` and ` ;` -> `;`
+_SPACE_BEFORE_PUNC = re.compile(r"\( | \)|([0-9]) %| :| ;", re.ASCII)
+_SPACE_BEFORE_PUNC_MAP = {"( ": "(", " )": ")", " :": ":", " ;": ";"}
+# backquotes are only rewritten with PENN=0, the default of the perl script
+_QUOTES_AND_DASHES = str.maketrans({"`": "'", "„": '"', "“": '"', "”": '"', "–": "-", "—": " - "})
+_LEFT_QUOTE_IN_WORD = re.compile(r"([a-z])‘([a-z])", re.ASCII | re.IGNORECASE)
+_RIGHT_QUOTE_IN_WORD = re.compile(r"([a-z])’([a-z])", re.ASCII | re.IGNORECASE)
+_SINGLE_QUOTES = str.maketrans({"´": "'", "‘": "'", "‚": "'", "’": '"', "…": "..."})
+# applied in this order, each over the whole line
+_LEFT_GUILLEMETS = [(f"{NBSP}«{NBSP}", ' "'), (f"«{NBSP}", '"'), ("«", '"')]
+_RIGHT_GUILLEMETS = [(f"{NBSP}»{NBSP}", '" '), (f"{NBSP}»", '"'), ("»", '"')]
+_PSEUDO_SPACES = [
+    (f"{NBSP}%", "%"),
+    (f"nº{NBSP}", "nº "),
+    (f"{NBSP}:", ":"),
+    (f"{NBSP}ºC", " ºC"),
+    (f"{NBSP}cm", " cm"),
+    (f"{NBSP}?", "?"),
+    (f"{NBSP}!", "!"),
+    (f"{NBSP};", ";"),
+    (f",{NBSP}", ", "),
+]
+# English "quotation," followed by comma style
+_QUOTE_BEFORE_PUNC = re.compile(r'"([,.]+)')
+# French "quotation". followed by period style
+_DOTS_AFTER_QUOTE = re.compile(r'(\.+)"(\s*[^<])', re.ASCII)
+_DIGIT_NBSP_DIGIT = re.compile(f"([0-9]){NBSP}([0-9])")
+# languages writing 1,5 (and 1.000) instead of 1.5
+_DECIMAL_COMMA_LANGS = {"de", "es", "cz", "cs", "fr"}
+
+Pass = Tuple[Tuple[str, ...], Callable[[str], str]]
+
+
+def _replace_all(pairs: List[Tuple[str, str]]) -> Callable[[str], str]:
+    def replace(text: str) -> str:
+        for old, new in pairs:
+            if old in text:
+                text = text.replace(old, new)
+        return text
+
+    return replace
+
+
+def _build_passes(lang: str) -> List[Pass]:
+    """
+    Returns the passes of `lang` as `(triggers, function)` pairs, a pass only runs on lines containing one of its
+    triggers (all lines without triggers).
+    """
+    collapse_spaces = ((" " * 2,), lambda text: _MULTISPACE.sub(" ", text))
+    passes = [
+        (("\r", "(", ")"), lambda text: text.translate(_OPEN_CLOSE_BRACKETS)),
+        collapse_spaces,
+        ((") ",), lambda text: _BRACKET_SPACE_PUNC.sub(r")\1", text)),
+        (
+            (" ",),
+            lambda text: _SPACE_BEFORE_PUNC.sub(
+                lambda m: m.group(1) + "%" if m.group(1) else _SPACE_BEFORE_PUNC_MAP[m.group(0)], text
+            ),
+        ),
+        (("`", "„", "“", "”", "–", "—"), lambda text: text.translate(_QUOTES_AND_DASHES)),
+        (("''",), lambda text: text.replace("''", ' " ')),
+        collapse_spaces,
+        (("‘",), lambda text: _LEFT_QUOTE_IN_WORD.sub(r"\1'\2", text)),
+        (("’",), lambda text: _RIGHT_QUOTE_IN_WORD.sub(r"\1'\2", text)),
+        (("´", "‘", "‚", "’", "…"), lambda text: text.translate(_SINGLE_QUOTES)),
+        (("''",), lambda text: text.replace("''", '"')),
+        (("«",), _replace_all(_LEFT_GUILLEMETS)),
+        (("»",), _replace_all(_RIGHT_GUILLEMETS)),
+        ((NBSP,), _replace_all(_PSEUDO_SPACES)),
+        collapse_spaces,
+    ]
+
+    if lang == "en":
+        passes.append((('"',), lambda text: _QUOTE_BEFORE_PUNC.sub(r'\1"', text)))
+    elif lang not in ("cs", "cz"):
+        passes.append(((',"',), lambda text: text.replace(',"', '",')))
+        passes.append((('"',), lambda text: _DOTS_AFTER_QUOTE.sub(r'"\1\2', text)))
+
+    separator = "," if lang in _DECIMAL_COMMA_LANGS else "."
+    passes.append(((NBSP,), lambda text: _DIGIT_NBSP_DIGIT.sub(rf"\1{separator}\2", text)))
+    return passes
+
+
+class PunctNormalizer:
+    """
+    Normalizes punctuation like `normalize-punctuation.perl <lang>`.
+
+    Args:
+        lang (str, optional): language code given to the perl script, e.g. `en`, `hi` or `ar` (defaults: en).
+    """
+
+    def __init__(self, lang: str = "en"):
+        self.lang = lang
+        self.passes = _build_passes(lang)
+
+    def normalize(self, text: str) -> str:
+        for triggers, apply in self.passes:
+            for trigger in triggers:
+                if trigger in text:
+                    text = apply(text)
+                    break
+        return text
+
+    __call__ = normalize
+
+
+_NORMALIZERS: Dict[str, PunctNormalizer] = {}
+
+
+def get_normalizer(lang: str = "en") -> PunctNormalizer:
+    if lang not in _NORMALIZERS:
+        _NORMALIZERS[lang] = PunctNormalizer(lang)
+    return _NORMALIZERS[lang]
+
+
+def punc_norm(text: str, lang: str = "en") -> str:
+    """
+    Normalizes the punctuation of a sentence like `normalize-punctuation.perl <lang>` normalizes it as a line of a
+    file, see `PunctNormalizer`. The perl script sees the newline at the end of the line, which some rules match
+    (e.g. `"hi."` at the end of a line becomes `"hi".` for most languages), so a sentence without one is normalized
+    with a newline added, then removed.
+    """
+    if text.endswith("\n"):
+        return get_normalizer(lang).normalize(text)
+    return get_normalizer(lang).normalize(text + "\n")[:-1]
+
+
+def load_lang_map(path: str = LANG_MAP_FILE) -> Dict[str, str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return dict(line.rstrip("\n").split("\t") for line in f if line.strip())
+
+
+LANG_MAP = load_lang_map()
+
+
+def punc_norm_lang(lang: str) -> Optional[str]:
+    """
+    Returns the language code given to the perl script for a flores language code, like `normalize_punctuation.sh`:
+    from `utils.map_token_lang.tsv`, by the full code or its first three letters. Returns `None` for unmapped codes,
+    which `normalize_punctuation.sh` normalizes as `en`.
+    """
+    return LANG_MAP.get(lang, LANG_MAP.get(lang[:3]))
+
+
+def split_lines(data: bytes) -> List[bytes]:
+    """
+    Splits bytes into lines ending with a newline like perl, which does not split on carriage returns.
+    """
+    lines = data.split(b"\n")
+    last = lines.pop()
+    return [line + b"\n" for line in lines] + ([last] if last else [])
+
+
+def run_perl(lines: List[bytes], lang: str) -> List[bytes]:
+    """
+    Runs `normalize-punctuation.perl <lang>` on lines of bytes, which end with a newline.
+    """
+    output = subprocess.run(["perl", PERL_SCRIPT, lang], input=b"".join(lines), stdout=subprocess.PIPE, check=True).stdout
+    return split_lines(output)
+
+
+def check_parity(lines: List[bytes], lang: str) -> List[int]:
+    """
+    Returns the indices of the lines of bytes normalized differently from the perl script, either as lines (like
+    `scripts/normalize_punctuation.py`) or as sentences without their newline by `punc_norm` (like the engine).
+    """
+    normalizer = get_normalizer(lang)
+    expected = run_perl(lines, lang)
+    if len(expected) != len(lines):
+        raise RuntimeError(f"The perl script returned {len(expected)} lines for {len(lines)}")
+    # sentences are normalized as lines with a newline, which the last line may not have
+    expected_sentences = [x[:-1] for x in expected]
+    if lines and not lines[-1].endswith(b"\n"):
+        expected_sentences[-1] = run_perl([lines[-1] + b"\n"], lang)[0][:-1]
+
+    mismatches = []
+    for i, (line, target, target_sentence) in enumerate(zip(lines, expected, expected_sentences)):
+        text = line.decode("utf-8", "surrogateescape")
+        output = normalizer(text).encode("utf-8", "surrogateescape")
+        sentence_output = punc_norm(text.rstrip("\n"), lang).encode("utf-8", "surrogateescape")
+        if output != target or sentence_output != target_sentence:
+            mismatches.append(i)
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lang", type=str, default="en", help="language code of the perl script, or FLORES code")
+    parser.add_argument("--check", action="store_true", help="compare the output of stdin with the perl script")
+    args = parser.parse_args()
+
+    # FLORES codes are mapped like in the engine
+    if "_" in args.lang:
+        args.lang = punc_norm_lang(args.lang) or "en"
+
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    if args.check:
+        lines = split_lines(stdin.read())
+        mismatches = check_parity(lines, args.lang)
+        for i in mismatches[:10]:
+            print(f"line {i + 1}: {lines[i]!r}", file=sys.stderr)
+        print(f"{len(lines) - len(mismatches)}/{len(lines)} lines identical to {os.path.basename(PERL_SCRIPT)}")
+        sys.exit(1 if mismatches else 0)
+
+    normalizer = get_normalizer(args.lang)
+    for line in stdin:
+        stdout.write(normalizer(line.decode("utf-8", "surrogateescape")).encode("utf-8", "surrogateescape"))
@@ -0,0 +1,337 @@
+"""
+Exports a HuggingFace IndicTrans2 checkpoint to ONNX for CPU inference with ONNX Runtime, in the layout expected by
+`inference.engine.Model(..., model_type="onnx")`:
+
+    <output_dir>/onnx_<precision>_model/
+    ├── encoder_model.onnx, decoder_model.onnx, decoder_with_past_model.onnx
+    ├── config.json, dict.SRC.json, dict.TGT.json
+    └── vocab/model.SRC, vocab/model.TGT
+
+`decoder_model.onnx` runs the first decoding step and returns the self- and cross-attention keys/values of every
+layer, `decoder_with_past_model.onnx` runs the following steps from the cached keys/values. With `--quantize`, an
+`onnx_int8_model` with dynamically quantised (int8 weights, int8 activations computed at runtime) linear layers is
+written as well.
+
+Each exported model is then checked against the PyTorch model on CPU: the encoder outputs and first step logits are
+compared, and the bundled sample (`inference/sample_data`) is translated with beam search by both.
+
+Usage (from the root directory):
+    python3 -m inference.onnx_export --hf_dir indictrans2-en-indic-dist-200M --output_dir checkpoints/en-indic \\
+        --quantize
+"""
+
+import argparse
+import inspect
+import json
+import os
+import shutil
+import sys
+from typing import Dict, List
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from .benchmark_utils import SAMPLE_DIR, encode_sample, get_dir_size, read_lines
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENCODER_FILE = "encoder_model.onnx"
+DECODER_FILE = "decoder_model.onnx"
+DECODER_WITH_PAST_FILE = "decoder_with_past_model.onnx"
+ONNX_DIR_NAMES = {"fp32": "onnx_fp32_model", "int8": "onnx_int8_model"}
+
+
+def load_hf_model(hf_dir: str):
+    sys.path.insert(0, ROOT_DIR)
+    from huggingface_interface.modeling_indictrans import IndicTransForConditionalGeneration
+
+    model = IndicTransForConditionalGeneration.from_pretrained(
+        hf_dir, torch_dtype=torch.float32, attn_implementation="eager"
+    )
+    return model.eval()
+
+
+def past_names(prefix: str, num_layers: int, cross: bool = True) -> List[str]:
+    kinds = ("decoder", "encoder") if cross else ("decoder",)
+    return [f"{prefix}.{i}.{kind}.{name}" for i in range(num_layers) for kind in kinds for name in ("key", "value")]
+
+
+class EncoderForExport(nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.get_encoder()
+
+    def forward(self, input_ids, attention_mask):
+        return self.encoder(input_ids=input_ids, attention_mask=attention_mask, return_dict=True).last_hidden_state
+
+
+class DecoderForExport(nn.Module):
+    """
+    First decoding step: returns the logits and the keys/values of both attention blocks of every layer.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.get_decoder()
+        self.lm_head = model.lm_head
+
+    def forward(self, input_ids, encoder_hidden_states, encoder_attention_mask):
+        outputs = self.decoder(
+            input_ids=input_ids,
+            encoder_hidden_states=encoder_hidden_states,
+            encoder_attention_mask=encoder_attention_mask,
+            use_cache=True,
+            return_dict=True,
+        )
+        # keys/values are ordered as (self key, self value, cross key, cross value) per layer
+        return (self.lm_head(outputs.last_hidden_state),) + tuple(x for layer in outputs.past_key_values for x in layer)
+
+
+class DecoderWithPastForExport(nn.Module):
+    """
+    Following decoding steps: returns the logits and the updated self-attention keys/values of every layer, the
+    cross-attention ones do not change.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.get_decoder()
+        self.lm_head = model.lm_head
+
+    def forward(self, input_ids, encoder_attention_mask, *past_key_values):
+        past_key_values = tuple(tuple(past_key_values[i : i + 4]) for i in range(0, len(past_key_values), 4))
+        # the cross-attention keys/values are cached, only the source length of the encoder output is used
+        encoder_hidden_states = torch.zeros_like(past_key_values[0][2][:, 0, :, :1])
+        outputs = self.decoder(
+            input_ids=input_ids,
+            encoder_hidden_states=encoder_hidden_states,
+            encoder_attention_mask=encoder_attention_mask,
+            past_key_values=past_key_values,
+            use_cache=True,
+            return_dict=True,
+        )
+        return (self.lm_head(outputs.last_hidden_state),) + tuple(x for layer in outputs.past_key_values for x in layer[:2])
+
+
+def onnx_export(module: nn.Module, args: tuple, path: str, input_names, output_names, dynamic_axes, opset: int):
+    kwargs = {}
+    # the graphs rely on the TorchScript exporter, which is no longer the default in recent torch versions
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            module,
+            args,
+            path,
+            input_names=input_names,
+            output_names=output_names,
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            **kwargs,
+        )
+
+
+def export(model, output_dir: str, opset: int):
+    """
+    Exports the encoder, decoder and decoder-with-past graphs of `model` to `output_dir`.
+    """
+    config = model.config
+    num_layers = config.decoder_layers
+    num_heads = config.decoder_attention_heads
+    head_dim = config.decoder_embed_dim // num_heads
+
+    batch_size, src_len, tgt_len = 2, 7, 3
+    input_ids = torch.randint(4, config.encoder_vocab_size, (batch_size, src_len))
+    attention_mask = torch.ones(batch_size, src_len, dtype=torch.long)
+    attention_mask[1, :2] = 0
+    decoder_input_ids = torch.full((batch_size, 1), config.decoder_start_token_id, dtype=torch.long)
+
+    onnx_export(
+        EncoderForExport(model),
+        (input_ids, attention_mask),
+        os.path.join(output_dir, ENCODER_FILE),
+        input_names=["input_ids", "attention_mask"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "encoder_sequence"},
+            "attention_mask": {0: "batch", 1: "encoder_sequence"},
+            "last_hidden_state": {0: "batch", 1: "encoder_sequence"},
+        },
+        opset=opset,
+    )
+
+    encoder_hidden_states = torch.randn(batch_size, src_len, config.encoder_embed_dim)
+    present = past_names("present", num_layers)
+    self_axes = {0: "batch", 2: "past_decoder_sequence + 1"}
+    cross_axes = {0: "batch", 2: "encoder_sequence"}
+    onnx_export(
+        DecoderForExport(model),
+        (decoder_input_ids, encoder_hidden_states, attention_mask),
+        os.path.join(output_dir, DECODER_FILE),
+        input_names=["input_ids", "encoder_hidden_states", "encoder_attention_mask"],
+        output_names=["logits"] + present,
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "decoder_sequence"},
+            "encoder_hidden_states": {0: "batch", 1: "encoder_sequence"},
+            "encoder_attention_mask": {0: "batch", 1: "encoder_sequence"},
+            "logits": {0: "batch", 1: "decoder_sequence"},
+            **{name: cross_axes if ".encoder." in name else self_axes for name in present},
+        },
+        opset=opset,
+    )
+
+    past = []
+    for _ in range(num_layers):
+        past += [torch.randn(batch_size, num_heads, tgt_len, head_dim) for _ in range(2)]
+        past += [torch.randn(batch_size, num_heads, src_len, head_dim) for _ in range(2)]
+    past_inputs = past_names("past_key_values", num_layers)
+    present = past_names("present", num_layers, cross=False)
+    onnx_export(
+        DecoderWithPastForExport(model),
+        (decoder_input_ids, attention_mask, *past),
+        os.path.join(output_dir, DECODER_WITH_PAST_FILE),
+        input_names=["input_ids", "encoder_attention_mask"] + past_inputs,
+        output_names=["logits"] + present,
+        dynamic_axes={
+            "input_ids": {0: "batch"},
+            "encoder_attention_mask": {0: "batch", 1: "encoder_sequence"},
+            "logits": {0: "batch"},
+            **{
+                name: cross_axes if ".encoder." in name else {0: "batch", 2: "past_decoder_sequence"}
+                for name in past_inputs
+            },
+            **{name: self_axes for name in present},
+        },
+        opset=opset,
+    )
+
+
+def quantize(src_dir: str, dst_dir: str):
+    """
+    Writes dynamically int8-quantised copies of the graphs of `src_dir` to `dst_dir`.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    for name in (ENCODER_FILE, DECODER_FILE, DECODER_WITH_PAST_FILE):
+        quantize_dynamic(
+            os.path.join(src_dir, name),
+            os.path.join(dst_dir, name),
+            weight_type=QuantType.QInt8,
+            op_types_to_quantize=["MatMul", "Gemm"],
+        )
+
+
+def copy_model_files(hf_dir: str, model, output_dir: str):
+    """
+    Copies the vocabularies and sentence piece models next to the graphs, and writes the model config.
+    """
+    os.makedirs(os.path.join(output_dir, "vocab"), exist_ok=True)
+    model.config.to_json_file(os.path.join(output_dir, "config.json"))
+    for name in ("dict.SRC.json", "dict.TGT.json"):
+        shutil.copy(os.path.join(hf_dir, name), os.path.join(output_dir, name))
+
+    spm_dir = os.path.join(hf_dir, "vocab") if os.path.isdir(os.path.join(hf_dir, "vocab")) else hf_dir
+    for name in ("model.SRC", "model.TGT"):
+        path = os.path.join(spm_dir, name)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Sentence piece model not found: {path}")
+        shutil.copy(path, os.path.join(output_dir, "vocab", name))
+
+
+def check_parity(model, model_dir: str, sents: List[List[str]], beam_size: int, max_decoding_length: int) -> Dict[str, float]:
+    """
+    Compares the exported model with the PyTorch one on CPU.
+
+    Returns:
+        Dict[str, float]: largest absolute difference of the encoder outputs and first step logits, and fraction of
+            sentences translated identically with beam search.
+    """
+    from .onnx_translator import OnnxTranslator
+
+    translator = OnnxTranslator(model_dir)
+    input_ids, attention_mask = translator.encode_source(sents, max_input_length=None)
+
+    encoder_hidden_states = translator.encoder.run(None, {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+    decoder_input_ids = np.full((len(sents), 1), model.config.decoder_start_token_id, dtype=np.int64)
+    logits = translator.decoder.run(
+        ["logits"],
+        {
+            "input_ids": decoder_input_ids,
+            "encoder_hidden_states": encoder_hidden_states,
+            "encoder_attention_mask": attention_mask,
+        },
+    )[0]
+
+    with torch.no_grad():
+        outputs = model(
+            input_ids=torch.from_numpy(input_ids),
+            attention_mask=torch.from_numpy(attention_mask),
+            decoder_input_ids=torch.from_numpy(decoder_input_ids),
+        )
+        # `OnnxTranslator` follows the beam search of `generate`, so both should agree with the fp32 graphs
+        generated = model.generate(
+            input_ids=torch.from_numpy(input_ids),
+            attention_mask=torch.from_numpy(attention_mask),
+            num_beams=beam_size,
+            max_new_tokens=max_decoding_length,
+            min_length=0,
+        )
+
+    reference = [translator.decode_target(ids) for ids in generated[:, 1:].tolist()]
+    hypotheses = [x.hypotheses[0] for x in translator.translate_batch(
+        sents, beam_size=beam_size, max_decoding_length=max_decoding_length
+    )]
+    return {
+        "encoder_max_abs_diff": float(np.abs(encoder_hidden_states - outputs.encoder_last_hidden_state.numpy()).max()),
+        "logits_max_abs_diff": float(np.abs(logits - outputs.logits.numpy()).max()),
+        "beam_search_match": round(sum(h == r for h, r in zip(hypotheses, reference)) / len(sents), 4),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--hf_dir",
+        type=str,
+        required=True,
+        help="HF model directory with `dict.SRC.json`, `dict.TGT.json`, `model.SRC` and `model.TGT`",
+    )
+    parser.add_argument("--output_dir", type=str, required=True, help="directory to write the ONNX models to")
+    parser.add_argument("--quantize", action="store_true", help="also write a dynamically int8-quantised model")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--skip_parity_check", action="store_true")
+    parser.add_argument("--src_lang", type=str, default="eng_Latn", help="flores code of the sample source")
+    parser.add_argument("--tgt_lang", type=str, default="hin_Deva", help="flores code of the sample target")
+    parser.add_argument("--sample_dir", type=str, default=SAMPLE_DIR, help="directory with `sample.{lang}` files")
+    parser.add_argument("--beam_size", type=int, default=5)
+    parser.add_argument("--max_decoding_length", type=int, default=256)
+    parser.add_argument("--report_json", type=str, default=None)
+    args = parser.parse_args()
+
+    model = load_hf_model(args.hf_dir)
+    precisions = ["fp32", "int8"] if args.quantize else ["fp32"]
+
+    report = []
+    for precision in precisions:
+        output_dir = os.path.join(args.output_dir, ONNX_DIR_NAMES[precision])
+        os.makedirs(output_dir, exist_ok=True)
+        print(f"Exporting to {output_dir} ({precision})")
+        if precision == "fp32":
+            export(model, output_dir, args.opset)
+        else:
+            quantize(os.path.join(args.output_dir, ONNX_DIR_NAMES["fp32"]), output_dir)
+        copy_model_files(args.hf_dir, model, output_dir)
+
+        row = {"precision": precision, "path": output_dir, "size_mb": round(get_dir_size(output_dir, ".onnx") / 2**20, 1)}
+        if not args.skip_parity_check:
+            sents = read_lines(os.path.join(args.sample_dir, f"sample.{args.src_lang}"))
+            sents = encode_sample(output_dir, sents, args.src_lang, args.tgt_lang)
+            row.update(check_parity(model, output_dir, sents, args.beam_size, args.max_decoding_length))
+        report.append(row)
+        print(json.dumps(row))
+
+    if args.report_json:
+        with open(args.report_json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
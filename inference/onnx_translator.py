@@ -0,0 +1,197 @@
+"""
+ONNX Runtime backend for the graphs written by `inference.onnx_export`.
+
+`OnnxTranslator.translate_batch` follows the subset of `ctranslate2.Translator.translate_batch` used by
+`inference.engine.Model`, so the ctranslate2 code path of `Model` runs unchanged on top of it. Decoding is beam
+search as in `transformers`' `generate` (same hypothesis scoring, length penalty and stopping criterion), optionally
+stopping earlier once the best finished hypothesis of a source is ahead of all its active beams by a margin.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .batch_translator import BatchTranslator
+from .onnx_export import DECODER_FILE, DECODER_WITH_PAST_FILE, ENCODER_FILE
+
+
+class BeamHypotheses:
+    """
+    Finished hypotheses of one source, at most `num_beams` of them are kept.
+
+    Args:
+        early_stopping_margin (float, optional): also done once the best finished hypothesis scores at least this
+            much above the best active beam, both normalized by their length (defaults: None).
+    """
+
+    def __init__(self, num_beams: int, length_penalty: float, early_stopping_margin: Optional[float] = None):
+        self.num_beams = num_beams
+        self.length_penalty = length_penalty
+        self.early_stopping_margin = early_stopping_margin
+        self.beams = []
+        self.worst_score = 1e9
+        self.best_score = -1e9
+
+    def __len__(self):
+        return len(self.beams)
+
+    def add(self, tokens: List[int], sum_logprobs: float, generated_len: int):
+        score = sum_logprobs / (generated_len**self.length_penalty)
+        self.best_score = max(score, self.best_score)
+        if len(self) < self.num_beams or score > self.worst_score:
+            self.beams.append((score, tokens))
+            if len(self) > self.num_beams:
+                sorted_scores = sorted([(s, idx) for idx, (s, _) in enumerate(self.beams)])
+                del self.beams[sorted_scores[0][1]]
+                self.worst_score = sorted_scores[1][0]
+            else:
+                self.worst_score = min(score, self.worst_score)
+
+    def is_done(self, best_sum_logprobs: float, generated_len: int) -> bool:
+        best_active_score = best_sum_logprobs / generated_len**self.length_penalty
+        if self.early_stopping_margin is not None and len(self):
+            if self.best_score >= best_active_score + self.early_stopping_margin:
+                return True
+        if len(self) < self.num_beams:
+            return False
+        return self.worst_score >= best_active_score
+
+
+def log_softmax(x: np.ndarray) -> np.ndarray:
+    x = x - x.max(axis=-1, keepdims=True)
+    return x - np.log(np.exp(x).sum(axis=-1, keepdims=True))
+
+
+class OnnxTranslator(BatchTranslator):
+    """
+    Translates tokenized sentences with the encoder, decoder and decoder-with-past ONNX graphs of a model directory.
+
+    Args:
+        model_dir (str): directory written by `inference.onnx_export`.
+        intra_threads (int, optional): threads used by each ONNX Runtime operator, 0 lets the runtime decide
+            (defaults: 0).
+        early_stopping_margin (float, optional): see `BeamHypotheses` (defaults: None).
+    """
+
+    def __init__(self, model_dir: str, intra_threads: int = 0, early_stopping_margin: Optional[float] = None):
+        import onnxruntime as ort
+
+        super().__init__(model_dir)
+        self.early_stopping_margin = early_stopping_margin
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        providers = ["CPUExecutionProvider"]
+        self.encoder = ort.InferenceSession(os.path.join(model_dir, ENCODER_FILE), options, providers=providers)
+        self.decoder = ort.InferenceSession(os.path.join(model_dir, DECODER_FILE), options, providers=providers)
+        self.decoder_with_past = ort.InferenceSession(
+            os.path.join(model_dir, DECODER_WITH_PAST_FILE), options, providers=providers
+        )
+
+        self.past_names = [x.name for x in self.decoder_with_past.get_inputs()[2:]]
+
+    def beam_search(
+        self,
+        input_ids: np.ndarray,
+        attention_mask: np.ndarray,
+        beam_size: int,
+        max_decoding_length: int,
+        length_penalty: float,
+    ) -> List[List[Tuple[float, List[int]]]]:
+        """
+        Returns:
+            List[List[Tuple[float, List[int]]]]: the finished hypotheses of every source, as (score, ids) pairs
+                sorted from best to worst.
+        """
+        batch_size = input_ids.shape[0]
+        hidden_states = self.encoder.run(None, {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+        outputs = self.decoder.run(
+            None,
+            {
+                "input_ids": np.full((batch_size, 1), self.decoder_start_id, dtype=np.int64),
+                "encoder_hidden_states": hidden_states,
+                "encoder_attention_mask": attention_mask,
+            },
+        )
+        logprobs = log_softmax(outputs[0][:, -1].astype(np.float32))
+        vocab_size = logprobs.shape[-1]
+
+        # the first step is run once per source, the beams only differ from the second one
+        rows = np.repeat(np.arange(batch_size), beam_size)
+        past = [x[rows] for x in outputs[1:]]
+        self_past, cross_past = [x for i, x in enumerate(past) if i % 4 < 2], [x for i, x in enumerate(past) if i % 4 >= 2]
+        encoder_mask = attention_mask[rows]
+        next_scores = np.full((batch_size, beam_size * vocab_size), -np.inf, dtype=np.float32)
+        next_scores[:, :vocab_size] = logprobs
+
+        hyps = [BeamHypotheses(beam_size, length_penalty, self.early_stopping_margin) for _ in range(batch_size)]
+        active = list(range(batch_size))  # sources still decoded, in the order of the rows
+        tokens = [[] for _ in range(batch_size * beam_size)]
+
+        for step in range(1, max_decoding_length + 1):
+            candidates = np.argpartition(-next_scores, 2 * beam_size, axis=1)[:, : 2 * beam_size]
+            order = np.argsort(-np.take_along_axis(next_scores, candidates, axis=1), axis=1, kind="stable")
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            keep_rows, next_tokens, beam_scores, next_active = [], [], [], []
+            for a, src in enumerate(active):
+                rows, kept_tokens, scores = [], [], []
+                for rank, candidate in enumerate(candidates[a]):
+                    score = float(next_scores[a, candidate])
+                    row = a * beam_size + candidate // vocab_size
+                    token = int(candidate % vocab_size)
+                    if token == self.eos_id:
+                        if rank < beam_size:
+                            hyps[src].add(tokens[row], score, step)
+                        continue
+                    rows.append(row)
+                    kept_tokens.append(token)
+                    scores.append(score)
+                    if len(rows) == beam_size:
+                        break
+
+                if hyps[src].is_done(float(next_scores[a].max()), step):
+                    continue
+                if step == max_decoding_length:
+                    for row, token, score in zip(rows, kept_tokens, scores):
+                        hyps[src].add(tokens[row] + [token], score, step)
+                    continue
+                keep_rows += rows
+                next_tokens += kept_tokens
+                beam_scores += scores
+                next_active.append(src)
+
+            if not next_active:
+                break
+
+            keep_rows = np.array(keep_rows)
+            tokens = [tokens[row] + [token] for row, token in zip(keep_rows, next_tokens)]
+            self_past = [x[keep_rows] for x in self_past]
+            # the beams of a source share its cross-attention keys/values, which are only gathered again when
+            # finished sources leave the batch
+            if len(next_active) < len(active):
+                source_rows = keep_rows - keep_rows % beam_size
+                cross_past = [x[source_rows] for x in cross_past]
+                encoder_mask = encoder_mask[source_rows]
+            active = next_active
+
+            feeds = {
+                "input_ids": np.array(next_tokens, dtype=np.int64)[:, None],
+                "encoder_attention_mask": encoder_mask,
+            }
+            for i in range(self.num_layers):
+                feeds[self.past_names[4 * i]] = self_past[2 * i]
+                feeds[self.past_names[4 * i + 1]] = self_past[2 * i + 1]
+                feeds[self.past_names[4 * i + 2]] = cross_past[2 * i]
+                feeds[self.past_names[4 * i + 3]] = cross_past[2 * i + 1]
+            outputs = self.decoder_with_past.run(None, feeds)
+
+            self_past = outputs[1:]
+            logprobs = log_softmax(outputs[0][:, -1].astype(np.float32))
+            next_scores = (logprobs + np.array(beam_scores, dtype=np.float32)[:, None]).reshape(len(active), -1)
+
+        return [sorted(h.beams, key=lambda x: x[0], reverse=True) for h in hyps]
+
+    def decode(self, input_ids, attention_mask, beam_size, max_decoding_length, length_penalty):
+        return self.beam_search(input_ids, attention_mask, beam_size, max_decoding_length, length_penalty)
@@ -0,0 +1,625 @@
+"""
+Lightweight asyncio HTTP/JSON inference server on top of `inference.engine.Model`.
+
+It mirrors the Triton `nmt` model contract (KServe v2 HTTP protocol with `INPUT_TEXT`, `INPUT_LANGUAGE_ID`,
+`OUTPUT_LANGUAGE_ID` inputs and `OUTPUT_TEXT` output, in both JSON and binary tensor encodings), so clients
+such as `triton_server/client.py` can switch between Triton and this server by changing the URL.
+
+Endpoints:
+    POST /v2/models/nmt/infer                  translation requests (also /v2/models/nmt/versions/1/infer)
+    GET  /v2/health/live                       liveness
+    GET  /v2/health/ready, /v2/models/nmt/ready  readiness (all models loaded)
+    GET  /metrics                              server and engine metrics in Prometheus text exposition format
+
+Usage (from the root directory):
+    python3 -m inference.server --checkpoints_root checkpoints --model_type ctranslate2 --device cpu --port 8000
+
+`checkpoints_root` follows the Triton layout, i.e. one `<direction>` folder per model where direction is one of
+`en-indic`, `indic-en` or `indic-indic`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .flores_codes_map_indic import iso_to_flores
+from .metrics import BATCH_SIZE_BUCKETS, REGISTRY, Counter, Gauge, Histogram
+
+MODEL_NAME = "nmt"
+MODEL_VERSION = "1"
+OUTPUT_NAME = "OUTPUT_TEXT"
+INPUT_NAMES = ("INPUT_TEXT", "INPUT_LANGUAGE_ID", "OUTPUT_LANGUAGE_ID")
+
+INDIC_LANGUAGES = set(iso_to_flores)
+ALLOWED_DIRECTION_STRINGS = {"en-indic", "indic-en", "indic-indic"}
+DEFAULT_PIVOT_LANG = "en"
+DEFAULT_CKPT_SUBDIRS = {"ctranslate2": "ct2_fp16_model", "onnx": "onnx_int8_model"}
+
+SERVER_REQUESTS = Counter("nmt_server_requests_total", "HTTP inference requests by response status.", ["status"])
+SERVER_READY = Gauge("nmt_server_ready", "Whether all models are loaded.")
+SERVER_QUEUE_DEPTH = Gauge("nmt_server_queue_depth", "Requests waiting to be batched.", ["direction"])
+SERVER_BATCH_PARAGRAPHS = Histogram(
+    "nmt_server_batch_paragraphs",
+    "Paragraphs per model call made by the dynamic batcher.",
+    ["direction"],
+    buckets=BATCH_SIZE_BUCKETS,
+)
+SERVER_BATCH_SECONDS = Histogram(
+    "nmt_server_batch_seconds", "Duration of model calls made by the dynamic batcher.", ["direction"]
+)
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class ServerError(Exception):
+    """
+    Error raised while handling a request, carrying the HTTP status code to respond with.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def get_direction_string(input_language_id: str, output_language_id: str) -> Optional[str]:
+    """
+    Maps a pair of iso language codes to the model direction that serves it (same rules as the Triton backend).
+    """
+    direction_string = None
+    if input_language_id == DEFAULT_PIVOT_LANG and output_language_id in INDIC_LANGUAGES:
+        direction_string = "en-indic"
+    elif input_language_id in INDIC_LANGUAGES:
+        if output_language_id == DEFAULT_PIVOT_LANG:
+            direction_string = "indic-en"
+        elif output_language_id in INDIC_LANGUAGES:
+            direction_string = "indic-indic"
+    return direction_string
+
+
+def flatten(data) -> list:
+    if isinstance(data, list):
+        return [x for item in data for x in flatten(item)]
+    return [data]
+
+
+def deserialize_bytes_tensor(buffer: bytes) -> List[str]:
+    """
+    Decodes a BYTES tensor serialized with the Triton binary tensor extension (4-byte little-endian
+    length followed by the raw bytes of every element).
+    """
+    values, offset = [], 0
+    while offset < len(buffer):
+        (length,) = struct.unpack_from("<I", buffer, offset)
+        offset += 4
+        values.append(buffer[offset : offset + length].decode("utf-8", "ignore"))
+        offset += length
+    return values
+
+
+def serialize_bytes_tensor(values: List[str]) -> bytes:
+    chunks = []
+    for value in values:
+        encoded = value.encode("utf-8")
+        chunks.append(struct.pack("<I", len(encoded)))
+        chunks.append(encoded)
+    return b"".join(chunks)
+
+
+def _get_list(request: dict, key: str) -> List[dict]:
+    values = request.get(key, [])
+    if not isinstance(values, list) or not all(isinstance(x, dict) for x in values):
+        raise ServerError(400, f"malformed request: `{key}` must be a list of JSON objects")
+    return values
+
+
+def _get_parameters(obj: dict) -> dict:
+    parameters = obj.get("parameters", {})
+    if not isinstance(parameters, dict):
+        raise ServerError(400, "malformed request: `parameters` must be a JSON object")
+    return parameters
+
+
+def decode_infer_request(body: bytes, headers: Dict[str, str]) -> Tuple[dict, Dict[str, List[str]], bool]:
+    """
+    Parses a KServe v2 inference request in either the JSON or the binary tensor encoding.
+
+    Returns:
+        Tuple[dict, Dict[str, List[str]], bool]: the JSON request header, the decoded input tensors (flattened)
+            and whether the client asked for a binary encoded output.
+    """
+    if "content-encoding" in headers:
+        raise ServerError(400, "compressed requests are not supported")
+
+    try:
+        header_length = int(headers.get("inference-header-content-length", len(body)))
+    except ValueError:
+        raise ServerError(400, "Inference-Header-Content-Length must be an integer")
+    try:
+        request = json.loads(body[:header_length])
+    except ValueError as e:
+        raise ServerError(400, f"malformed request: {e}")
+    if not isinstance(request, dict):
+        raise ServerError(400, "malformed request: the request header must be a JSON object")
+
+    inputs, offset = {}, header_length
+    for tensor in _get_list(request, "inputs"):
+        name = tensor.get("name")
+        if not isinstance(name, str):
+            raise ServerError(400, "malformed request: every input tensor needs a string name")
+        binary_size = _get_parameters(tensor).get("binary_data_size")
+        if binary_size is not None:
+            if not isinstance(binary_size, int) or isinstance(binary_size, bool) or binary_size < 0:
+                raise ServerError(400, f"malformed request: binary_data_size of {name} must be an integer")
+            if offset + binary_size > len(body):
+                raise ServerError(400, f"malformed request: binary data of {name} is truncated")
+            try:
+                inputs[name] = deserialize_bytes_tensor(body[offset : offset + binary_size])
+            except struct.error:
+                raise ServerError(400, f"malformed request: binary data of {name} is not a BYTES tensor")
+            offset += binary_size
+        else:
+            inputs[name] = [str(x) for x in flatten(tensor.get("data", []))]
+
+    missing = [name for name in INPUT_NAMES if name not in inputs]
+    if missing:
+        raise ServerError(400, f"missing input tensors: {', '.join(missing)}")
+    if len({len(inputs[name]) for name in INPUT_NAMES}) != 1:
+        raise ServerError(400, "input tensors must have the same batch size")
+
+    binary_output = _get_parameters(request).get("binary_data_output", False)
+    for output in _get_list(request, "outputs"):
+        if output.get("name") == OUTPUT_NAME:
+            binary_output = _get_parameters(output).get("binary_data", binary_output)
+
+    return request, inputs, binary_output
+
+
+def encode_infer_response(
+    request: dict, translations: List[str], binary_output: bool
+) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Builds the KServe v2 inference response for `OUTPUT_TEXT`, honoring the requested output encoding.
+    """
+    output = {"name": OUTPUT_NAME, "datatype": "BYTES", "shape": [len(translations), 1]}
+    response = {"model_name": MODEL_NAME, "model_version": MODEL_VERSION, "outputs": [output]}
+    if "id" in request:
+        response["id"] = request["id"]
+
+    if not binary_output:
+        output["data"] = translations
+        return json.dumps(response, ensure_ascii=False).encode("utf-8"), {"Content-Type": "application/json"}
+
+    binary = serialize_bytes_tensor(translations)
+    output["parameters"] = {"binary_data_size": len(binary)}
+    header = json.dumps(response, ensure_ascii=False).encode("utf-8")
+    return header + binary, {
+        "Content-Type": "application/octet-stream",
+        "Inference-Header-Content-Length": str(len(header)),
+    }
+
+
+class DynamicBatcher:
+    """
+    Collects translation payloads submitted by concurrent requests for one direction into batches.
+
+    A batch is dispatched as soon as it holds `max_batch_size` payloads, or `max_delay_ms` after its first
+    payload arrived, whichever comes first. Batches run one at a time on a dedicated worker thread, so the
+    event loop stays responsive while the model is busy. The number of waiting requests is bounded by
+    `max_queue_size`; `submit` raises `asyncio.QueueFull` beyond that so callers can shed load.
+
+    Args:
+        name (str): name of the direction served by this batcher.
+        translate_fn (Callable): function translating a list of `(text, src_lang, tgt_lang)` payloads.
+        max_batch_size (int): maximum number of payloads per batch (a single larger request is not split).
+        max_delay_ms (float): maximum time to wait for a batch to fill up.
+        max_queue_size (int): maximum number of requests waiting to be batched.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        translate_fn: Callable[[List[list]], List[str]],
+        max_batch_size: int = 64,
+        max_delay_ms: float = 10.0,
+        max_queue_size: int = 256,
+    ):
+        self.name = name
+        self.translate_fn = translate_fn
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"batcher-{name}")
+        self.on_batch = None
+        self._carry = None
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self.executor.shutdown(wait=False)
+
+    def submit(self, payloads: List[list]) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((payloads, future))
+        return future
+
+    async def _next_item(self, timeout: Optional[float] = None):
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        if timeout is None:
+            return await self.queue.get()
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    async def collect_batch(self) -> List[tuple]:
+        loop = asyncio.get_running_loop()
+        items = [await self._next_item()]
+        num_payloads = len(items[0][0])
+        deadline = loop.time() + self.max_delay
+
+        while num_payloads < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await self._next_item(timeout)
+            except asyncio.TimeoutError:
+                break
+            if num_payloads + len(item[0]) > self.max_batch_size:
+                self._carry = item
+                break
+            items.append(item)
+            num_payloads += len(item[0])
+        return items
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self.collect_batch()
+            items = [(payloads, future) for payloads, future in items if not future.cancelled()]
+            if not items:
+                continue
+            payloads = [payload for item_payloads, _ in items for payload in item_payloads]
+
+            start = time.perf_counter()
+            try:
+                translations = await loop.run_in_executor(self.executor, self.translate_fn, payloads)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if self.on_batch is not None:
+                self.on_batch(self.name, len(payloads), time.perf_counter() - start)
+
+            offset = 0
+            for item_payloads, future in items:
+                if not future.done():
+                    future.set_result(translations[offset : offset + len(item_payloads)])
+                offset += len(item_payloads)
+
+
+class TranslationServer:
+    """
+    Asyncio HTTP server exposing one or more `Model` directions with the Triton `nmt` contract.
+
+    Args:
+        model_loader (Callable): function returning a mapping of direction string to a loaded model. It runs on a
+            worker thread after the server starts listening; the server reports ready once it returns.
+        max_batch_size (int): maximum number of paragraphs per model call.
+        max_delay_ms (float): maximum time a request waits for its batch to fill up.
+        max_queue_size (int): maximum number of requests waiting per direction before responding with 503.
+    """
+
+    def __init__(
+        self,
+        model_loader: Callable[[], Dict[str, object]],
+        max_batch_size: int = 64,
+        max_delay_ms: float = 10.0,
+        max_queue_size: int = 256,
+    ):
+        self.model_loader = model_loader
+        self.max_batch_size = max_batch_size
+        self.max_delay_ms = max_delay_ms
+        self.max_queue_size = max_queue_size
+
+        self.models = {}
+        self.model_locks = {}
+        self.batchers = {}
+        self.pivot_lang = None
+        self.ready = False
+        self.load_error = None
+        self.server = None
+
+    async def start(self, host: str = "0.0.0.0", port: int = 8000) -> int:
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        asyncio.get_running_loop().create_task(self.load_models())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for batcher in self.batchers.values():
+            await batcher.stop()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def load_models(self):
+        try:
+            models = await asyncio.get_running_loop().run_in_executor(None, self.model_loader)
+        except Exception as e:
+            self.load_error = f"{type(e).__name__}: {e}"
+            print(f"Failed to load models: {self.load_error}")
+            return
+
+        self.models = dict(models)
+        self.model_locks = {direction: threading.Lock() for direction in self.models}
+        if "en-indic" in self.models and "indic-en" in self.models and "indic-indic" not in self.models:
+            self.pivot_lang = DEFAULT_PIVOT_LANG
+
+        directions = list(self.models)
+        if self.pivot_lang and "indic-indic" not in directions:
+            directions.append("indic-indic")
+        for direction in directions:
+            batcher = DynamicBatcher(
+                direction,
+                lambda payloads, direction=direction: self.translate_payloads(direction, payloads),
+                self.max_batch_size,
+                self.max_delay_ms,
+                self.max_queue_size,
+            )
+            batcher.on_batch = self.record_batch
+            batcher.start()
+            self.batchers[direction] = batcher
+
+        self.ready = True
+        SERVER_READY.set(1)
+        print(f"Models ready: {', '.join(sorted(self.models))}")
+
+    def run_model(self, direction: str, payloads: List[list]) -> List[str]:
+        with self.model_locks[direction]:
+            return self.models[direction].paragraphs_batch_translate__multilingual(payloads)
+
+    def translate_payloads(self, direction: str, payloads: List[list]) -> List[str]:
+        """
+        Translates a batch of `[text, src_lang, tgt_lang]` payloads, pivoting through English for
+        Indic-Indic requests when no direct model is loaded.
+        """
+        if direction == "indic-indic" and direction not in self.models:
+            pivot_payloads = [[text, src_lang, self.pivot_lang] for text, src_lang, _ in payloads]
+            pivot_texts = self.run_model("indic-en", pivot_payloads)
+            payloads = [
+                [pivot_text, self.pivot_lang, tgt_lang]
+                for pivot_text, (_, _, tgt_lang) in zip(pivot_texts, payloads)
+            ]
+            return self.run_model("en-indic", payloads)
+        return self.run_model(direction, payloads)
+
+    def record_batch(self, direction: str, num_paragraphs: int, seconds: float):
+        SERVER_BATCH_PARAGRAPHS.observe(num_paragraphs, direction=direction)
+        SERVER_BATCH_SECONDS.observe(seconds, direction=direction)
+
+    async def infer(self, body: bytes, headers: Dict[str, str]) -> Tuple[bytes, Dict[str, str]]:
+        if not self.ready:
+            raise ServerError(503, self.load_error or "models are still loading")
+
+        request, inputs, binary_output = decode_infer_request(body, headers)
+        texts, input_language_ids, output_language_ids = (inputs[name] for name in INPUT_NAMES)
+
+        groups = defaultdict(list)
+        for i, (text, input_language_id, output_language_id) in enumerate(
+            zip(texts, input_language_ids, output_language_ids)
+        ):
+            direction_string = get_direction_string(input_language_id, output_language_id)
+            if direction_string not in self.batchers:
+                raise ServerError(400, f"Language-pair not supported: {input_language_id}-{output_language_id}")
+            groups[direction_string].append((i, [text, input_language_id, output_language_id]))
+
+        futures = {}
+        try:
+            for direction, group in groups.items():
+                futures[direction] = self.batchers[direction].submit([payload for _, payload in group])
+        except asyncio.QueueFull:
+            # drop the parts of this request that were already queued, the batcher skips cancelled futures
+            for future in futures.values():
+                future.cancel()
+            raise ServerError(503, "request queue is full, retry later")
+
+        translations = [""] * len(texts)
+        for direction, future in futures.items():
+            try:
+                group_translations = await future
+            except Exception as e:
+                raise ServerError(500, f"{type(e).__name__}: {e}")
+            for (i, _), translation in zip(groups[direction], group_translations):
+                translations[i] = translation
+
+        return encode_infer_response(request, translations, binary_output)
+
+    def render_metrics(self) -> str:
+        for direction, batcher in self.batchers.items():
+            SERVER_QUEUE_DEPTH.set(batcher.queue.qsize(), direction=direction)
+        return REGISTRY.render()
+
+    async def route(self, method: str, path: str, body: bytes, headers: Dict[str, str]):
+        if method == "GET" and path == "/v2/health/live":
+            return 200, b"", {}
+        if method == "GET" and path in ("/v2/health/ready", f"/v2/models/{MODEL_NAME}/ready"):
+            return (200 if self.ready else 503), b"", {}
+        if method == "GET" and path == "/metrics":
+            return 200, self.render_metrics().encode("utf-8"), {"Content-Type": "text/plain; version=0.0.4"}
+        if method == "GET" and path == f"/v2/models/{MODEL_NAME}":
+            metadata = {
+                "name": MODEL_NAME,
+                "versions": [MODEL_VERSION],
+                "platform": "python",
+                "inputs": [{"name": name, "datatype": "BYTES", "shape": [-1, 1]} for name in INPUT_NAMES],
+                "outputs": [{"name": OUTPUT_NAME, "datatype": "BYTES", "shape": [-1, 1]}],
+            }
+            return 200, json.dumps(metadata).encode("utf-8"), {"Content-Type": "application/json"}
+        if method == "POST" and path in (
+            f"/v2/models/{MODEL_NAME}/infer",
+            f"/v2/models/{MODEL_NAME}/versions/{MODEL_VERSION}/infer",
+        ):
+            try:
+                payload, response_headers = await self.infer(body, headers)
+                status = 200
+            except ServerError as e:
+                status = e.status
+                payload = json.dumps({"error": str(e)}).encode("utf-8")
+                response_headers = {"Content-Type": "application/json"}
+                if status == 503:
+                    response_headers["Retry-After"] = "1"
+            except Exception as e:
+                # any other failure still gets a response, so that the connection is not dropped
+                status = 500
+                payload = json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8")
+                response_headers = {"Content-Type": "application/json"}
+            SERVER_REQUESTS.inc(status=status)
+            return status, payload, response_headers
+        return 404, json.dumps({"error": f"unknown endpoint: {method} {path}"}).encode("utf-8"), {}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        key, value = line.decode("latin-1").split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                    content_length = int(headers.get("content-length", 0))
+                except ValueError:
+                    # the rest of the stream cannot be framed, answer and close the connection
+                    SERVER_REQUESTS.inc(status=400)
+                    await self.write_response(writer, 400, b'{"error": "malformed HTTP request"}', {})
+                    break
+
+                body = await reader.readexactly(content_length) if content_length > 0 else b""
+                status, payload, response_headers = await self.route(
+                    method, path.split("?", 1)[0], body, headers
+                )
+                await self.write_response(writer, status, payload, response_headers)
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def write_response(writer: asyncio.StreamWriter, status: int, payload: bytes, headers: Dict[str, str]):
+        head = f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\nContent-Length: {len(payload)}\r\n"
+        head += "".join(f"{key}: {value}\r\n" for key, value in headers.items())
+        writer.write((head + "\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+
+def load_models_from_checkpoints(
+    checkpoints_root: str,
+    model_type: str = "ctranslate2",
+    device: str = "cpu",
+    ckpt_subdir: Optional[str] = None,
+    **model_kwargs,
+) -> Dict[str, object]:
+    """
+    Loads one `Model` per `<direction>` folder under `checkpoints_root`, using the same layout as the Triton backend.
+
+    For ctranslate2 models, the setting written by `inference.ct2_autotune` is used when present; `model_kwargs`
+    that are not None (e.g. `compute_type`, `inter_threads`, `intra_threads`) take precedence over it.
+    """
+    from .ct2_autotune import load_ct2_settings
+    from .engine import Model
+
+    if ckpt_subdir is None:
+        ckpt_subdir = DEFAULT_CKPT_SUBDIRS.get(model_type, "")
+
+    checkpoint_folders = [f.path for f in os.scandir(checkpoints_root) if f.is_dir()]
+    if not checkpoint_folders:
+        raise RuntimeError(f"No checkpoint folders in: {checkpoints_root}")
+
+    models = {}
+    for checkpoint_folder in checkpoint_folders:
+        direction_string = os.path.basename(checkpoint_folder)
+        assert direction_string in ALLOWED_DIRECTION_STRINGS, f"Checkpoint folder-name `{direction_string}` not allowed"
+        ckpt_dir = os.path.join(checkpoint_folder, ckpt_subdir)
+        kwargs = load_ct2_settings(ckpt_dir) if model_type == "ctranslate2" else {}
+        kwargs.update({key: value for key, value in model_kwargs.items() if value is not None})
+        models[direction_string] = Model(
+            ckpt_dir,
+            device=device,
+            input_lang_code_format="iso",
+            model_type=model_type,
+            direction=direction_string,
+            **kwargs,
+        )
+    return models
+
+
+async def serve(args):
+    server = TranslationServer(
+        lambda: load_models_from_checkpoints(
+            args.checkpoints_root,
+            args.model_type,
+            args.device,
+            args.ckpt_subdir,
+            compute_type=args.compute_type,
+            inter_threads=args.inter_threads,
+            intra_threads=args.intra_threads,
+        ),
+        max_batch_size=args.max_batch_size,
+        max_delay_ms=args.max_delay_ms,
+        max_queue_size=args.max_queue_size,
+    )
+    port = await server.start(args.host, args.port)
+    print(f"Serving `{MODEL_NAME}` on {args.host}:{port}")
+    await server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checkpoints_root", type=str, required=True)
+    parser.add_argument(
+        "--model_type", type=str, default="ctranslate2", choices=["ctranslate2", "fairseq", "onnx"]
+    )
+    parser.add_argument(
+        "--ckpt_subdir",
+        type=str,
+        default=None,
+        help="defaults to `ct2_fp16_model` for ctranslate2 and `onnx_int8_model` for onnx",
+    )
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--compute_type", type=str, default=None, help="e.g. int8, int8_float32, int16, float32")
+    parser.add_argument("--inter_threads", type=int, default=None)
+    parser.add_argument("--intra_threads", type=int, default=None)
+    parser.add_argument("--host", type=str, default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max_batch_size", type=int, default=64)
+    parser.add_argument("--max_delay_ms", type=float, default=10.0)
+    parser.add_argument("--max_queue_size", type=int, default=256)
+    args = parser.parse_args()
+
+    asyncio.run(serve(args))
@@ -0,0 +1,123 @@
+"""
+Speculative decoding backend: a distilled IndicTrans2 model (e.g. `indictrans2-en-indic-dist-200M`) drafts tokens
+which the full model (e.g. `indictrans2-en-indic-1B`) verifies, see
+`IndicTransForConditionalGeneration.generate_speculative`. The output is the greedy output of the full model.
+
+`SpeculativeTranslator.translate_batch` follows the subset of `ctranslate2.Translator.translate_batch` used by
+`inference.engine.Model`, so the ctranslate2 code path of `Model` runs unchanged on top of it.
+"""
+
+import os
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from .batch_translator import BatchTranslator, TranslationResult
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_hf_model(model_dir: str, device: str):
+    sys.path.insert(0, ROOT_DIR)
+    from huggingface_interface.modeling_indictrans import IndicTransForConditionalGeneration
+
+    model = IndicTransForConditionalGeneration.from_pretrained(model_dir, torch_dtype=torch.float32)
+    return model.to(device).eval()
+
+
+class SpeculativeTranslator(BatchTranslator):
+    """
+    Translates tokenized sentences greedily with a HF model, drafting tokens with a smaller model of the same family.
+
+    Args:
+        model_dir (str): HF model directory of the model whose output is returned, with its vocabularies.
+        draft_model_dir (str, optional): HF model directory of the draft model, with the same vocabularies. Without
+            it, sentences are decoded greedily with `model_dir` only (defaults: None).
+        device (str, optional): where to load the models (defaults: cpu).
+        num_draft_tokens (int, optional): tokens drafted before each verification (defaults: 4).
+        batch_size (int, optional): sentences decoded together. The sentences of a batch advance by the number of
+            drafted tokens accepted for all of them, so 1 gives the best latency (defaults: 1).
+        intra_threads (int, optional): torch intra-op threads, 0 lets torch decide (defaults: 0).
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        draft_model_dir: Optional[str] = None,
+        device: str = "cpu",
+        num_draft_tokens: int = 4,
+        batch_size: int = 1,
+        intra_threads: int = 0,
+    ):
+        super().__init__(model_dir)
+        if intra_threads:
+            torch.set_num_threads(intra_threads)
+        self.device = device
+        self.model = load_hf_model(model_dir, device)
+        self.draft_model = load_hf_model(draft_model_dir, device) if draft_model_dir else None
+        self.num_draft_tokens = num_draft_tokens
+        self.batch_size = batch_size
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Resets the drafting statistics accumulated over the calls to `translate_batch`.
+        """
+        self.stats = {"sentences": 0, "generated_tokens": 0, "drafted_tokens": 0, "accepted_tokens": 0, "target_calls": 0}
+
+    def decode(
+        self,
+        input_ids: np.ndarray,
+        attention_mask: np.ndarray,
+        beam_size: int,
+        max_decoding_length: int,
+        length_penalty: float,
+    ) -> List[List[Tuple[float, List[int]]]]:
+        input_ids = torch.from_numpy(input_ids).to(self.device)
+        attention_mask = torch.from_numpy(attention_mask).to(self.device)
+
+        with torch.no_grad():
+            if self.draft_model is None:
+                outputs = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=attention_mask,
+                    num_beams=1,
+                    do_sample=False,
+                    max_new_tokens=max_decoding_length,
+                    output_scores=True,
+                    return_dict_in_generate=True,
+                )
+                logprobs = torch.stack(outputs.scores, dim=1).float().log_softmax(dim=-1)
+                generated = outputs.sequences[:, 1:]
+                token_logprobs = logprobs.gather(-1, generated[..., None])[..., 0]
+                lengths = (generated != self.pad_id).sum(dim=1)
+                scores = token_logprobs.masked_fill(generated == self.pad_id, 0.0).sum(dim=1) / lengths
+                sequences = outputs.sequences
+                self.stats["target_calls"] += generated.shape[1]
+            else:
+                outputs = self.model.generate_speculative(
+                    input_ids,
+                    attention_mask,
+                    self.draft_model,
+                    num_draft_tokens=self.num_draft_tokens,
+                    max_new_tokens=max_decoding_length,
+                )
+                sequences, scores = outputs.sequences, outputs.sequences_scores
+                self.stats["drafted_tokens"] += outputs.num_drafted
+                self.stats["accepted_tokens"] += outputs.num_accepted
+                self.stats["target_calls"] += outputs.num_target_calls
+
+        self.stats["sentences"] += sequences.shape[0]
+        self.stats["generated_tokens"] += int((sequences[:, 1:] != self.pad_id).sum())
+        return [[(float(score), ids)] for score, ids in zip(scores.tolist(), sequences[:, 1:].tolist())]
+
+    def translate_batch(self, source: List[List[str]], beam_size: int = 1, num_hypotheses: int = 1, **kwargs) -> List[TranslationResult]:
+        """
+        Translates tokenized sentences greedily, `batch_size` sentences at a time, see
+        `ctranslate2.Translator.translate_batch`. Speculative decoding only reproduces greedy decoding, so
+        `beam_size` is ignored and a single hypothesis is returned per sentence.
+        """
+        kwargs.update(max_batch_size=self.batch_size, batch_type="examples")
+        return super().translate_batch(source, beam_size=1, num_hypotheses=1, **kwargs)
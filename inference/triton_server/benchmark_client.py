@@ -0,0 +1,385 @@
+"""
+Load-generating benchmark client for the Triton `nmt` model.
+
+Replays a corpus against the server with a configurable number of concurrent in-flight requests,
+request batch size and language mix, over pooled async HTTP or gRPC connections, and reports
+throughput, latency percentiles and error rates.
+
+The corpus can either be a single text file (with `--src_lang` and `--tgt_lang`) or a directory
+laid out like the evaluation benchmarks (e.g. a FLORES devtest directory):
+
+    flores
+    └── eng_Latn-hin_Deva
+        ├── test.eng_Latn
+        └── test.hin_Deva
+
+Usage:
+    # against a running Triton server
+    python3 triton_server/benchmark_client.py --corpus flores --lang_mix eng_Latn-hin_Deva:3,hin_Deva-eng_Latn:1 \
+        --concurrency 16 --batch_size 8 --num_requests 2000
+
+    # fully offline, against the in-process stub server
+    python3 triton_server/benchmark_client.py --corpus flores --stub --stub_per_sentence_ms 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from inference.flores_codes_map_indic import flores_to_iso, iso_to_flores
+
+MODEL_NAME = "nmt"
+HTTP_HEADERS = {"Authorization": "Bearer __PASTE_KEY_HERE__"}
+
+
+def to_flores(lang: str) -> str:
+    """
+    Converts a language code in either flores or iso format to the flores format.
+    """
+    if lang in flores_to_iso:
+        return lang
+    if lang in iso_to_flores:
+        return iso_to_flores[lang]
+    raise ValueError(f"Unknown language code: {lang}")
+
+
+def load_corpus(
+    corpus: str, split: str, src_lang: Optional[str] = None, tgt_lang: Optional[str] = None
+) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Loads the source side of the corpus grouped by translation direction.
+
+    Args:
+        corpus (str): path to a text file or to a directory with `{src_lang}-{tgt_lang}` subdirectories.
+        split (str): file prefix to read inside each pair directory, e.g. `test`, `dev` or `devtest`.
+        src_lang (str, optional): source language, required when `corpus` is a file.
+        tgt_lang (str, optional): target language, required when `corpus` is a file.
+
+    Returns:
+        Dict[Tuple[str, str], List[str]]: mapping of (src_lang, tgt_lang) in flores codes to source sentences.
+    """
+    pools = {}
+    if os.path.isfile(corpus):
+        if src_lang is None or tgt_lang is None:
+            raise ValueError("--src_lang and --tgt_lang are required when --corpus is a file")
+        with open(corpus, "r", encoding="utf-8") as f:
+            pools[(to_flores(src_lang), to_flores(tgt_lang))] = [l.strip() for l in f if l.strip()]
+        return pools
+
+    for pair in sorted(os.listdir(corpus)):
+        if "-" not in pair:
+            continue
+        pair_src, pair_tgt = pair.split("-", 1)
+        fname = os.path.join(corpus, pair, f"{split}.{pair_src}")
+        if not os.path.isfile(fname):
+            continue
+        with open(fname, "r", encoding="utf-8") as f:
+            pools[(to_flores(pair_src), to_flores(pair_tgt))] = [l.strip() for l in f if l.strip()]
+
+    if not pools:
+        raise FileNotFoundError(f"No `{split}.<src_lang>` files found under {corpus}")
+    return pools
+
+
+def parse_lang_mix(lang_mix: Optional[str], pools: Dict[Tuple[str, str], List[str]]) -> Dict[Tuple[str, str], float]:
+    """
+    Parses a language mix of the form `src-tgt:weight,src-tgt:weight`. Language codes can be flores or iso.
+    When no mix is given, every direction available in the corpus is weighted uniformly.
+    """
+    if not lang_mix:
+        return {pair: 1.0 for pair in pools}
+
+    weights = {}
+    for item in lang_mix.split(","):
+        pair, _, weight = item.partition(":")
+        src_lang, tgt_lang = pair.split("-", 1)
+        key = (to_flores(src_lang), to_flores(tgt_lang))
+        if key not in pools:
+            raise ValueError(f"Direction {pair} requested in --lang_mix is not present in the corpus")
+        weights[key] = float(weight) if weight else 1.0
+    return weights
+
+
+def build_workload(
+    pools: Dict[Tuple[str, str], List[str]],
+    weights: Dict[Tuple[str, str], float],
+    num_requests: int,
+    batch_size: int,
+    seed: int = 0,
+) -> List[List[Tuple[str, str, str]]]:
+    """
+    Builds a deterministic list of requests. Every row of a request picks its direction according to
+    the language mix and replays the corresponding corpus in order, wrapping around when exhausted.
+
+    Returns:
+        List[List[Tuple[str, str, str]]]: requests, each a list of (text, src_lang, tgt_lang) in iso codes.
+    """
+    rng = random.Random(seed)
+    pairs = list(weights.keys())
+    pair_weights = [weights[pair] for pair in pairs]
+    cursors = defaultdict(int)
+
+    requests = []
+    for _ in range(num_requests):
+        rows = []
+        for pair in rng.choices(pairs, weights=pair_weights, k=batch_size):
+            pool = pools[pair]
+            rows.append((pool[cursors[pair] % len(pool)], flores_to_iso[pair[0]], flores_to_iso[pair[1]]))
+            cursors[pair] += 1
+        requests.append(rows)
+    return requests
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Computes the q-th percentile (0-100) with linear interpolation between the closest ranks.
+    """
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100
+    lo, hi = int(rank), min(int(rank) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (rank - lo)
+
+
+class TritonLoadClient:
+    """
+    Thin wrapper around the async Triton clients that keeps a pool of connections open for the whole run.
+
+    For HTTP a single `aiohttp` session is shared with `conn_limit` pooled keep-alive connections. For gRPC,
+    requests are spread round-robin over `num_channels` HTTP/2 channels.
+    """
+
+    def __init__(self, url: str, protocol: str, pool_size: int, num_channels: int = 1, ssl: bool = False):
+        self.protocol = protocol
+        if protocol == "http":
+            import tritonclient.http.aio as client_module
+
+            self.clients = [client_module.InferenceServerClient(url=url, conn_limit=pool_size, ssl=ssl)]
+        elif protocol == "grpc":
+            import tritonclient.grpc.aio as client_module
+
+            self.clients = [
+                client_module.InferenceServerClient(url=url, ssl=ssl) for _ in range(max(1, num_channels))
+            ]
+        else:
+            raise NotImplementedError(f"Unknown protocol: {protocol}")
+        self.client_module = client_module
+        self.next_client = 0
+
+    def get_string_tensor(self, string_values, tensor_name):
+        string_obj = np.array(string_values, dtype="object")
+        input_obj = self.client_module.InferInput(tensor_name, string_obj.shape, "BYTES")
+        if self.protocol == "http":
+            # JSON encoding keeps the payload readable by the stub server as well as Triton
+            input_obj.set_data_from_numpy(string_obj, binary_data=False)
+        else:
+            input_obj.set_data_from_numpy(string_obj)
+        return input_obj
+
+    async def is_server_ready(self) -> bool:
+        return await self.clients[0].is_server_ready(headers=HTTP_HEADERS)
+
+    async def translate(self, rows: List[Tuple[str, str, str]]) -> List[str]:
+        inputs = [
+            self.get_string_tensor([[text] for text, _, _ in rows], "INPUT_TEXT"),
+            self.get_string_tensor([[src_lang] for _, src_lang, _ in rows], "INPUT_LANGUAGE_ID"),
+            self.get_string_tensor([[tgt_lang] for _, _, tgt_lang in rows], "OUTPUT_LANGUAGE_ID"),
+        ]
+        if self.protocol == "http":
+            outputs = [self.client_module.InferRequestedOutput("OUTPUT_TEXT", binary_data=False)]
+        else:
+            outputs = [self.client_module.InferRequestedOutput("OUTPUT_TEXT")]
+
+        client = self.clients[self.next_client]
+        self.next_client = (self.next_client + 1) % len(self.clients)
+
+        response = await client.infer(
+            MODEL_NAME, model_version="1", inputs=inputs, outputs=outputs, headers=HTTP_HEADERS
+        )
+        translations = []
+        for translation in response.as_numpy("OUTPUT_TEXT").tolist():
+            translation = translation[0]
+            translations.append(translation.decode("utf-8") if isinstance(translation, bytes) else translation)
+        return translations
+
+    async def close(self):
+        for client in self.clients:
+            await client.close()
+
+
+async def run_benchmark(
+    client: TritonLoadClient, requests: List[List[Tuple[str, str, str]]], concurrency: int
+) -> Tuple[List[dict], float]:
+    """
+    Sends the requests with at most `concurrency` requests in flight (closed-loop load).
+
+    Returns:
+        Tuple[List[dict], float]: per-request records and the wall-clock duration of the run in seconds.
+    """
+    queue = asyncio.Queue()
+    for rows in requests:
+        queue.put_nowait(rows)
+    records = []
+
+    async def worker():
+        while True:
+            try:
+                rows = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            error = None
+            try:
+                translations = await client.translate(rows)
+                if len(translations) != len(rows):
+                    error = f"expected {len(rows)} outputs, got {len(translations)}"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            records.append(
+                {
+                    "latency": time.perf_counter() - start,
+                    "num_sents": len(rows),
+                    "pairs": [f"{src_lang}-{tgt_lang}" for _, src_lang, tgt_lang in rows],
+                    "error": error,
+                }
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return records, time.perf_counter() - start
+
+
+def summarize(records: List[dict], duration: float) -> dict:
+    """
+    Aggregates per-request records into throughput, latency percentiles (in ms) and error rates,
+    overall and per translation direction.
+    """
+    ok = [r for r in records if r["error"] is None]
+    latencies = [r["latency"] * 1000 for r in ok]
+    errors = defaultdict(int)
+    for r in records:
+        if r["error"] is not None:
+            errors[r["error"]] += 1
+
+    per_direction = defaultdict(lambda: {"sentences": 0, "failed_sentences": 0})
+    for r in records:
+        for pair in r["pairs"]:
+            per_direction[pair]["sentences"] += 1
+            if r["error"] is not None:
+                per_direction[pair]["failed_sentences"] += 1
+
+    return {
+        "requests": len(records),
+        "failed_requests": len(records) - len(ok),
+        "error_rate": (len(records) - len(ok)) / len(records) if records else 0.0,
+        "sentences": sum(r["num_sents"] for r in ok),
+        "duration_s": duration,
+        "requests_per_s": len(ok) / duration if duration else 0.0,
+        "sentences_per_s": sum(r["num_sents"] for r in ok) / duration if duration else 0.0,
+        "latency_ms": {
+            "mean": sum(latencies) / len(latencies) if latencies else float("nan"),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else float("nan"),
+        },
+        "errors": dict(errors),
+        "per_direction": dict(per_direction),
+    }
+
+
+def print_report(report: dict):
+    latency = report["latency_ms"]
+    print(f"Requests:        {report['requests']} ({report['failed_requests']} failed, error rate {report['error_rate']:.2%})")
+    print(f"Sentences:       {report['sentences']}")
+    print(f"Duration:        {report['duration_s']:.2f} s")
+    print(f"Throughput:      {report['requests_per_s']:.2f} req/s, {report['sentences_per_s']:.2f} sent/s")
+    print(
+        f"Latency (ms):    mean {latency['mean']:.1f} | p50 {latency['p50']:.1f} | "
+        f"p95 {latency['p95']:.1f} | p99 {latency['p99']:.1f} | max {latency['max']:.1f}"
+    )
+    for pair, stats in sorted(report["per_direction"].items()):
+        print(f"  {pair:<12} {stats['sentences']:>8} sentences, {stats['failed_sentences']} failed")
+    for error, count in report["errors"].items():
+        print(f"  error x{count}: {error}")
+
+
+async def main(args):
+    pools = load_corpus(args.corpus, args.split, args.src_lang, args.tgt_lang)
+    weights = parse_lang_mix(args.lang_mix, pools)
+    requests = build_workload(
+        pools, weights, args.warmup_requests + args.num_requests, args.batch_size, args.seed
+    )
+
+    if args.stub and args.protocol != "http":
+        raise ValueError("The stub server only speaks HTTP, use --protocol http with --stub")
+
+    stub = None
+    url = args.url
+    if args.stub:
+        from stub_server import StubServer
+
+        stub = StubServer(args.stub_latency_ms, args.stub_per_sentence_ms, args.stub_error_rate, args.seed)
+        port = await stub.start("127.0.0.1", 0)
+        url = f"127.0.0.1:{port}"
+
+    client = TritonLoadClient(url, args.protocol, args.concurrency, args.grpc_channels, args.ssl)
+    try:
+        print(f"Is server ready - {await client.is_server_ready()}")
+        if args.warmup_requests:
+            await run_benchmark(client, requests[: args.warmup_requests], args.concurrency)
+        records, duration = await run_benchmark(client, requests[args.warmup_requests :], args.concurrency)
+    finally:
+        await client.close()
+        if stub is not None:
+            await stub.stop()
+
+    report = summarize(records, duration)
+    report["config"] = {
+        "url": url,
+        "protocol": args.protocol,
+        "concurrency": args.concurrency,
+        "batch_size": args.batch_size,
+        "lang_mix": {f"{src}-{tgt}": w for (src, tgt), w in weights.items()},
+    }
+    print_report(report)
+
+    if args.output_json:
+        with open(args.output_json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=str, required=True, help="text file or directory of `{src}-{tgt}` pairs")
+    parser.add_argument("--split", type=str, default="test", help="file prefix inside each pair directory")
+    parser.add_argument("--src_lang", type=str, default=None, help="source language when --corpus is a file")
+    parser.add_argument("--tgt_lang", type=str, default=None, help="target language when --corpus is a file")
+    parser.add_argument("--lang_mix", type=str, default=None, help="e.g. eng_Latn-hin_Deva:3,hin_Deva-eng_Latn:1")
+    parser.add_argument("--url", type=str, default="localhost:8000")
+    parser.add_argument("--protocol", type=str, default="http", choices=["http", "grpc"])
+    parser.add_argument("--grpc_channels", type=int, default=1)
+    parser.add_argument("--ssl", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch_size", type=int, default=1)
+    parser.add_argument("--num_requests", type=int, default=500)
+    parser.add_argument("--warmup_requests", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output_json", type=str, default=None)
+    parser.add_argument("--stub", action="store_true", help="benchmark against an in-process stub server")
+    parser.add_argument("--stub_latency_ms", type=float, default=0.0)
+    parser.add_argument("--stub_per_sentence_ms", type=float, default=0.0)
+    parser.add_argument("--stub_error_rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
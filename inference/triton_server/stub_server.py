@@ -0,0 +1,146 @@
+"""
+A dependency-free stand-in for the Triton `nmt` model, used to exercise `benchmark_client.py` offline.
+
+It speaks the JSON flavour of the KServe v2 HTTP protocol that Triton implements (`/v2/health/*`,
+`/v2/models/nmt/infer`), accepts the same `INPUT_TEXT`, `INPUT_LANGUAGE_ID` and `OUTPUT_LANGUAGE_ID`
+tensors and returns `OUTPUT_TEXT`. Translations are simulated by echoing the input after an artificial delay.
+
+Usage:
+    python3 triton_server/stub_server.py --port 8000 --latency_ms 5 --per_sentence_ms 1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+MODEL_NAME = "nmt"
+OUTPUT_NAME = "OUTPUT_TEXT"
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+class StubServer:
+    """
+    Minimal HTTP/1.1 keep-alive server that mimics the Triton `nmt` model contract.
+
+    Args:
+        latency_ms (float): fixed delay added to every inference request.
+        per_sentence_ms (float): additional delay added per input row.
+        error_rate (float): fraction of inference requests that fail with HTTP 500.
+        seed (int): seed for the error injection.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        per_sentence_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.per_sentence_ms = per_sentence_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> int:
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, value = line.decode("latin-1").split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+
+                status, payload = await self.route(method, path.split("?", 1)[0], body)
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(payload)}\r\n"
+                        "\r\n"
+                    ).encode("latin-1")
+                    + payload
+                )
+                await writer.drain()
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method: str, path: str, body: bytes):
+        if method == "GET" and path in ("/v2/health/live", "/v2/health/ready"):
+            return 200, b""
+        if method == "GET" and path.startswith(f"/v2/models/{MODEL_NAME}") and path.endswith("/ready"):
+            return 200, b""
+        if method == "POST" and path.startswith(f"/v2/models/{MODEL_NAME}") and path.endswith("/infer"):
+            return await self.infer(body)
+        return 404, json.dumps({"error": f"unknown endpoint: {method} {path}"}).encode("utf-8")
+
+    async def infer(self, body: bytes):
+        try:
+            request = json.loads(body)
+            inputs = {tensor["name"]: tensor for tensor in request["inputs"]}
+            texts = inputs["INPUT_TEXT"]["data"]
+        except (KeyError, ValueError) as e:
+            return 400, json.dumps({"error": f"malformed request: {e}"}).encode("utf-8")
+
+        await asyncio.sleep((self.latency_ms + self.per_sentence_ms * len(texts)) / 1000)
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return 500, json.dumps({"error": "injected failure"}).encode("utf-8")
+
+        response = {
+            "model_name": MODEL_NAME,
+            "model_version": "1",
+            "outputs": [
+                {"name": OUTPUT_NAME, "datatype": "BYTES", "shape": [len(texts), 1], "data": texts}
+            ],
+        }
+        if "id" in request:
+            response["id"] = request["id"]
+        return 200, json.dumps(response, ensure_ascii=False).encode("utf-8")
+
+
+async def serve(args):
+    server = StubServer(args.latency_ms, args.per_sentence_ms, args.error_rate, args.seed)
+    port = await server.start(args.host, args.port)
+    print(f"Stub `{MODEL_NAME}` server listening on {args.host}:{port}")
+    await server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency_ms", type=float, default=0.0)
+    parser.add_argument("--per_sentence_ms", type=float, default=0.0)
+    parser.add_argument("--error_rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    asyncio.run(serve(args))
@@ -8,14 +8,36 @@ PWD = os.path.dirname(__file__)
 
 INFERENCE_MODULE_DIR = "/home/indicTrans2/"
 sys.path.insert(0, INFERENCE_MODULE_DIR)
+from inference.ct2_autotune import load_ct2_settings
 from inference.engine import Model, iso_to_flores
+from inference.flores_codes_map_indic import flores_to_iso
+from inference.lang_id import LanguageIdentifier
+from inference.metrics import LANGUAGE_MISMATCH, start_metrics_http_server
 INDIC_LANGUAGES = set(iso_to_flores)
 
 ALLOWED_DIRECTION_STRINGS = {"en-indic", "indic-en", "indic-indic"}
 FORCE_PIVOTING = False
 DEFAULT_PIVOT_LANG = "en"
+# also the value shipped in `config.pbtxt`
+DEFAULT_LANG_ID_MODE = "validate"
+# Triton's own metrics port (8002) only carries server-level metrics, so engine metrics are served separately
+METRICS_PORT = int(os.environ.get("NMT_METRICS_PORT", 8003))
+
+def get_parameter(model_config, key, default=None):
+    value = model_config.get("parameters", {}).get(key, {}).get("string_value", "")
+    return value if value else default
 
 class TritonPythonModel:
+    def get_cpu_cores(self, args):
+        # Pins every CPU instance to its own slice of cores, e.g. `nmt_0_1` gets the second slice
+        cores_per_instance = int(get_parameter(self.model_config, "cpu_cores_per_instance", 0))
+        if args["model_instance_kind"] != "CPU" or not cores_per_instance:
+            return None
+        instance_id = int(args["model_instance_name"].rsplit("_", 1)[-1])
+        cores = sorted(os.sched_getaffinity(0))
+        start = (instance_id * cores_per_instance) % len(cores)
+        return cores[start : start + cores_per_instance]
+
     def initialize(self, args):
         self.model_config = json.loads(args['model_config'])
         self.model_instance_device_id = json.loads(args['model_instance_device_id'])
@@ -32,11 +54,27 @@ class TritonPythonModel:
         if not checkpoint_folders:
             raise RuntimeError(f"No checkpoint folders in: {checkpoints_root_dir}")
 
+        device = "cuda" if args["model_instance_kind"] == "GPU" else "cpu"
+        cpu_cores = self.get_cpu_cores(args)
+
         self.models = {}
         for checkpoint_folder in checkpoint_folders:
             direction_string = os.path.basename(checkpoint_folder)
             assert direction_string in ALLOWED_DIRECTION_STRINGS, f"Checkpoint folder-name `{direction_string}` not allowed"
-            self.models[direction_string] = Model(os.path.join(checkpoint_folder, "ct2_fp16_model"), input_lang_code_format="iso", model_type="ctranslate2")
+            ckpt_dir = os.path.join(checkpoint_folder, "ct2_fp16_model")
+            # Settings from `inference/ct2_autotune.py` are overridden by the parameters of config.pbtxt
+            ct2_settings = load_ct2_settings(ckpt_dir)
+            self.models[direction_string] = Model(
+                ckpt_dir,
+                device=device,
+                input_lang_code_format="iso",
+                model_type="ctranslate2",
+                direction=direction_string,
+                compute_type=get_parameter(self.model_config, "compute_type", ct2_settings.get("compute_type", "default")),
+                inter_threads=int(get_parameter(self.model_config, "inter_threads", ct2_settings.get("inter_threads", 1))),
+                intra_threads=int(get_parameter(self.model_config, "intra_threads", ct2_settings.get("intra_threads", 0))),
+                cpu_cores=cpu_cores,
+            )
             # self.models[direction_string] = Model(checkpoint_folder, input_lang_code_format="iso", model_type="fairseq")
         
         self.pivot_lang = None
@@ -46,6 +84,12 @@ class TritonPythonModel:
             elif FORCE_PIVOTING:
                 del self.models["indic-indic"]
                 self.pivot_lang = DEFAULT_PIVOT_LANG
+
+        self.lang_id_mode = get_parameter(self.model_config, "lang_id_mode", DEFAULT_LANG_ID_MODE)
+        self.lang_id = LanguageIdentifier.from_file(get_parameter(self.model_config, "lang_id_profiles"))
+
+        metrics_port = start_metrics_http_server(METRICS_PORT)
+        print(f"Serving engine metrics on port {metrics_port}")
     
     def get_direction_string(self, input_language_id, output_language_id):
         direction_string = None
@@ -58,6 +102,21 @@ class TritonPythonModel:
                 direction_string = "indic-indic"
         return direction_string
 
+    def check_language(self, input_text, input_language_id, output_language_id):
+        # Counts the inputs whose text does not match their label and, in `route` mode, returns the detected language
+        # instead. Inputs detected in their output language keep their label, so that the engine passes them through.
+        if self.lang_id_mode == "off" or input_language_id not in iso_to_flores:
+            return input_language_id
+        labelled = iso_to_flores[input_language_id]
+        min_script_fraction = 0.5 if labelled == "eng_Latn" else 0.2
+        if self.lang_id.matches(input_text, labelled, min_script_fraction=min_script_fraction):
+            return input_language_id
+        detected = flores_to_iso.get(self.lang_id.detect(input_text))
+        LANGUAGE_MISMATCH.inc(labelled=input_language_id, detected=detected or "unknown")
+        if self.lang_id_mode == "route" and detected and detected != output_language_id:
+            return detected
+        return input_language_id
+
     def get_model(self, input_language_id, output_language_id):
         direction_string = self.get_direction_string(input_language_id, output_language_id)
         
@@ -81,6 +140,7 @@ class TritonPythonModel:
             responses.append([['']] * len(input_text_batch))
 
             for input_id, (input_text, input_language_id, output_language_id) in enumerate(zip(input_text_batch, input_language_id_batch, output_language_id_batch)):
+                input_language_id = self.check_language(input_text, input_language_id, output_language_id)
                 direction_string = self.get_direction_string(input_language_id, output_language_id)
                 if direction_string not in self.models:
                     if direction_string == "indic-indic" and self.pivot_lang:
@@ -146,6 +206,7 @@ class TritonPythonModel:
             generated_outputs = []
 
             for input_text, input_language_id, output_language_id in zip(input_text_batch, input_language_id_batch, output_language_id_batch):
+                input_language_id = self.check_language(input_text, input_language_id, output_language_id)
                 if self.pivot_lang and (input_language_id != self.pivot_lang and output_language_id != self.pivot_lang):
                     model = self.get_model(input_language_id, self.pivot_lang)
                     pivot_text = model.translate_paragraph(input_text, input_language_id, self.pivot_lang)
@@ -33,7 +33,7 @@ TGT_PREFIX='TGT'
 
 
 echo "Normalizing punctuations"
-bash normalize_punctuation.sh $src_lang < $infname > $outfname._norm
+python3 scripts/normalize_punctuation.py $infname $outfname._norm $src_lang
 
 echo "Adding do not translate tags"
 python3 scripts/normalize_regex_inference.py $outfname._norm $outfname.norm
@@ -74,13 +74,8 @@ for pair in ${pairs[@]}; do
 	train_outfname_tgt=$train_norm_dir/train.$tgt_lang
 
     echo "Normalizing punctuations for train"
-    if $parallel_installed; then
-        parallel --pipe --keep-order bash $root/normalize_punctuation.sh $src_lang < $train_infname_src > $train_outfname_src._norm
-        parallel --pipe --keep-order bash $root/normalize_punctuation.sh $tgt_lang < $train_infname_tgt > $train_outfname_tgt._norm
-    else
-        bash $root/normalize_punctuation.sh $src_lang < $train_infname_src > $train_outfname_src._norm
-        bash $root/normalize_punctuation.sh $tgt_lang < $train_infname_tgt > $train_outfname_tgt._norm
-    fi
+    python3 scripts/normalize_punctuation.py $train_infname_src $train_outfname_src._norm $src_lang
+    python3 scripts/normalize_punctuation.py $train_infname_tgt $train_outfname_tgt._norm $tgt_lang
 
 	# add do not translate tags to handle special failure cases
     echo "Applying do not translate tags for train"
@@ -102,13 +97,8 @@ for pair in ${pairs[@]}; do
 	dev_outfname_tgt=$devtest_norm_dir/dev.$tgt_lang
 
     echo "Normalizing punctuations for dev"
-    if $parallel_installed; then
-        parallel --pipe --keep-order bash normalize_punctuation.sh $src_lang < $dev_infname_src > $dev_outfname_src._norm
-        parallel --pipe --keep-order bash normalize_punctuation.sh $tgt_lang < $dev_infname_tgt > $dev_outfname_tgt._norm
-    else
-        bash normalize_punctuation.sh $src_lang < $dev_infname_src > $dev_outfname_src._norm
-        bash normalize_punctuation.sh $tgt_lang < $dev_infname_tgt > $dev_outfname_tgt._norm
-    fi
+    python3 scripts/normalize_punctuation.py $dev_infname_src $dev_outfname_src._norm $src_lang
+    python3 scripts/normalize_punctuation.py $dev_infname_tgt $dev_outfname_tgt._norm $tgt_lang
 
 	# add do not translate tags to handle special failure cases
     echo "Applying do not translate tags for dev"
@@ -0,0 +1,116 @@
+"""
+Normalizes the punctuation of a file like `normalize_punctuation.sh`, with the Python port of
+`normalize-punctuation.perl` in `inference/normalize_punctuation.py`, over several processes.
+
+The input is streamed in chunks of `--chunk_size` lines, normalized by `--num_workers` processes and written in the
+input order, with at most two chunks per worker in memory. Lines are processed as bytes like the perl script, so the
+output is byte-for-byte that of `normalize_punctuation.sh`, which `--check` verifies chunk by chunk.
+
+Usage (from the root directory):
+    python3 scripts/normalize_punctuation.py <infname> <outfname> <lang> [--num_workers 8] [--check]
+"""
+
+import argparse
+import os
+import sys
+from collections import deque
+from multiprocessing import Pool
+from typing import Iterator, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference.normalize_punctuation import check_parity, get_normalizer, punc_norm_lang
+
+_normalizer = None
+
+
+def init_worker(lang: str):
+    global _normalizer
+    _normalizer = get_normalizer(lang)
+
+
+def normalize_chunk(chunk: bytes) -> bytes:
+    """
+    Normalizes a chunk of lines, which ends with a newline except at the end of the input. Bytes that are not valid
+    UTF-8 are kept as they are.
+    """
+    lines = chunk.decode("utf-8", "surrogateescape").split("\n")
+    last = lines.pop()
+    out = [_normalizer(line + "\n") for line in lines]
+    if last:
+        out.append(_normalizer(last))
+    return "".join(out).encode("utf-8", "surrogateescape")
+
+
+def check_chunk(chunk: bytes) -> Tuple[bytes, List[int]]:
+    """
+    Normalizes a chunk of lines and returns it with the indices of the lines the perl script normalizes differently.
+    """
+    lines = chunk.split(b"\n")
+    last = lines.pop()
+    lines = [line + b"\n" for line in lines] + ([last] if last else [])
+    return normalize_chunk(chunk), check_parity(lines, _normalizer.lang)
+
+
+def read_chunks(infname: str, chunk_size: int) -> Iterator[bytes]:
+    with open(infname, "rb") as infile:
+        chunk = []
+        for line in infile:
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield b"".join(chunk)
+                chunk = []
+        if chunk:
+            yield b"".join(chunk)
+
+
+def normalize_file(
+    infname: str, outfname: str, lang: str, num_workers: int, chunk_size: int = 10000, check: bool = False
+) -> List[int]:
+    """
+    Normalizes `infname` into `outfname` with the perl language code `lang`. With `check`, returns the (0-based)
+    indices of the lines the perl script normalizes differently.
+    """
+    worker = check_chunk if check else normalize_chunk
+    num_lines, mismatches = 0, []
+    with Pool(num_workers, initializer=init_worker, initargs=(lang,)) as pool, open(outfname, "wb") as outfile:
+
+        def write(result):
+            nonlocal num_lines
+            if check:
+                result, chunk_mismatches = result
+                mismatches.extend(num_lines + i for i in chunk_mismatches)
+            num_lines += result.count(b"\n")
+            outfile.write(result)
+
+        # chunks are written in the input order, and reading waits while two chunks per worker are pending
+        pending = deque()
+        for chunk in read_chunks(infname, chunk_size):
+            pending.append(pool.apply_async(worker, (chunk,)))
+            while pending and (len(pending) >= 2 * num_workers or pending[0].ready()):
+                write(pending.popleft().get())
+        for result in pending:
+            write(result.get())
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("infname", type=str)
+    parser.add_argument("outfname", type=str)
+    parser.add_argument("lang", type=str, help="flores language code, mapped with `utils.map_token_lang.tsv`")
+    parser.add_argument("--num_workers", type=int, default=len(os.sched_getaffinity(0)))
+    parser.add_argument("--chunk_size", type=int, default=10000, help="lines sent to a worker at once")
+    parser.add_argument("--check", action="store_true", help="compare every line with `normalize-punctuation.perl`")
+    args = parser.parse_args()
+
+    lang = punc_norm_lang(args.lang)
+    if lang is None:
+        print(f"undefined mapping: {args.lang}, falling back to: en", file=sys.stderr)
+        lang = "en"
+
+    mismatches = normalize_file(args.infname, args.outfname, lang, args.num_workers, args.chunk_size, args.check)
+    if args.check:
+        for i in mismatches[:10]:
+            print(f"line {i + 1} differs from normalize-punctuation.perl", file=sys.stderr)
+        print(f"{len(mismatches)} lines differ from normalize-punctuation.perl", file=sys.stderr)
+        sys.exit(1 if mismatches else 0)
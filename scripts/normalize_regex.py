@@ -3,7 +3,7 @@ import regex as re
 import sys
 from tqdm import tqdm
 from joblib import Parallel, delayed
-from indic_num_map import INDIC_NUM_MAP
+from indic_num_map import INDIC_NUM_TABLE
 
 
 URL_PATTERN = r'\b(?<![\w/.])(?:(?:https?|ftp)://)?(?:(?:[\w-]+\.)+(?!\.))(?:[\w/\-?#&=%.]+)+(?!\.\w+)\b'
@@ -24,7 +24,23 @@ def normalize_indic_numerals(line: str):
     Returns:
         str: an input string with the all Indic numerals normalized to Roman script.
     """
-    return "".join([INDIC_NUM_MAP.get(c, c) for c in line])
+    return line.translate(INDIC_NUM_TABLE)
+
+
+def normalize_indic_numerals_file(infname: str, outfname: str, buffer_size: int = 1 << 20):
+    """
+    Normalize the numerals of a whole file from native script to Roman script. The mapping is per character, 
+    so the file is streamed in blocks of `buffer_size` characters without splitting it into lines.
+    
+    Args:
+        infname (str): path to the input file.
+        outfname (str): path to the output file, identical to the input apart from the numerals.
+        buffer_size (int): number of characters read at once (defaults: 1M).
+    """
+    with open(infname, "r", encoding="utf-8", newline="") as infile, \
+        open(outfname, "w", encoding="utf-8", newline="") as outfile:
+        for block in iter(lambda: infile.read(buffer_size), ""):
+            outfile.write(block.translate(INDIC_NUM_TABLE))
 
 
 def wrap_with_dnt_tag(src: str, tgt: str, pattern: str) -> Tuple[str, str]:
@@ -86,6 +102,11 @@ def normalize(src_line: str, tgt_line: str, patterns: List[str]) -> Tuple[str, s
 
 if __name__ == "__main__":
 
+    # numerals only: python3 scripts/normalize_regex.py <infname> <outfname>
+    if len(sys.argv) == 3:
+        normalize_indic_numerals_file(sys.argv[1], sys.argv[2])
+        sys.exit(0)
+
     src_infname = sys.argv[1]
     tgt_infname = sys.argv[2]
     src_outfname = sys.argv[3]
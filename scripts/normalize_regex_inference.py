@@ -3,7 +3,7 @@ import regex as re
 import sys
 from tqdm import tqdm
 from joblib import Parallel, delayed
-from indic_num_map import INDIC_NUM_MAP
+from indic_num_map import INDIC_NUM_TABLE
 
 
 URL_PATTERN = r'\b(?<![\w/.])(?:(?:https?|ftp)://)?(?:(?:[\w-]+\.)+(?!\.))(?:[\w/\-?#&=%.]+)+(?!\.\w+)\b'
@@ -24,7 +24,7 @@ def normalize_indic_numerals(line: str) -> str:
     Returns:
         str: an input string with the all Indic numerals normalized to Roman script.
     """
-    return "".join([INDIC_NUM_MAP.get(c, c) for c in line])
+    return line.translate(INDIC_NUM_TABLE)
 
 
 def wrap_with_dnt_tag(text: str, pattern: str) -> str: